@@ -1,276 +1,624 @@
-import chess
 import math
 import random
 import sys
 import time
-from numba import jit
-
-BOUNDS_DICT = {
-    "P": [0, 0, 0, 0, 0, 0, 0, 0,
-          50, 50, 50, 50, 50, 50, 50, 50,
-          10, 10, 20, 30, 30, 20, 10, 10,
-          5, 5, 10, 25, 25, 10, 5, 5,
-          0, 0, 0, 20, 20, 0, 0, 0,
-          5, -5, -10, 0, 0, -10, -5, 5,
-          5, 10, 10, -20, -20, 10, 10, 5,
-          0, 0, 0, 0, 0, 0, 0, 0],
-
-    "N": [-50, -40, -30, -30, -30, -30, -40, -50,
-          -40, -20, 0, 0, 0, 0, -20, -40,
-          -30, 0, 10, 15, 15, 10, 0, -30,
-          -30, 5, 15, 20, 20, 15, 5, -30,
-          -30, 0, 15, 20, 20, 15, 0, -30,
-          -30, 5, 10, 15, 15, 10, 5, -30,
-          -40, -20, 0, 5, 5, 0, -20, -40,
-          -50, -40, -30, -30, -30, -30, -40, -50, ],
-
-    "B": [-20, -10, -10, -10, -10, -10, -10, -20,
-          -10, 0, 0, 0, 0, 0, 0, -10,
-          -10, 0, 5, 10, 10, 5, 0, -10,
-          -10, 5, 5, 10, 10, 5, 5, -10,
-          -10, 0, 10, 10, 10, 10, 0, -10,
-          -10, 10, 10, 10, 10, 10, 10, -10,
-          -10, 5, 0, 0, 0, 0, 5, -10,
-          -20, -10, -10, -10, -10, -10, -10, -20, ],
-
-    "R": [0, 0, 0, 0, 0, 0, 0, 0,
-          5, 10, 10, 10, 10, 10, 10, 5,
-          -5, 0, 0, 0, 0, 0, 0, -5,
-          -5, 0, 0, 0, 0, 0, 0, -5,
-          -5, 0, 0, 0, 0, 0, 0, -5,
-          -5, 0, 0, 0, 0, 0, 0, -5,
-          -5, 0, 0, 0, 0, 0, 0, -5,
-          0, 0, 0, 5, 5, 0, 0, 0],
-
-    "Q": [-20, -10, -10, -5, -5, -10, -10, -20,
-          -10, 0, 0, 0, 0, 0, 0, -10,
-          -10, 0, 5, 5, 5, 5, 0, -10,
-          -5, 0, 5, 5, 5, 5, 0, -5,
-          0, 0, 5, 5, 5, 5, 0, -5,
-          -10, 5, 5, 5, 5, 5, 0, -10,
-          -10, 0, 5, 0, 0, 0, 0, -10,
-          -20, -10, -10, -5, -5, -10, -10, -20],
-
-    "K": [-30, -40, -40, -50, -50, -40, -40, -30,
-          -30, -40, -40, -50, -50, -40, -40, -30,
-          -30, -40, -40, -50, -50, -40, -40, -30,
-          -30, -40, -40, -50, -50, -40, -40, -30,
-          -20, -30, -30, -40, -40, -30, -30, -20,
-          -10, -20, -20, -20, -20, -20, -20, -10,
-          20, 20, 0, 0, 0, 0, 20, 20,
-          20, 30, 10, 0, 0, 10, 30, 20]}
-
-
-def minimaxRoot(depth, board, is_maximizing, square_bonus=False, iterative_deeping=True):
-    tic = time.perf_counter()
-
-    #possible_moves = random_possible_move(board)
-    board.get_all_possible_moves()
-    possible_moves = board.possible_moves
-
-    best_move_score = -9999 if is_maximizing else 9999
-    best_move = None
-    move_count = 0
 
-    if iterative_deeping:
-        move_score_array = []
-        for move in possible_moves:
-            move_score_array.append([move, (evaluation(board, square_bonus=False))])
-        move_score_array = sorted(move_score_array, key=lambda x: x[1])
-        if is_maximizing:
-            move_score_array.reverse()
+import attack_maps as am
+import config as c
+import fen_settings as s
+import move_encoding as me
+import move_ordering as mo
+import pawn_structure as pawns
+import transposition as tt
+from GameInstance import GameInstance
+
+_transposition_table = None  # see get_transposition_table
+_move_orderer = None  # see get_move_orderer
+
+# Node counts of the current root search (reset by minimaxRoot), quiescence nodes are counted separately.
+# depth/best_move/best_score are those of the last completed iteration, so they can be read at any time
+# (best_score is from whites point of view, inside the search scores are from the side to move's)
+search_stats = {'nodes': 0, 'qs_nodes': 0, 'qs_node_limit_hits': 0, 'qs_depth_limit_hits': 0, 'qs_delta_pruned': 0,
+                'cutoffs': 0, 'first_move_cutoffs': 0, 'aspiration_researches': 0, 'pvs_researches': 0,
+                'null_move_cutoffs': 0, 'lmr_reductions': 0, 'lmr_researches': 0, 'depth': 0, 'best_move': None, 'best_score': None}
+
+# Budget of the current root search, checked every limit_check_interval nodes (see check_search_limits)
+search_limits = {'deadline': None, 'node_limit': None, 'stop': False, 'stop_event': None}
+limit_check_interval = 1024  # must be a power of 2
+
+# Scores - mate in n plies from the root is mate_score - n, anything beyond mate_threshold is a mate
+infinity = 32000
+mate_score = 30000
+mate_threshold = mate_score - mo.max_ply
+max_phase = s.max_phase  # tapered evaluation (see evaluation)
+
+
+class SearchStopped(Exception):
+    """
+    Raised inside the search when the time/node budget runs out (or stop_search is called)
+    """
+
+
+def minimaxRoot(depth, board, is_maximizing, square_bonus=False, iterative_deeping=True, transposition_table=None,
+                time_limit=None, node_limit=None, move_orderer=None, workers=None, start_depth=1):
+    """
+    Root search - with iterative deepening, depths 1..depth are searched in turn with the best moves of the previous
+    iteration searched first (deeper in the tree the previous principal variation comes from the transposition
+    table hash moves). From aspiration_min_depth on each iteration starts with a narrow window around the previous
+    score, widened and re-searched when the score falls outside it. The search stops when the time or node budget
+    runs out and the best move of the deepest completed iteration is returned
+    :param depth: maximum depth (the only depth searched when iterative_deeping is False)
+    :param board: game instance
+    :param is_maximizing: True if white to move (note - negamax takes the side to move from the board)
+    :param square_bonus: include the square bonus in the evaluation
+    :param iterative_deeping: search depths 1..depth
+    :param transposition_table: TranspositionTable (defaults to the shared table)
+    :param time_limit: seconds for the whole search (None for no limit)
+    :param node_limit: nodes for the whole search, quiescence included (None for no limit)
+    :param move_orderer: MoveOrderer (defaults to the shared one, so the history carries over between moves)
+    :param workers: processes searching (defaults to c.search_workers) - the root moves are split across them
+    (parallel_search, the node limit, transposition table and move orderer are then per worker) or they all search
+    with a shared transposition table (lazy_smp), see c.parallel_search
+    :param start_depth: first depth of the iterative deepening (Lazy SMP helpers start at staggered depths)
+    :return: best move (None if there are no legal moves)
+    """
+    if c.opening_book:
+        import opening_book  # note - only loaded when a book is configured
+        move = opening_book.book_move(board)
+        if move is not None:
+            search_stats.update(nodes=0, qs_nodes=0, depth=0, best_move=move, best_score=None)
+            print("Book move: ", me.move_to_uci(move))
+            return move
+
+    workers = c.search_workers if workers is None else workers
+    if workers > 1:
+        if c.parallel_search == 'lazy_smp':
+            from lazy_smp import lazy_smp_search
+            return lazy_smp_search(depth, board, square_bonus, time_limit, workers)
+        from parallel_search import parallel_root_search
+        return parallel_root_search(depth, board, square_bonus, iterative_deeping, time_limit, workers)
 
-        possible_moves = [item[0] for item in move_score_array]
+    tic = time.perf_counter()
 
-    for x in possible_moves:
-        move = chess.Move.from_uci(str(x))
-        move_count += 1
+    if transposition_table is None:
+        transposition_table = get_transposition_table()
+    transposition_table.new_search()
+    pawns.get_pawn_table().reset_stats()
+    search_stats.update(nodes=0, qs_nodes=0, qs_node_limit_hits=0, qs_depth_limit_hits=0, qs_delta_pruned=0, cutoffs=0,
+                        first_move_cutoffs=0, aspiration_researches=0, pvs_researches=0, null_move_cutoffs=0, lmr_reductions=0,
+                        lmr_researches=0, depth=0, best_move=None, best_score=None)
+    search_limits.update(deadline=tic + time_limit if time_limit else None, node_limit=node_limit, stop=False)
+
+    possible_moves = board.get_all_legal_moves()
+    if not possible_moves:
+        return None
+    root_ply = len(board.move_log)
+    if move_orderer is None:
+        move_orderer = get_move_orderer()
+    move_orderer.new_search(root_ply)
+    white_sign = 1 if board.is_whites_turn else -1  # note - search_stats/printed scores are from whites point of view
+
+    # Previous best move for this position (e.g. from the last search) is searched first
+    entry = transposition_table.probe(board.zobrist_key)
+    if entry is not None and entry[4] in possible_moves:
+        possible_moves.remove(entry[4])
+        possible_moves.insert(0, entry[4])
+
+    best_move = possible_moves[0]  # note - a move is always returned, even if the first iteration is cut short
+    best_move_score = None
+    for search_depth in range(min(start_depth, depth), depth + 1) if iterative_deeping else [depth]:
+        move_scores = {}
+        iteration = {'best_move': None, 'best_score': None}  # best move of the unfinished iteration so far
+
+        # Aspiration window https://www.chessprogramming.org/Aspiration_Windows
+        window = c.aspiration_window
+        alpha, beta = -infinity, infinity
+        if search_depth >= c.aspiration_min_depth and best_move_score is not None and \
+                abs(best_move_score) < mate_threshold:
+            alpha, beta = best_move_score - window, best_move_score + window
+        try:
+            while True:
+                score = search_root(search_depth, board, possible_moves, alpha, beta, square_bonus,
+                                    transposition_table, move_orderer, move_scores, iteration)
+                if alpha < score < beta:
+                    break
+                # Outside the window - re-search with that side widened (the fail high move is searched first)
+                search_stats['aspiration_researches'] += 1
+                window *= 4
+                if score <= alpha:
+                    alpha = max(score - window, -infinity)
+                else:
+                    beta = min(score + window, infinity)
+                    possible_moves.remove(iteration['best_move'])
+                    possible_moves.insert(0, iteration['best_move'])
+
+        except SearchStopped:
+            unwind(board, root_ply)
+            # The previous best move was searched first - any move that beat it in the unfinished iteration is better
+            if iteration['best_move'] is not None:
+                best_move, best_move_score = iteration['best_move'], iteration['best_score']
+            break
+
+        best_move, best_move_score = iteration['best_move'], score
+        search_stats.update(depth=search_depth, best_move=best_move, best_score=white_sign * best_move_score)
+        transposition_table.store(board.zobrist_key, search_depth, best_move_score, tt.exact, best_move)
+
+        toc = time.perf_counter()
+        print("Depth {0}: best move {1}, score {2}, nodes {3}, {4:.2f}s, pv {5}".format(
+            search_depth, me.move_to_uci(best_move), score_to_string(white_sign * best_move_score),
+            search_stats['nodes'] + search_stats['qs_nodes'], toc - tic,
+            ' '.join(principal_variation(board, transposition_table, search_depth))))
+
+        # Next iteration - best move first then the rest by score, skipped if it is unlikely to finish in time
+        possible_moves.sort(key=lambda move: move_scores[move], reverse=True)
+        possible_moves.remove(best_move)
+        possible_moves.insert(0, best_move)
+        if time_limit and toc - tic > time_limit / 2:
+            break
+        if abs(best_move_score) >= mate_threshold and mate_score - abs(best_move_score) <= search_depth:
+            break  # note - the mate was found with a full width search, deeper iterations can't find a shorter one
 
-        board.push(move)
-        proposed_move_score, sub_tree_moves = minimax(depth=depth - 1,
-                                                      board=board,
-                                                      alpha=-10000,
-                                                      beta=10000,
-                                                      is_maximizing=not is_maximizing,
-                                                      square_bonus=square_bonus)
-        """
-        proposed_move_score = negamax(depth=depth - 1,
-                                      board=board,
-                                      alpha=-10000,
-                                      beta=10000,
-                                      color=not is_maximizing)
-        """
-        move_count += sub_tree_moves
-
-        if is_maximizing:
-            value = max(best_move_score, proposed_move_score)
-            if value > best_move_score:
-                best_move_score = value
-                best_move = move
-            # print("Best score: ", str(best_move_score))
-            # print("Best move: ", str(best_move_final))
-        else:
-            value = min(best_move_score, proposed_move_score)
-            if value < best_move_score:
-                best_move_score = value
-                best_move = move
-                # print("Best score: " ,str(best_move_score))
-                # print("Best move: ",str(best_move_final))
-
-        board.pop()  # Take away the proposed move
     toc = time.perf_counter()
+    move_count = search_stats['nodes'] + search_stats['qs_nodes']
 
-    print("Best score: ", str(best_move_score))
-    print("Best move: ", str(best_move))
+    tt_stats = transposition_table.stats()
+    print("Best score: ", score_to_string(white_sign * best_move_score) if best_move_score is not None else None)
+    print("Best move: ", me.move_to_uci(best_move) if best_move is not None else None)
+    print("Depth reached: ", str(search_stats['depth']))
     print("Moves evaluated: ", str(move_count))
     print("Evals/sec: {0:.1f}".format(move_count / (toc - tic)))
     print("Time: {0:.1f}s".format((toc - tic)))
+    print("TT hit rate: {0:.1%}, cutoff rate: {1:.1%}, collision rate: {2:.1%}, fill: {3:.1%}".format(
+        tt_stats['hit_rate'], tt_stats['cutoff_rate'], tt_stats['collision_rate'], tt_stats['fill']))
+    print("QS nodes: {0} ({1:.1%} of all nodes), node limit hits: {2}, depth limit hits: {3}, delta pruned: {4}".format(
+        search_stats['qs_nodes'], search_stats['qs_nodes'] / max(move_count, 1), search_stats['qs_node_limit_hits'],
+        search_stats['qs_depth_limit_hits'], search_stats['qs_delta_pruned']))
+    print("Beta cutoffs: {0}, first move cutoff rate: {1:.1%}, PVS re-searches: {2}, aspiration re-searches: {3}".format(
+        search_stats['cutoffs'], search_stats['first_move_cutoffs'] / max(search_stats['cutoffs'], 1),
+        search_stats['pvs_researches'], search_stats['aspiration_researches']))
+    print("Null move cutoffs: {0}, late move reductions: {1} ({2} re-searched)".format(
+        search_stats['null_move_cutoffs'], search_stats['lmr_reductions'], search_stats['lmr_researches']))
+    if square_bonus and c.pawn_structure:
+        pawn_stats = pawns.get_pawn_table().stats()
+        print("Pawn hash hit rate: {0:.1%} ({1} probes)".format(pawn_stats['hit_rate'], pawn_stats['probes']))
 
     return best_move
 
 
+def search_root(depth, board, possible_moves, alpha, beta, square_bonus, transposition_table, move_orderer,
+                move_scores, iteration):
+    """
+    One pass over the root moves with principal variation search (the first move gets the full window, the rest a
+    null window and are only re-searched if they beat alpha)
+    :param move_scores: dict filled with the score of each root move (bounds for moves that didn't beat alpha)
+    :param iteration: dict of the best move/score so far, updated as moves beat alpha so a stopped search can use it
+    :return: best score (<= alpha on fail low, >= beta on fail high)
+    """
+    best_score = -infinity
+    for move_index, move in enumerate(possible_moves):
+        board.make_move(move)
+        if move_index == 0:
+            score = -negamax(depth - 1, board, -beta, -alpha, 1, square_bonus, transposition_table, move_orderer)
+        else:
+            score = -negamax(depth - 1, board, -alpha - 1, -alpha, 1, square_bonus, transposition_table,
+                             move_orderer)
+            if alpha < score < beta:
+                search_stats['pvs_researches'] += 1
+                score = -negamax(depth - 1, board, -beta, -alpha, 1, square_bonus, transposition_table,
+                                 move_orderer)
+        board.unmake_move()  # Take away the proposed move
+        move_scores[move] = score
+
+        if score > best_score:
+            best_score = score
+            if score > alpha:
+                alpha = score
+                iteration.update(best_move=move, best_score=score)
+                if alpha >= beta:
+                    break
+    return best_score
+
+
+def stop_search():
+    """
+    Asks the running search to stop, minimaxRoot then returns the best move found so far
+    """
+    search_limits['stop'] = True
+
+
+def check_search_limits():
+    """
+    Raises SearchStopped once the budget of the current search is used up
+    """
+    if search_limits['stop'] or \
+            (search_limits['stop_event'] is not None and search_limits['stop_event'].is_set()) or \
+            (search_limits['deadline'] is not None and time.perf_counter() >= search_limits['deadline']) or \
+            (search_limits['node_limit'] is not None and
+             search_stats['nodes'] + search_stats['qs_nodes'] >= search_limits['node_limit']):
+        raise SearchStopped()
+
+
+def unwind(board, ply):
+    """
+    Takes back the moves (and null moves) of a stopped search
+    :param board: game instance
+    :param ply: length of the move log to return to
+    """
+    while len(board.move_log) > ply:
+        if board.move_log[-1] is None:
+            board.unmake_null_move()
+        else:
+            board.unmake_move()
+
+
+def principal_variation(board, transposition_table, max_length):
+    """
+    Principal variation following the hash moves stored in the transposition table
+    :param board: game instance (left unchanged)
+    :param transposition_table: TranspositionTable
+    :param max_length: maximum number of moves
+    :return: list of moves as uci strings (e.g. 'e2e4')
+    """
+    pv = []
+    for _ in range(max_length):
+        entry = transposition_table.probe(board.zobrist_key)
+        if entry is None or entry[4] is None or entry[4] not in board.get_all_legal_moves():
+            break
+        pv.append(me.move_to_uci(entry[4]))
+        board.make_move(entry[4])
+    for _ in pv:
+        board.unmake_move()
+    return pv
+
+
+def get_transposition_table():
+    """
+    Shared transposition table, created on first use so entries carry over between moves
+    :return: TranspositionTable
+    """
+    global _transposition_table
+    if _transposition_table is None:
+        _transposition_table = tt.TranspositionTable(c.transposition_table_mb)
+    return _transposition_table
+
+
+def new_game(fen):
+    """
+    Game instance of the configured move generation backend (c.game_backend), both share the same move API
+    :param fen: starting fen
+    :return: GameInstance or BitboardInstance
+    """
+    if c.game_backend == 'bitboard':
+        from BitboardInstance import BitboardInstance
+        return BitboardInstance(fen)
+    return GameInstance(fen)
+
+
+def get_move_orderer():
+    """
+    Shared move orderer, created on first use so the history heuristic carries over between moves
+    :return: MoveOrderer
+    """
+    global _move_orderer
+    if _move_orderer is None:
+        _move_orderer = mo.MoveOrderer()
+    return _move_orderer
+
+
 def random_possible_move(board, random_suffle=False, ):
-    possible_moves = list(board.legal_moves)
+    possible_moves = list(board.get_all_legal_moves())
     if random_suffle:
         random.shuffle(possible_moves)
     return possible_moves
 
 
-#@profile
-def minimax(depth, board, alpha, beta, is_maximizing, square_bonus, iterative_deeping=True):
-    # Reaching the maximum depth specified
-    if depth == 0:
-        # TODO - confused why the 'base' evaluation within the branch is always negated - assumed its wrt is_maximizing
-        return evaluation(board, square_bonus), 0  # currently a simple summation of piece values
-        # Fixme (59.3% of time spent here) ^
-
-    possible_moves = random_possible_move(board)
-
-    # Iterative deepening (TODO - confirm this is actually making improvements, should be ~10%)
-    # FIXME - nope, slows it way way down in terms of evals/sec (probably increases pruning count though?)
-    #  -> the implementation is slow?
-
-    if iterative_deeping and depth > 1:
-        move_score_array = []
-        for move in possible_moves:
-            move_score_array.append([move, (evaluation(board, square_bonus=False))])  # Fixme (21.5% of time spent here)
-        move_score_array = sorted(move_score_array, key=lambda x: x[1])
-        if is_maximizing:
-            move_score_array.reverse()
-        possible_moves = [item[0] for item in move_score_array]
-
-    best_move_score = -9999 if is_maximizing else 9999
-    best_move = None
-    move_count = 0
-    for move_str in possible_moves:
-        move_count += 1
-        move = chess.Move.from_uci(str(move_str))
-        board.push(move)
+def score_to_tt(score, ply):
+    """
+    Mate scores are stored as distance to mate from the node (not the root) so they can be reused at any ply
+    """
+    if score >= mate_threshold:
+        return score + ply
+    if score <= -mate_threshold:
+        return score - ply
+    return score
 
-        # Move down branch, switching turn and passing down alpha, beta
-        # TODO - a bit confused about the structure and direction of this graph, kinda opposite to video I saw
-        proposed_move_score, sub_tree_moves = minimax(depth - 1, board, alpha, beta, not is_maximizing, square_bonus)
-        move_count += sub_tree_moves
 
-        if is_maximizing:
+def score_from_tt(score, ply):
+    if score >= mate_threshold:
+        return score - ply
+    if score <= -mate_threshold:
+        return score + ply
+    return score
 
-            if proposed_move_score > best_move_score:
-                best_move_score = max(best_move_score, proposed_move_score)
-                alpha = max(alpha, best_move_score)  # Update alpha if best_move is better (higher) then prior alpha
-                best_move = move
 
-        else:
-            if proposed_move_score < best_move_score:
-                best_move_score = min(best_move_score, proposed_move_score)
-                beta = min(beta, best_move_score)  # Update beta if best_move is better (lower) then prior beta
-                best_move = move
+def score_to_string(score):
+    """
+    :param score: search score
+    :return: centipawns, or 'mate N'/'mate -N' (moves, not plies) for mate scores
+    """
+    if score >= mate_threshold:
+        return 'mate {}'.format((mate_score - score + 1) // 2)
+    if score <= -mate_threshold:
+        return 'mate -{}'.format((mate_score + score + 1) // 2)
+    return str(score)
 
-        board.pop()  # Take away the proposed move
 
-        # TODO - confused about this end condition for the branch
-        if beta <= alpha:  #
-            # print('pruned!')
-            return best_move_score, move_count
+def has_non_pawn_material(board):
+    """
+    Does the side to move have a piece besides pawns and the king - without one zugzwang is common and a null move
+    (passing) can't be assumed to be worse than the best move
+    """
+    return board.has_non_pawn_material()
 
-    return best_move_score, move_count
 
+#@profile
+def negamax(depth, board, alpha, beta, ply, square_bonus, transposition_table=None, move_orderer=None,
+            allow_null=True):
+    """
+    Alpha-beta search in negamax form with principal variation search https://www.chessprogramming.org/Negamax
+    Scores are from the side to move's point of view, mates are scored mate_score - plies from the root
+    :param depth: remaining depth
+    :param board: game instance
+    :param alpha: score the side to move is already guaranteed
+    :param beta: score the opponent is already guaranteed (negated)
+    :param ply: plies from the root
+    :param square_bonus: include the square bonus in the evaluation
+    :param transposition_table: TranspositionTable (or None)
+    :param move_orderer: MoveOrderer (defaults to the shared one)
+    :param allow_null: try null move pruning (False straight after a null move)
+    :return: score
+    """
+    search_stats['nodes'] += 1
+    if not search_stats['nodes'] & (limit_check_interval - 1):
+        check_search_limits()
 
-def negamax(depth, board, alpha, beta, color):
+    # Reaching the maximum depth specified
     if depth == 0:
-        return evaluation(board)
-    leg_moves = board.legal_moves
-    for i_move in leg_moves:
-        move = chess.Move.from_uci(str(i_move))
-        board.push(move)
-        value = -negamax(depth - 1, board, -beta, -alpha, -color)
-        board.pop()
-        alpha = max(alpha, value)
-        if beta <= alpha:
-            return value
-    return value
+        if c.quiescence:
+            # Captures are played out so the leaf isn't scored in the middle of an exchange (horizon effect)
+            return quiescence(board, alpha, beta, square_bonus, ply=ply)
+        score = evaluation(board, square_bonus)  # currently a simple summation of piece values
+        return score if board.is_whites_turn else -score
+
+    # Mate distance pruning - a shorter mate has already been found elsewhere in the tree
+    alpha = max(alpha, -mate_score + ply)
+    beta = min(beta, mate_score - ply - 1)
+    if alpha >= beta:
+        return alpha
+
+    # Transposition table - scores are stored from the side to move's point of view
+    hash_move = None
+    if transposition_table is not None:
+        entry = transposition_table.probe(board.zobrist_key)
+        if entry is not None:
+            _, entry_depth, entry_score, entry_bound, hash_move, _ = entry
+            entry_score = score_from_tt(entry_score, ply)
+            if entry_depth >= depth and (entry_bound == tt.exact or
+                                         (entry_bound == tt.lower_bound and entry_score >= beta) or
+                                         (entry_bound == tt.upper_bound and entry_score <= alpha)):
+                transposition_table.cutoffs += 1
+                return entry_score
+    alpha_original = alpha
+
+    # Frontier - without quiescence the children are only statically scored, so they are all scored in one numpy
+    # batch (vector_evaluation) instead of being made and unmade one at a time
+    if depth == 1 and c.vectorized_frontier and not c.quiescence:
+        possible_moves = board.get_all_legal_moves()
+        if possible_moves:
+            import vector_evaluation as ve  # note - numpy is only loaded when the switch is on
+            scores = ve.evaluate_children(board, possible_moves, square_bonus)
+            if not board.is_whites_turn:
+                scores = -scores
+            best_index = int(scores.argmax())
+            search_stats['nodes'] += len(possible_moves)
+            if transposition_table is not None:
+                transposition_table.store(board.zobrist_key, depth, int(scores[best_index]), tt.exact,
+                                          possible_moves[best_index])
+            return int(scores[best_index])
+
+    if move_orderer is None:
+        move_orderer = get_move_orderer()
+    in_check = board.king_in_check()
+
+    # Null move pruning https://www.chessprogramming.org/Null_Move_Pruning - if passing still fails high on a
+    # reduced search, a real move will too. Not tried in check (passing would be illegal), at PV nodes, near mate
+    # scores or with only pawns left (zugzwang)
+    if c.null_move_pruning and allow_null and depth >= c.null_move_min_depth and beta - alpha == 1 and \
+            not in_check and abs(beta) < mate_threshold and has_non_pawn_material(board):
+        board.make_null_move()
+        score = -negamax(max(depth - 1 - c.null_move_reduction, 0), board, -beta, -beta + 1, ply + 1, square_bonus,
+                         transposition_table, move_orderer, allow_null=False)
+        board.unmake_null_move()
+        if score >= beta:
+            search_stats['null_move_cutoffs'] += 1
+            return beta
+
+    best_move_score = -infinity
+    best_move = None
+    move_count = 0
+    # Staged ordering - hash move, good captures, killers, history ordered quiet moves, bad captures
+    for move_index, move in enumerate(move_orderer.ordered_moves(board, hash_move)):
+        move_count += 1
+        # Late move reductions https://www.chessprogramming.org/Late_Move_Reductions - quiet moves late in the
+        # ordering rarely turn out best, so they are searched shallower and only re-searched if they beat alpha
+        reduction = 0
+        if c.late_move_reductions and move_index >= c.lmr_min_moves and depth >= c.lmr_min_depth and \
+                not in_check and not mo.is_capture(board, move):
+            reduction = c.lmr_reduction
+        board.make_move(move)
+        if reduction and board.king_in_check():
+            reduction = 0  # note - checking moves aren't reduced
+
+        # Principal variation search - once a move has been searched with the full window the rest only need to be
+        # proven worse, which a null window (alpha, alpha + 1) does with fewer nodes. A move that beats alpha is
+        # re-searched with the full window for its exact score
+        if move_index == 0:
+            score = -negamax(depth - 1, board, -beta, -alpha, ply + 1, square_bonus, transposition_table, move_orderer)
+        else:
+            if reduction:
+                search_stats['lmr_reductions'] += 1
+                score = -negamax(depth - 1 - reduction, board, -alpha - 1, -alpha, ply + 1, square_bonus,
+                                 transposition_table, move_orderer)
+                if score > alpha:
+                    search_stats['lmr_researches'] += 1
+            if not reduction or score > alpha:
+                score = -negamax(depth - 1, board, -alpha - 1, -alpha, ply + 1, square_bonus, transposition_table,
+                                 move_orderer)
+            if alpha < score < beta:
+                search_stats['pvs_researches'] += 1
+                score = -negamax(depth - 1, board, -beta, -alpha, ply + 1, square_bonus, transposition_table,
+                                 move_orderer)
+
+        board.unmake_move()  # Take away the proposed move
+
+        if score > best_move_score:
+            best_move_score = score
+            best_move = move
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    search_stats['cutoffs'] += 1
+                    if move_index == 0:
+                        search_stats['first_move_cutoffs'] += 1
+                    if not mo.is_capture(board, move):
+                        move_orderer.update(board, move, depth)
+                    break
+
+    if move_count == 0:
+        return -mate_score + ply if in_check else 0  # checkmate or stalemate
+
+    if transposition_table is not None:
+        if best_move_score <= alpha_original:
+            bound = tt.upper_bound
+        elif best_move_score >= beta:
+            bound = tt.lower_bound
+        else:
+            bound = tt.exact
+        transposition_table.store(board.zobrist_key, depth, score_to_tt(best_move_score, ply), bound, best_move)
+
+    return best_move_score
+
+
+def quiescence(board, alpha, beta, square_bonus, qs_depth=0, ply=0):
+    """
+    Capture only search below the negamax leaves https://www.chessprogramming.org/Quiescence_Search
+    The side to move can "stand pat" on the static evaluation, captures are tried in MVV-LVA order and skipped when
+    even winning the piece can't reach alpha (delta pruning). In check there is no stand pat and every evasion is
+    searched, so a mate at the horizon isn't scored as the static evaluation
+    :param board: game instance
+    :param alpha: score the side to move is already guaranteed
+    :param beta: score the opponent is already guaranteed (negated)
+    :param square_bonus: include the square bonus in the evaluation
+    :param qs_depth: plies below the negamax leaf
+    :param ply: plies from the root (for the mate scores)
+    :return: score (side to move positive)
+    """
+    if qs_depth:
+        search_stats['qs_nodes'] += 1  # note - the leaf itself is counted as a negamax node
+        if not search_stats['qs_nodes'] & (limit_check_interval - 1):
+            check_search_limits()
+
+    if qs_depth >= c.quiescence_max_depth or search_stats['qs_nodes'] >= c.quiescence_max_nodes:
+        if qs_depth >= c.quiescence_max_depth:
+            search_stats['qs_depth_limit_hits'] += 1
+        else:
+            search_stats['qs_node_limit_hits'] += 1
+        score = evaluation(board, square_bonus)
+        return score if board.is_whites_turn else -score
+
+    in_check = board.king_in_check()
+    if in_check:
+        moves = board.get_all_legal_moves(buffer=True)
+        if not moves:
+            return -mate_score + ply
+        # note - all evasions, captures first
+        moves = mo.ordered_captures(board, moves) + [move for move in moves if not mo.is_capture(board, move)]
+        best_score = -infinity
+    else:
+        stand_pat = evaluation(board, square_bonus)
+        if not board.is_whites_turn:
+            stand_pat = -stand_pat
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        moves = mo.ordered_captures(board, board.get_all_legal_moves(buffer=True))
+        best_score = stand_pat
+
+    for move in moves:
+        # Delta pruning - material won by the capture (+ promotion) plus a margin (no stand pat to prune against in
+        # check)
+        if not in_check:
+            gain = s.mvv_lva_by_type[board.board[move >> 7 & me.square_mask] & s.piece_type_mask] + \
+                c.quiescence_delta_margin
+            flag = move >> me.flag_shift & 7
+            if flag == me.en_passant:
+                gain += s.mvv_lva_by_type[s.pawn]
+            elif flag >= me.promotion:
+                gain += s.mvv_lva_by_type[me.promotion_piece(move)] - s.mvv_lva_by_type[s.pawn]
+            if stand_pat + gain < alpha:
+                search_stats['qs_delta_pruned'] += 1
+                continue
+
+        board.make_move(move)
+        score = -quiescence(board, -beta, -alpha, square_bonus, qs_depth + 1, ply + 1)
+        board.unmake_move()
+
+        if score > best_score:
+            best_score = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+
+    return best_score
 
 
 #@profile
 def evaluation(board, square_bonus=True):
-    board_total = 0
-    piece_map = board.piece_map2()
-    for square_id, piece in piece_map.items():
-        # for i in range(64):
-        # piece = board.piece_at(i)
-        # if piece is not None:
-
-        # Unpacking
-        piece_str = piece.symbol()
-        # piece_str = chess.piece_symbol(board.piece_at(square_id).piece_type)
-        color = piece.color
-
-        sign = 1 if color else -1
-        board_total += sign * (getPieceValue(piece_str) + getPieceSqauareBonus(piece_str, square_id, color))
-
-    return board_total
-
-
-def getPieceValue(piece):
-    if piece is None:
-        return 0
-
-    # TODO - make this more robust so it doesn't break if something weird is passed
-    # https://www.chessprogramming.org/Simplified_Evaluation_Function#Piece_Values
-    piece_dict = {"P": 100,
-                  "N": 320,
-                  "B": 330,
-                  "R": 500,
-                  "Q": 900,
-                  "K": 20000}
-
-    return piece_dict[piece.upper()]
-
-
-def getPieceSqauareBonus(piece, position, is_maximizing):
-    if not is_maximizing:
-        position = 63 - position
-    pos = 64 - (position // 8 + 1) * 8 + position - (position // 8) * 8  # TODO - fix this, think it is wrong!
-    # print(piece, position,pos, bonus_dict[piece.upper()][pos])
-    return BOUNDS_DICT[piece.upper()][pos]
+    """
+    Static evaluation (white positive) - material, tapered square bonus, pawn structure and the attack map terms
+    :param board: game instance
+    :param square_bonus: False for material only
+    :return: score
+    """
+    if board.incremental_evaluation:
+        # Kept up to date by make/unmake
+        material_score, square_bonus_score = board.material_score, board.square_bonus_score
+        end_game_score, phase = board.end_game_score, board.phase
+    else:
+        # note - same tables as the incremental scores, so turning c.incremental_evaluation off gives the same values
+        material_score, square_bonus_score, end_game_score, phase = board.compute_evaluation()
+    if not square_bonus:
+        return material_score
+
+    score = material_score + square_bonus_score
+    if c.tapered_evaluation:
+        # Tapered - mid game square bonus weighted by the phase, end game square bonus by the rest
+        if phase < max_phase:  # note - can go over max_phase after promotions
+            score = material_score + (square_bonus_score * phase + end_game_score * (max_phase - phase)) // max_phase
+    if c.pawn_structure:
+        score += pawns.evaluate(board)
+    if board.attack_maps:
+        score += am.evaluate(board)
+    return score
 
 
 def main():
-    board = chess.Board()
+    board = new_game('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1')
     n = 0
-    print(board)
     while n < 100:
         if n % 2 == 0:
-            move = input("Enter move: ")
-            move = chess.Move.from_uci(str(move))
-            print(move)
-            board.push(move)
+            move_str = input("Enter move: ")
+            move = me.uci_to_move(board, move_str.strip())
+            if move is None:
+                print('Illegal move')
+                continue
+            board.make_move(move)
         else:
             print("Computers Turn:")
-            move = minimaxRoot(3, board, True)
-            move = chess.Move.from_uci(str(move))
-            board.push(move)
-            print(move)
-        print(board)
+            move = minimaxRoot(c.max_search_depth, board, board.is_whites_turn, time_limit=c.search_time_limit)
+            board.make_move(move)
+            print(me.move_to_uci(move))
         n += 1
 
 
@@ -0,0 +1,598 @@
+import sys
+import time
+
+import fen_logic as fl
+import fen_settings as s
+import config as c
+import move_encoding as me
+import zobrist as zb
+from GameInstance import GameInstance, move_counter, move_counter2
+
+# Bitboards https://www.chessprogramming.org/Bitboards
+# note - bit i is square i of s.square_id_to_index_64 (a1 = 0, h8 = 63). Moves still use the mailbox square ids so
+# the search, transposition table and evaluation tables work unchanged with either backend
+
+full_board = (1 << 64) - 1
+colors = s.white | s.black
+# note - packed move fields as module globals, hot loops (see move_encoding)
+square_mask, flag_shift, score_shift, move_base = me.square_mask, me.flag_shift, me.score_shift, me.move_base
+not_a_file = full_board ^ sum(1 << (rank * 8) for rank in range(8))
+not_h_file = full_board ^ sum(1 << (rank * 8 + 7) for rank in range(8))
+rank_3 = 0xFF << 16
+rank_6 = 0xFF << 40
+promotion_ranks = (0xFF << 56) | 0xFF
+
+# Single bit of each mailbox square (0 off the board)
+square_bits = [0] * s.board_square_count
+for square in s.real_board_squares:
+    square_bits[square] = 1 << s.square_id_to_index_64[square]
+
+
+def bit_squares(bits):
+    """
+    Mailbox square ids of the set bits of a bitboard
+    :param bits: bitboard
+    :return: list of square ids (a1 first)
+    """
+    squares = []
+    while bits:
+        bit = bits & -bits
+        squares.append(s.index_64_to_square_id[bit.bit_length() - 1])
+        bits ^= bit
+    return squares
+
+
+def ray_squares(square, direction):
+    """
+    Squares stepped over from a square (not included) to the edge of the board
+    :param square: mailbox square id
+    :param direction: mailbox step direction
+    :return: list of square ids
+    """
+    squares = []
+    square += direction
+    while square_bits[square]:
+        squares.append(square)
+        square += direction
+    return squares
+
+
+def line_table(square, directions):
+    """
+    Classical ray attacks of a slider along one line for every blocker set on that line. The last square of each ray
+    can't block anything past it so it is left out of the mask (at most 6 bits -> 64 entries)
+    :param square: mailbox square id
+    :param directions: the two opposite directions of the line
+    :return: mask, dict of (blockers & mask) -> attacks
+    """
+    rays = [ray_squares(square, direction) for direction in directions]
+    mask = sum(square_bits[ray_square] for ray in rays for ray_square in ray[:-1])
+
+    table = {}
+    blockers = 0
+    while True:
+        attacks = 0
+        for ray in rays:
+            for ray_square in ray:
+                attacks |= square_bits[ray_square]
+                if blockers & square_bits[ray_square]:
+                    break
+        table[blockers] = attacks
+
+        blockers = (blockers - mask) & mask  # next subset of the mask (carry rippler)
+        if blockers == 0:
+            return mask, table
+
+
+# Attack tables, indexed by bit
+knight_attacks = [sum(square_bits[square + step] for step in s.knight_moves) for square in s.index_64_to_square_id]
+king_attacks = [sum(square_bits[square + step] for step in s.linear_dirs + s.diagonal_dirs)
+                for square in s.index_64_to_square_id]
+pawn_attacks = {s.white: [square_bits[square - 11] | square_bits[square - 9] for square in s.index_64_to_square_id],
+                s.black: [square_bits[square + 9] | square_bits[square + 11] for square in s.index_64_to_square_id]}
+rook_lines = [(line_table(square, (-10, 10)), line_table(square, (-1, 1))) for square in s.index_64_to_square_id]
+bishop_lines = [(line_table(square, (-11, 11)), line_table(square, (-9, 9))) for square in s.index_64_to_square_id]
+
+# Squares strictly between two aligned squares, and the full line through them (0 if not aligned)
+between = [[0] * 64 for _ in range(64)]
+line_through = [[0] * 64 for _ in range(64)]
+for square in s.real_board_squares:
+    index = s.square_id_to_index_64[square]
+    for direction in s.linear_dirs + s.diagonal_dirs:
+        line = square_bits[square] | sum(square_bits[ray_square] for ray_square in ray_squares(square, direction) +
+                                         ray_squares(square, -direction))
+        passed = 0
+        for ray_square in ray_squares(square, direction):
+            between[index][s.square_id_to_index_64[ray_square]] = passed
+            line_through[index][s.square_id_to_index_64[ray_square]] = line
+            passed |= square_bits[ray_square]
+
+# Castling - s.castling_paths with the empty squares as a bitboard and the king path as 64 square indices
+castling_paths = {king_end: (right, king_start, sum(square_bits[square] for square in path),
+                             [s.square_id_to_index_64[square] for square in king_path])
+                  for king_end, (right, king_start, path, king_path) in s.castling_paths.items()}
+
+
+def knight_attack(index, occupied):
+    return knight_attacks[index]
+
+
+def bishop_attack(index, occupied):
+    (mask_1, table_1), (mask_2, table_2) = bishop_lines[index]
+    return table_1[occupied & mask_1] | table_2[occupied & mask_2]
+
+
+def rook_attack(index, occupied):
+    (mask_1, table_1), (mask_2, table_2) = rook_lines[index]
+    return table_1[occupied & mask_1] | table_2[occupied & mask_2]
+
+
+def queen_attack(index, occupied):
+    return bishop_attack(index, occupied) | rook_attack(index, occupied)
+
+
+# Non pawn/king pieces - piece type, attack function, mid game square table
+piece_moves = [(s.knight, knight_attack, s.knight_mid),
+               (s.bishop, bishop_attack, s.bishop_mid),
+               (s.rook, rook_attack, s.rook_mid),
+               (s.queen, queen_attack, s.queen_mid)]
+
+
+class BitboardInstance(GameInstance):
+    """
+    Bitboard backend with the same make_move/unmake_move/get_all_legal_moves API (and packed moves) as GameInstance.
+    The mailbox board is still kept up to date for piece lookups, the zobrist key and the evaluation tables.
+    Moves are fully legal (pins, en passant discovered checks, castling and underpromotions are all handled)
+    """
+
+    def __init__(self, starting_fen):
+
+        self.starting_fen = starting_fen
+        self.board, self.castling_rights, self.en_passant_square, self.half_move, self.full_move, self.is_whites_turn = \
+            fl.decode_fen(self.starting_fen)
+
+        # Bitboard of each piece code, bitboards[s.white]/bitboards[s.black] (no piece type bits) hold all the
+        # pieces of that color
+        self.bitboards = self.compute_bitboards()
+
+        self.game_constants = {"A": [self.game_constant_A(), self.game_constant_A],
+                               "B": [self.game_constant_B(), self.game_constant_B]}
+        self.update_game_constants()
+
+        self.has_castled = {'w': False, 'b': False}
+        self.is_in_check = False
+        self.possible_moves = []
+        self.turn = self.update_turn()
+
+        self.verify_zobrist = c.verify_zobrist
+        self.zobrist_key = self.compute_zobrist_key()
+        self.pawn_key = zb.hash_pawns(self.board)
+
+        self.incremental_evaluation = c.incremental_evaluation
+        self.verify_evaluation = c.verify_evaluation
+        self.material_score, self.square_bonus_score, self.end_game_score, self.phase = self.compute_evaluation()
+        self.attack_maps = False  # note - mailbox only, attackers() is already a few bitboard lookups here
+
+        self.bitboards_stack = []
+        self.init_undo_stack()
+        self.get_all_possible_moves()
+
+    def compute_bitboards(self):
+        """
+        Builds the bitboards from the mailbox board (make/unmake keep them up to date afterwards)
+        :return: list of bitboards indexed by piece code
+        """
+        bitboards = [0] * s.piece_code_count
+        for square in s.real_board_squares:
+            piece = self.board[square]
+            if piece != s.empty:
+                bitboards[piece] |= square_bits[square]
+                bitboards[piece & colors] |= square_bits[square]
+        return bitboards
+
+    @property
+    def piece_lists(self) -> list:
+        """
+        Squares of each piece indexed by piece code, same layout as the GameInstance piece lists
+        """
+        return [bit_squares(bits) if code & s.piece_type_mask else [] for code, bits in enumerate(self.bitboards)]
+
+    def has_non_pawn_material(self):
+        """
+        Does the side to move have a knight, bishop, rook or queen - its piece bitboards, without building the piece
+        lists
+        """
+        color = s.white if self.is_whites_turn else s.black
+        bitboards = self.bitboards
+        return (bitboards[color | s.knight] | bitboards[color | s.bishop] | bitboards[color | s.rook] |
+                bitboards[color | s.queen]) != 0
+
+    def piece_squares(self, code):
+        """
+        Squares of one piece code (from its bitboard)
+        """
+        return bit_squares(self.bitboards[code])
+
+    def grow_undo_stack(self, plies):
+        super().grow_undo_stack(plies)
+        self.bitboards_stack += [[0] * s.piece_code_count for _ in range(plies)]
+
+    def make_move(self, move):
+
+        ply = len(self.move_log)
+        if ply + 1 >= len(self.undo_stack):
+            self.grow_undo_stack(len(self.undo_stack))
+
+        start_square = move & square_mask
+        end_square = move >> 7 & square_mask
+        flag = move >> flag_shift & 7
+
+        board = self.board
+        piece_moved = board[start_square]
+        piece_captured = board[end_square]
+        color = piece_moved & colors
+
+        # note - copy make for the bitboards (into the next ply's preallocated list), unmake_move puts the undo
+        # stack's reference to the previous list back
+        undo = self.undo_stack[ply]
+        undo[0] = piece_moved
+        undo[1] = piece_captured
+        undo[2] = self.en_passant_square
+        undo[3] = self.castling_rights
+        undo[4] = self.half_move
+        undo[5] = self.full_move
+        undo[6] = self.zobrist_key
+        undo[7] = self.material_score
+        undo[8] = self.square_bonus_score
+        undo[9] = self.end_game_score
+        undo[10] = self.phase
+        undo[11] = self.pawn_key
+        undo[12] = self.bitboards
+        self.move_log.append(move)
+        bitboards = self.bitboards_stack[ply + 1]
+        bitboards[:] = self.bitboards
+        self.bitboards = bitboards
+
+        start_bit = square_bits[start_square]
+        end_bit = square_bits[end_square]
+        key = self.zobrist_key ^ zb.piece_keys[piece_moved][start_square] ^ zb.black_to_move_key
+        material_change = 0
+        square_bonus_change = -s.square_bonus_values[piece_moved][start_square]
+        end_game_change = -s.end_game_values[piece_moved][start_square]
+        phase_change = 0
+
+        if self.en_passant_square is not None:
+            key ^= zb.en_passant_keys[self.en_passant_square % 10]
+            self.en_passant_square = None
+
+        bitboards[piece_moved] ^= start_bit
+        bitboards[color] ^= start_bit | end_bit
+        if piece_captured != s.empty:
+            key ^= zb.piece_keys[piece_captured][end_square]
+            bitboards[piece_captured] ^= end_bit
+            bitboards[piece_captured & colors] ^= end_bit
+            material_change -= s.material_values[piece_captured]
+            square_bonus_change -= s.square_bonus_values[piece_captured][end_square]
+            end_game_change -= s.end_game_values[piece_captured][end_square]
+            phase_change -= s.phase_values[piece_captured]
+            if piece_captured & s.piece_type_mask == s.pawn:
+                self.pawn_key ^= zb.piece_keys[piece_captured][end_square]
+
+        piece_placed = piece_moved
+        if flag:
+            if flag == me.two_square_pawn:
+                self.en_passant_square = (start_square + end_square) // 2
+                key ^= zb.en_passant_keys[self.en_passant_square % 10]
+
+            elif flag == me.en_passant:
+                taken_piece_square = end_square + 10 if color == s.white else end_square - 10
+                taken_piece = board[taken_piece_square]
+                board[taken_piece_square] = s.empty
+                bitboards[taken_piece] ^= square_bits[taken_piece_square]
+                bitboards[taken_piece & colors] ^= square_bits[taken_piece_square]
+                key ^= zb.piece_keys[taken_piece][taken_piece_square]
+                material_change -= s.material_values[taken_piece]
+                square_bonus_change -= s.square_bonus_values[taken_piece][taken_piece_square]
+                end_game_change -= s.end_game_values[taken_piece][taken_piece_square]
+                self.pawn_key ^= zb.piece_keys[taken_piece][taken_piece_square]
+
+            elif flag >= me.promotion:
+                piece_placed = color | me.promotion_piece(move)
+                material_change += s.material_values[piece_placed] - s.material_values[piece_moved]
+                phase_change += s.phase_values[piece_placed]
+
+            elif flag == me.castle:
+                _, rook_start, rook_end = s.castling_moves[end_square]
+                rook = color | s.rook
+                board[rook_start] = s.empty
+                board[rook_end] = rook
+                rook_bits = square_bits[rook_start] | square_bits[rook_end]
+                bitboards[rook] ^= rook_bits
+                bitboards[color] ^= rook_bits
+                key ^= zb.piece_keys[rook][rook_start] ^ zb.piece_keys[rook][rook_end]
+                square_bonus_change += s.square_bonus_values[rook][rook_end] - s.square_bonus_values[rook][rook_start]
+                end_game_change += s.end_game_values[rook][rook_end] - s.end_game_values[rook][rook_start]
+
+        board[start_square] = s.empty
+        board[end_square] = piece_placed
+        bitboards[piece_placed] ^= end_bit
+        key ^= zb.piece_keys[piece_placed][end_square]
+        square_bonus_change += s.square_bonus_values[piece_placed][end_square]
+        end_game_change += s.end_game_values[piece_placed][end_square]
+
+        if self.castling_rights != '-' and (start_square in s.castling_rights_squares or
+                                            end_square in s.castling_rights_squares):
+            previous_castling_rights = self.castling_rights
+            self.update_castling_rights(start_square, end_square)
+            key ^= zb.castling_key(previous_castling_rights) ^ zb.castling_key(self.castling_rights)
+
+        self.zobrist_key = key
+        if piece_moved & s.piece_type_mask == s.pawn:
+            self.pawn_key ^= zb.piece_keys[piece_moved][start_square]
+            if piece_placed == piece_moved:
+                self.pawn_key ^= zb.piece_keys[piece_placed][end_square]
+        if self.incremental_evaluation:
+            self.material_score += material_change
+            self.square_bonus_score += square_bonus_change
+            self.end_game_score += end_game_change
+            self.phase += phase_change
+
+        self.half_move = 0 if piece_moved & s.piece_type_mask == s.pawn or piece_captured != s.empty else \
+            self.half_move + 1
+        if color == s.black:
+            self.full_move += 1
+        self.turn_over()
+
+        if self.verify_zobrist:
+            self.check_zobrist_key('make_move')
+        if self.verify_evaluation:
+            self.check_evaluation('make_move')
+
+    def unmake_move(self):
+
+        self.turn_over()
+
+        move = self.move_log.pop()
+        (piece_moved, piece_captured, self.en_passant_square, self.castling_rights, self.half_move, self.full_move,
+         self.zobrist_key, self.material_score, self.square_bonus_score, self.end_game_score, self.phase,
+         self.pawn_key, self.bitboards) = self.undo_stack[len(self.move_log)]
+        start_square = move & square_mask
+        end_square = move >> 7 & square_mask
+        flag = move >> flag_shift & 7
+
+        board = self.board
+        board[start_square] = piece_moved
+        board[end_square] = piece_captured
+
+        if flag == me.en_passant:
+            taken_piece_square = end_square + 10 if piece_moved & s.white else end_square - 10
+            board[taken_piece_square] = piece_moved ^ colors  # enemy pawn
+        elif flag == me.castle:
+            _, rook_start, rook_end = s.castling_moves[end_square]
+            board[rook_start] = board[rook_end]
+            board[rook_end] = s.empty
+
+        if self.verify_zobrist:
+            self.check_zobrist_key('unmake_move')
+        if self.verify_evaluation:
+            self.check_evaluation('unmake_move')
+
+    def attackers(self, index, occupied, color):
+        """
+        Pieces of a color attacking a square
+        :param index: bit index of the square
+        :param occupied: occupancy used for the sliding attacks
+        :param color: s.white or s.black
+        :return: bitboard of the attacking pieces
+        """
+        bitboards = self.bitboards
+        queens = bitboards[color | s.queen]
+        return ((knight_attacks[index] & bitboards[color | s.knight]) |
+                (king_attacks[index] & bitboards[color | s.king]) |
+                (pawn_attacks[color ^ colors][index] & bitboards[color | s.pawn]) |
+                (bishop_attack(index, occupied) & (bitboards[color | s.bishop] | queens)) |
+                (rook_attack(index, occupied) & (bitboards[color | s.rook] | queens)))
+
+    def check_check(self, square):
+        # Checks if the square is attacked by the side not to move
+        enemy = s.black if self.is_whites_turn else s.white
+        occupied = self.bitboards[s.white] | self.bitboards[s.black]
+        return self.attackers(s.square_id_to_index_64[square], occupied, enemy) != 0
+
+    def king_in_check(self):
+        color, enemy = (s.white, s.black) if self.is_whites_turn else (s.black, s.white)
+        occupied = self.bitboards[s.white] | self.bitboards[s.black]
+        return self.attackers(self.bitboards[color | s.king].bit_length() - 1, occupied, enemy) != 0
+
+    def get_all_possible_moves(self):
+        """
+        The bitboard generator is fully legal, possible_moves is kept for GameInstance compatibility
+        """
+        self.possible_moves = self.get_all_legal_moves()
+
+    #@profile
+    def get_all_legal_moves(self, buffer=False):
+
+        board = self.board
+        bitboards = self.bitboards
+        color, enemy = (s.white, s.black) if self.is_whites_turn else (s.black, s.white)
+        own = bitboards[color]
+        occupied = own | bitboards[enemy]
+        king_bit = bitboards[color | s.king]
+        king = king_bit.bit_length() - 1
+        index_to_square = s.index_64_to_square_id
+        mvv_lva = s.mvv_lva_by_type
+        if buffer:
+            moves = self.move_buffers[len(self.move_log)]
+            moves.clear()
+        else:
+            moves = []
+
+        checkers = self.attackers(king, occupied, enemy)
+        self.is_in_check = checkers != 0
+        if checkers & (checkers - 1):
+            # 2+ checks - only the king can move
+            self.get_bitboard_king_moves(king, own, occupied, enemy, moves)
+            return moves
+
+        # Destination squares - anywhere not holding an own piece, or blocking/taking the single checker
+        if checkers:
+            allowed = (between[king][checkers.bit_length() - 1] | checkers) & ~own
+        else:
+            allowed = full_board & ~own
+
+        # Pins - an own piece alone between the king and an enemy slider can only move along that line
+        pinned = 0
+        pin_lines = {}
+        queens = bitboards[enemy | s.queen]
+        snipers = ((rook_attack(king, 0) & (bitboards[enemy | s.rook] | queens)) |
+                   (bishop_attack(king, 0) & (bitboards[enemy | s.bishop] | queens)))
+        while snipers:
+            sniper = snipers & -snipers
+            snipers ^= sniper
+            sniper_index = sniper.bit_length() - 1
+            blockers = between[king][sniper_index] & occupied
+            if blockers & own and not blockers & (blockers - 1):
+                pinned |= blockers
+                pin_lines[blockers.bit_length() - 1] = line_through[king][sniper_index]
+
+        # Pawns - whole set pushes/captures, offset is end - start (in bits)
+        pawns = bitboards[color | s.pawn]
+        enemies = bitboards[enemy]
+        empty = full_board & ~occupied
+        if color == s.white:
+            single_push = (pawns << 8) & empty
+            pawn_targets = ((single_push, 8, me.normal),
+                            (((single_push & rank_3) << 8) & empty, 16, me.two_square_pawn),
+                            ((pawns << 7) & not_h_file & enemies, 7, me.normal),
+                            ((pawns << 9) & not_a_file & enemies, 9, me.normal))
+        else:
+            single_push = (pawns >> 8) & empty
+            pawn_targets = ((single_push, -8, me.normal),
+                            (((single_push & rank_6) >> 8) & empty, -16, me.two_square_pawn),
+                            ((pawns >> 9) & not_h_file & enemies, -9, me.normal),
+                            ((pawns >> 7) & not_a_file & enemies, -7, me.normal))
+
+        square_values = s.pawn_mid
+        for targets, offset, flag in pawn_targets:
+            flag_base = move_base + (flag << flag_shift)
+            targets &= allowed
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                end_index = bit.bit_length() - 1
+                start_index = end_index - offset
+                if pinned >> start_index & 1 and not pin_lines[start_index] & bit:
+                    continue
+
+                start_square, end_square = index_to_square[start_index], index_to_square[end_index]
+                capture_bonus = mvv_lva[board[end_square] & s.piece_type_mask]
+                if bit & promotion_ranks:
+                    for piece_type, promotion_values in s.promotion_moves:
+                        moves.append(me.encode_move(start_square, end_square, me.promotion_flags[piece_type],
+                                                    promotion_values[end_square] - square_values[start_square] +
+                                                    capture_bonus))
+                else:
+                    delta_eval = square_values[end_square] - square_values[start_square] + capture_bonus
+                    moves.append(flag_base + start_square + (end_square << 7) + (delta_eval << score_shift))
+
+        # En passant - checked by removing both pawns from the occupancy (covers discovered checks along the rank)
+        if self.en_passant_square is not None:
+            end_square = self.en_passant_square
+            end_bit = square_bits[end_square]
+            taken_bit = square_bits[end_square + 10 if color == s.white else end_square - 10]
+            candidates = pawn_attacks[enemy][end_bit.bit_length() - 1] & pawns
+            while candidates:
+                bit = candidates & -candidates
+                candidates ^= bit
+                if not self.attackers(king, (occupied ^ bit ^ taken_bit) | end_bit, enemy) & ~taken_bit:
+                    start_square = index_to_square[bit.bit_length() - 1]
+                    moves.append(me.encode_move(start_square, end_square, me.en_passant,
+                                                square_values[end_square] - square_values[start_square]))
+
+        # Knights, bishops, rooks and queens
+        for piece_type, attack_function, square_values in piece_moves:
+            pieces = bitboards[color | piece_type]
+            while pieces:
+                bit = pieces & -pieces
+                pieces ^= bit
+                start_index = bit.bit_length() - 1
+                targets = attack_function(start_index, occupied) & allowed
+                if pinned & bit:
+                    targets &= pin_lines[start_index]
+
+                start_square = index_to_square[start_index]
+                start_value = square_values[start_square]
+                base = start_square + move_base  # note - packed moves, + (end << 7) + (delta_eval << score_shift)
+                while targets:
+                    target = targets & -targets
+                    targets ^= target
+                    end_square = index_to_square[target.bit_length() - 1]
+                    delta_eval = square_values[end_square] - start_value + \
+                        mvv_lva[board[end_square] & s.piece_type_mask]
+                    moves.append(base + (end_square << 7) + (delta_eval << score_shift))
+
+        self.get_bitboard_king_moves(king, own, occupied, enemy, moves)
+
+        # Castling - rights are kept up to date by make_move so the king and rook are on their start squares
+        if not checkers and self.castling_rights != '-':
+            for king_end, (right, king_start, path, king_path) in castling_paths.items():
+                if right in self.castling_rights and board[king_start] == color | s.king and not path & occupied and \
+                        not any(self.attackers(index, occupied, enemy) for index in king_path):
+                    moves.append(me.encode_move(king_start, king_end, me.castle,
+                                                s.king_mid[king_end] - s.king_mid[king_start]))
+
+        return moves
+
+    def get_bitboard_king_moves(self, king, own, occupied, enemy, moves):
+        """
+        King steps to squares not attacked by the enemy (the king is removed from the occupancy so it can't hide
+        behind itself from a slider)
+        :param king: bit index of the king
+        :param own: own pieces bitboard
+        :param occupied: all pieces bitboard
+        :param enemy: enemy color
+        :param moves: list the moves are appended to
+        """
+        board = self.board
+        square_values = s.king_mid
+        start_square = s.index_64_to_square_id[king]
+        base = start_square + move_base
+        occupied ^= 1 << king
+
+        targets = king_attacks[king] & ~own
+        while targets:
+            target = targets & -targets
+            targets ^= target
+            end_index = target.bit_length() - 1
+            if not self.attackers(end_index, occupied, enemy):
+                end_square = s.index_64_to_square_id[end_index]
+                delta_eval = square_values[end_square] - square_values[start_square] + \
+                    s.mvv_lva_by_type[board[end_square] & s.piece_type_mask]
+                moves.append(base + (end_square << 7) + (delta_eval << score_shift))
+
+
+def benchmark(depth=4):
+    """
+    Perft race of the bitboard backend against the mailbox GameInstance and python-chess
+    :param depth: perft depth
+    """
+    import chess  # note - only needed for the race, keeps python-chess out of the engine imports
+
+    test_fens = {'start': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+                 'move_counter test': '1k1r4/pp1b1R2/3q2pp/4p3/2B5/4Q3/PPP2B2/2K5 b - - 0 1'}
+
+    for name, fen in test_fens.items():
+        print('{} position, depth {}'.format(name, depth))
+        for engine, counter, game in (('bitboard', move_counter, BitboardInstance(fen)),
+                                      ('mailbox', move_counter, GameInstance(fen)),
+                                      ('python-chess', move_counter2, chess.Board(fen))):
+            t0 = time.time()
+            move_count = counter(game, depth)
+            t1 = time.time()
+            print("  {:<12} {} boards, {:.2f} secs, {:.0f} boards/sec".format(
+                engine, move_count, t1 - t0, move_count / (t1 - t0)))
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
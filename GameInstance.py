@@ -1,141 +1,433 @@
+import attack_maps as am
 import fen_logic as fl
 import fen_settings as s
 import config as c
-import random
+import move_encoding as me
+import zobrist as zb
+import sys
 import time
-from numba import jit
-import chess
+
+# note - packed move fields as module globals, hot loops (see move_encoding)
+square_mask, flag_shift, score_shift, move_base = me.square_mask, me.flag_shift, me.score_shift, me.move_base
+# Undo stack slot - piece moved, piece captured, en passant square, castling rights, half move clock, full move
+# number, zobrist key, material, square bonus, end game square bonus, phase, pawn key, attack maps (bitboards for
+# BitboardInstance) - all from before the move. Slots are reused lists written field by field, so make_move doesn't
+# allocate a container per move
+undo_fields = 13
+
 
 class GameInstance:
     def __init__(self, starting_fen):
 
         self.starting_fen = starting_fen
+        # note - board is a bytearray of piece codes (see fen_settings), use get_square_info for the piece strings
         self.board, self.castling_rights, self.en_passant_square, self.half_move, self.full_move, self.is_whites_turn = \
             fl.decode_fen(self.starting_fen)
 
-        self.piece_dict = self.initialize_piece_dict()
-        self.initialize_piece_count_dict()
-        self.rook_columns_list, self.pawn_columns_list = [[], []], [[], []]
-        self.init_piece_columns()
+        # Piece lists - squares of each piece, indexed by piece code (color bit | piece type), kept up to date by
+        # make/unmake. Piece counts, king squares and the column trackers are all read from these
+        self.piece_lists = [[] for _ in range(s.piece_code_count)]
+        self.init_piece_lists()
 
         # Fixme - must be a better way then calling the function + adding it here?
         self.game_constants = {"A": [self.game_constant_A(), self.game_constant_A],
                                "B": [self.game_constant_B(), self.game_constant_B]}
         self.update_game_constants()
 
-        # Piece values (# note - currently just a running tally of the evaluation func for each piece)
-        self.piece_values = {'w': 0, 'b': 0}
-        self.init_piece_values()
-
-        # Init king positions
         self.has_castled = {'w': False, 'b': False}
-        self.king_location = {'w': 0, 'b': 0}  # TODO - think about a better way to store this data vs multiple dicts
-        self.init_king_positions()  # TODO - think it would be good to have this done for all pieces
 
-        # Get possible moves for a certain piece type
+        # Get possible moves for a certain piece type (indexed by piece code & s.piece_type_mask)
         self.possible_moves = []
-        self.move_functions = {'p': self.get_pawn_moves,
-                               'N': self.get_knight_moves,
-                               'B': self.get_bishop_moves,
-                               'R': self.get_rook_moves,
-                               'Q': self.get_queen_moves,
-                               'K': self.get_king_moves}
+        self.move_functions = [None,
+                               self.get_pawn_moves,
+                               self.get_knight_moves,
+                               self.get_bishop_moves,
+                               self.get_rook_moves,
+                               self.get_queen_moves,
+                               self.get_king_moves]
 
         self.turn = self.update_turn()
 
-        self.move_log = []
-
+        # Zobrist key of the current position, kept up to date by make_move/unmake_move
+        self.verify_zobrist = c.verify_zobrist
+        self.zobrist_key = self.compute_zobrist_key()
+        self.pawn_key = zb.hash_pawns(self.board)  # pawns only, see pawn_structure
+
+        # Evaluation (material + mid/end game square bonus, white positive) and game phase (see s.phase_values) -
+        # kept up to date by make/unmake when incremental, so a leaf evaluation is a lookup rather than a board scan
+        self.incremental_evaluation = c.incremental_evaluation
+        self.verify_evaluation = c.verify_evaluation
+        self.material_score, self.square_bonus_score, self.end_game_score, self.phase = self.compute_evaluation()
+
+        # Attack maps (see attack_maps) - when on, square attacked queries (king moves, castling, check detection)
+        # are lookups. make_move updates a copy (the next ply's preallocated maps), unmake_move restores the old ones
+        self.attack_maps = c.attack_maps
+        self.verify_attack_maps = c.verify_attack_maps
+        self.attack_counts = am.compute_attack_counts(self.board) if self.attack_maps else None
+        self.checks = []
+
+        self.init_undo_stack()
         self.get_all_possible_moves()
 
     def get_legal_moves(self):
         self.get_all_possible_moves()
         return self.possible_moves
 
-    #@profile
-    def make_move(self, move):
-
-        # unpacking FIXME - don't like how unclear this is
-        [start_square, end_square, move_type, delta_eval] = move
-
-        piece_moved = self.board[start_square]
-        piece_captured = self.board[end_square]
+    def init_undo_stack(self):
+        """
+        Undo stack - make_move saves the state from before a move in a fixed slot per ply (indexed by len(move_log),
+        which only holds the moves played), and each ply has a reusable move list (see get_all_legal_moves) and attack
+        maps, so make/unmake don't grow or copy lists. Grown if a game outlasts c.undo_stack_plies
+        """
+        self.move_log = []
+        self.undo_stack = []
+        self.move_buffers = []
+        self.attack_counts_stack = []
+        self.grow_undo_stack(c.undo_stack_plies)
 
-        piece_color, piece_type = self.get_square_info(start_square)  # start square contents
+    def grow_undo_stack(self, plies):
+        self.undo_stack += [[None] * undo_fields for _ in range(plies)]
+        self.move_buffers += [[] for _ in range(plies)]
+        if self.attack_maps:
+            self.attack_counts_stack += [am.new_attack_counts() for _ in range(plies)]
 
-        if move_type != 'no':
-            if move_type == 'two_square_pawn':
-                self.board[end_square] = piece_moved
-                self.board[start_square] = '--'
-                self.en_passant_square = int(start_square + (end_square - start_square) / 2)
+    #@profile
+    def make_move(self, move):
 
-            if move_type == 'enpassant':
+        ply = len(self.move_log)
+        if ply + 1 >= len(self.undo_stack):
+            self.grow_undo_stack(len(self.undo_stack))
+
+        # note - packed int move, see move_encoding
+        start_square = move & square_mask
+        end_square = move >> 7 & square_mask
+        flag = move >> flag_shift & 7
+
+        board = self.board
+        piece_moved = board[start_square]
+        piece_captured = board[end_square]
+        previous_en_passant_square = self.en_passant_square
+        previous_castling_rights = self.castling_rights
+        previous_zobrist_key = self.zobrist_key
+        previous_pawn_key = self.pawn_key
+        previous_material_score, previous_square_bonus_score = self.material_score, self.square_bonus_score
+        previous_end_game_score, previous_phase = self.end_game_score, self.phase
+        en_passant_capture = s.empty
+
+        # Zobrist key - moved piece leaves the start square, captured piece leaves the end square, turn swaps
+        key = previous_zobrist_key ^ zb.piece_keys[piece_moved][start_square] ^ zb.black_to_move_key
+        if piece_captured != s.empty:
+            key ^= zb.piece_keys[piece_captured][end_square]
+        if previous_en_passant_square is not None:
+            key ^= zb.en_passant_keys[previous_en_passant_square % 10]
+
+        board[end_square] = piece_moved
+        board[start_square] = s.empty
+        self.en_passant_square = None
+
+        # Piece lists
+        piece_lists = self.piece_lists
+        if piece_captured != s.empty:
+            piece_lists[piece_captured].remove(end_square)
+        moved_squares = piece_lists[piece_moved]
+        moved_squares[moved_squares.index(start_square)] = end_square
+
+        if flag:
+            if flag == me.two_square_pawn:
+                self.en_passant_square = (start_square + end_square) // 2
+
+            elif flag == me.en_passant:
                 # FIXME - small graphical bug - but no biggie
-
                 taken_piece_square = end_square + 10 if start_square - end_square > 0 else end_square - 10
-                self.board[taken_piece_square] = '--'
-                # self.board[self.en_passant_square] = '--'
-                self.en_passant_square = None  # Fixme - dont want to do this every move
-                self.board[end_square] = piece_moved
-                self.board[start_square] = '--'
-
-            if move_type == 'Qpromotion':
-                # self.board[self.en_passant_square] = '--'
-                self.board[end_square] = "{}Q".format(piece_color)
-                self.board[start_square] = '--'
-                self.en_passant_square = None  # Fixme - dont want to do this every move
-
-            if piece_type == 'K':
-                # Update king positions
-                self.board[end_square] = piece_moved
-                self.board[start_square] = '--'
-                self.en_passant_square = None
-                self.king_location[piece_color] = end_square
-
-        else:
-            self.board[end_square] = piece_moved
-            self.board[start_square] = '--'
-            self.en_passant_square = None
-
-        self.move_log.append([move, piece_moved, piece_captured, self.en_passant_square])
+                en_passant_capture = board[taken_piece_square]
+                key ^= zb.piece_keys[en_passant_capture][taken_piece_square]
+                board[taken_piece_square] = s.empty
+                piece_lists[en_passant_capture].remove(taken_piece_square)
+
+            elif flag == me.castle:
+                _, rook_start, rook_end = s.castling_moves[end_square]
+                rook = board[rook_start]
+                board[rook_end] = rook
+                board[rook_start] = s.empty
+                rook_squares = piece_lists[rook]
+                rook_squares[rook_squares.index(rook_start)] = rook_end
+                key ^= zb.piece_keys[rook][rook_start] ^ zb.piece_keys[rook][rook_end]
 
+            else:
+                board[end_square] = piece_moved - s.pawn + me.promotion_piece(move)  # same color bit
+                moved_squares.remove(end_square)
+                piece_lists[board[end_square]].append(end_square)
+
+        # Zobrist key - piece arriving on the end square (the promoted piece for promotions) + new en passant square
+        piece_placed = board[end_square]
+        key ^= zb.piece_keys[piece_placed][end_square]
+        if self.en_passant_square is not None:
+            key ^= zb.en_passant_keys[self.en_passant_square % 10]
+
+        if self.castling_rights != '-' and (start_square in s.castling_rights_squares or
+                                            end_square in s.castling_rights_squares):
+            self.update_castling_rights(start_square, end_square)
+            key ^= zb.castling_key(previous_castling_rights) ^ zb.castling_key(self.castling_rights)
+
+        self.zobrist_key = key
+
+        # Pawn key - only changes when a pawn moves, promotes or is captured
+        if piece_moved & s.piece_type_mask == s.pawn:
+            self.pawn_key ^= zb.piece_keys[piece_moved][start_square]
+            if piece_placed == piece_moved:
+                self.pawn_key ^= zb.piece_keys[piece_placed][end_square]
+            if en_passant_capture != s.empty:
+                self.pawn_key ^= zb.piece_keys[en_passant_capture][taken_piece_square]
+        if piece_captured & s.piece_type_mask == s.pawn:
+            self.pawn_key ^= zb.piece_keys[piece_captured][end_square]
+
+        # Incremental evaluation - note the move's delta_eval can't be used here as it has the MVV-LVA ordering
+        # bonus folded in, so the exact change is looked up from the same tables compute_evaluation uses
+        if self.incremental_evaluation:
+            end_game_values = s.end_game_values
+            self.square_bonus_score += (s.square_bonus_values[piece_placed][end_square] -
+                                        s.square_bonus_values[piece_moved][start_square])
+            self.end_game_score += (end_game_values[piece_placed][end_square] -
+                                    end_game_values[piece_moved][start_square])
+            if piece_placed != piece_moved:  # promotion
+                self.material_score += s.material_values[piece_placed] - s.material_values[piece_moved]
+                self.phase += s.phase_values[piece_placed]
+            if piece_captured != s.empty:
+                self.material_score -= s.material_values[piece_captured]
+                self.square_bonus_score -= s.square_bonus_values[piece_captured][end_square]
+                self.end_game_score -= end_game_values[piece_captured][end_square]
+                self.phase -= s.phase_values[piece_captured]
+            elif en_passant_capture != s.empty:
+                self.material_score -= s.material_values[en_passant_capture]
+                self.square_bonus_score -= s.square_bonus_values[en_passant_capture][taken_piece_square]
+                self.end_game_score -= end_game_values[en_passant_capture][taken_piece_square]
+            if flag == me.castle:
+                self.square_bonus_score += (s.square_bonus_values[rook][rook_end] -
+                                            s.square_bonus_values[rook][rook_start])
+                self.end_game_score += end_game_values[rook][rook_end] - end_game_values[rook][rook_start]
+
+        # note - storing the state from before the move so unmake_move can restore it
+        undo = self.undo_stack[ply]
+        undo[0] = piece_moved
+        undo[1] = piece_captured
+        undo[2] = previous_en_passant_square
+        undo[3] = previous_castling_rights
+        undo[4] = self.half_move
+        undo[5] = self.full_move
+        undo[6] = previous_zobrist_key
+        undo[7] = previous_material_score
+        undo[8] = previous_square_bonus_score
+        undo[9] = previous_end_game_score
+        undo[10] = previous_phase
+        undo[11] = previous_pawn_key
+        undo[12] = self.attack_counts
+        self.move_log.append(move)
+
+        if self.attack_maps:
+            # The changed squares are put back and set again one at a time (set_square keeps the maps right)
+            attack_counts = am.copy_attack_counts(self.attack_counts, self.attack_counts_stack[ply + 1])
+            self.attack_counts = attack_counts
+            board[start_square] = piece_moved
+            board[end_square] = piece_captured
+            if en_passant_capture != s.empty:
+                board[taken_piece_square] = en_passant_capture
+            elif flag == me.castle:
+                board[rook_start] = rook
+                board[rook_end] = s.empty
+            am.set_square(board, attack_counts, start_square, s.empty)
+            am.set_square(board, attack_counts, end_square, piece_placed)
+            if en_passant_capture != s.empty:
+                am.set_square(board, attack_counts, taken_piece_square, s.empty)
+            elif flag == me.castle:
+                am.set_square(board, attack_counts, rook_start, s.empty)
+                am.set_square(board, attack_counts, rook_end, rook)
+
+        self.half_move = 0 if piece_moved & s.piece_type_mask == s.pawn or piece_captured != s.empty else \
+            self.half_move + 1
+        if piece_moved & s.black:
+            self.full_move += 1
         self.turn_over()
 
+        if self.verify_zobrist:
+            self.check_zobrist_key('make_move')
+        if self.verify_evaluation:
+            self.check_evaluation('make_move')
+        if self.verify_attack_maps:
+            self.check_attack_counts('make_move')
+
     #@profile
     def unmake_move(self):
 
         self.turn_over()  # switches turn
 
-        # Loading previous move and unpacking
-        previous_move = self.move_log.pop()
-        [start_square, end_square, move_type, delta_eval] = previous_move[0]
-        piece_moved = previous_move[1]
-        piece_captured = previous_move[2]
-        enpassant_square = previous_move[3]
+        # Loading previous move and unpacking (restoring the state from before the move)
+        move = self.move_log.pop()
+        (piece_moved, piece_captured, self.en_passant_square, self.castling_rights, self.half_move, self.full_move,
+         self.zobrist_key, self.material_score, self.square_bonus_score, self.end_game_score, self.phase,
+         self.pawn_key, self.attack_counts) = self.undo_stack[len(self.move_log)]
+        start_square = move & square_mask
+        end_square = move >> 7 & square_mask
+        flag = move >> flag_shift & 7
+
+        # Update board + piece lists (note - piece_moved is still the pawn for promotions)
+        board = self.board
+        piece_lists = self.piece_lists
+        moved_squares = piece_lists[piece_moved]
+        if flag >= me.promotion:
+            piece_lists[board[end_square]].remove(end_square)
+            moved_squares.append(start_square)
+        else:
+            moved_squares[moved_squares.index(end_square)] = start_square
+
+        board[start_square] = piece_moved
+        board[end_square] = piece_captured
+        if piece_captured != s.empty:
+            piece_lists[piece_captured].append(end_square)
+
+        if flag == me.en_passant:
+            forward_dir = 10 if piece_moved & s.black else -10
+            taken_piece = piece_moved ^ (s.white | s.black)  # enemy pawn
+            board[end_square - forward_dir] = taken_piece
+            piece_lists[taken_piece].append(end_square - forward_dir)
+
+        elif flag == me.castle:
+            _, rook_start, rook_end = s.castling_moves[end_square]
+            rook = board[rook_end]
+            board[rook_start] = rook
+            board[rook_end] = s.empty
+            rook_squares = piece_lists[rook]
+            rook_squares[rook_squares.index(rook_end)] = rook_start
+
+        if self.verify_zobrist:
+            self.check_zobrist_key('unmake_move')
+        if self.verify_evaluation:
+            self.check_evaluation('unmake_move')
+        if self.verify_attack_maps:
+            self.check_attack_counts('unmake_move')
+
+    def make_null_move(self):
+        """
+        Passes the turn (null move pruning) - only the side to move, en passant square and zobrist key change
+        """
+        key = self.zobrist_key ^ zb.black_to_move_key
+        if self.en_passant_square is not None:
+            key ^= zb.en_passant_keys[self.en_passant_square % 10]
+
+        # note - logged like a move (None) so the ply count stays right, unmake_null_move restores the state
+        ply = len(self.move_log)
+        if ply + 1 >= len(self.undo_stack):
+            self.grow_undo_stack(len(self.undo_stack))
+        undo = self.undo_stack[ply]
+        undo[0] = s.empty
+        undo[1] = s.empty
+        undo[2] = self.en_passant_square
+        undo[3] = self.castling_rights
+        undo[4] = self.half_move
+        undo[5] = self.full_move
+        undo[6] = self.zobrist_key
+        undo[7] = self.material_score
+        undo[8] = self.square_bonus_score
+        undo[9] = self.end_game_score
+        undo[10] = self.phase
+        undo[11] = self.pawn_key
+        undo[12] = None
+        self.move_log.append(None)
+        self.en_passant_square = None
+        self.zobrist_key = key
+        self.turn_over()
+
+        if self.verify_zobrist:
+            self.check_zobrist_key('make_null_move')
 
-        piece_color, piece_type = self.get_square_info(end_square)  # end square contents
+    def unmake_null_move(self):
+        self.turn_over()
+        self.move_log.pop()
+        _, _, self.en_passant_square, self.castling_rights, self.half_move, self.full_move, self.zobrist_key, \
+            self.material_score, self.square_bonus_score, self.end_game_score, self.phase, self.pawn_key, _ = \
+            self.undo_stack[len(self.move_log)]
 
-        # Update board
-        self.board[start_square] = piece_moved
-        self.board[end_square] = piece_captured
+    def king_in_check(self):
+        """
+        Is the side to move in check (without generating the moves)
+        """
+        king_squares = self.piece_lists[s.white | s.king if self.is_whites_turn else s.black | s.king]
+        return bool(king_squares) and self.check_check(king_squares[0])
 
-        # piece specific move updates
-        if piece_moved == 'wK':
-            self.king_location['w'] = start_square
-        elif piece_moved == 'bK':
-            self.king_location['b'] = start_square
+    def compute_evaluation(self):
+        """
+        Full board recompute of the evaluation terms kept incrementally by make/unmake
+        :return: material score, square bonus score, end game square bonus score (white positive), game phase
+        """
+        material_score = 0
+        square_bonus_score = 0
+        end_game_score = 0
+        phase = 0
+        for square in s.real_board_squares:
+            piece = self.board[square]
+            if piece != s.empty:
+                material_score += s.material_values[piece]
+                square_bonus_score += s.square_bonus_values[piece][square]
+                end_game_score += s.end_game_values[piece][square]
+                phase += s.phase_values[piece]
+        return material_score, square_bonus_score, end_game_score, phase
+
+    def check_evaluation(self, caller):
+        """
+        Verification that the incremental evaluation matches a full recompute
+        :param caller: name of the calling function (for the error message)
+        """
+        expected = self.compute_evaluation()
+        evaluation = (self.material_score, self.square_bonus_score, self.end_game_score, self.phase)
+        if self.incremental_evaluation and evaluation != expected:
+            raise RuntimeError('Evaluation mismatch after {}: {} != {} (last move {})'.format(
+                caller, evaluation, expected,
+                self.move_log[-1] if self.move_log else None))
+
+    def check_attack_counts(self, caller):
+        """
+        Verification that the incrementally updated attack maps match a full recompute
+        :param caller: name of the calling function (for the error message)
+        """
+        if not self.attack_maps:
+            return
+        expected = am.compute_attack_counts(self.board)
+        for color in (s.white, s.black):
+            if self.attack_counts[color] != expected[color]:
+                squares = [square for square in s.real_board_squares
+                           if self.attack_counts[color][square] != expected[color][square]]
+                raise RuntimeError('Attack map mismatch after {} on squares {} (last move {})'.format(
+                    caller, squares, self.move_log[-1] if self.move_log else None))
+
+    def update_castling_rights(self, start_square, end_square):
+        """
+        Removes the castling rights lost by a king/rook moving from (or a rook being captured on) its start square
+        :param start_square: square index the piece moved from
+        :param end_square: square index the piece moved to
+        """
+        lost_rights = s.castling_rights_squares.get(start_square, '') + s.castling_rights_squares.get(end_square, '')
+        castling_rights = ''.join(right for right in self.castling_rights if right not in lost_rights)
+        self.castling_rights = castling_rights if castling_rights else '-'
 
-        if move_type != 'no':
-            # Non "normal" moves updates
-            if move_type == 'Qpromotion':
-                # Instead undo back to a pawn
-                self.board[start_square] = '{}p'.format(piece_color)
+    def compute_zobrist_key(self):
+        """
+        Computes the Zobrist key of the current position from scratch (make/unmake update it incrementally)
+        :return: 64 bit key
+        """
+        return zb.hash_position(self.board, self.castling_rights, self.en_passant_square, self.is_whites_turn)
 
-            if move_type == 'enpassant':
-                self.board[end_square] = '--'
-                forward_dir = 10 if piece_color == 'b' else -10
-                enemy = 'w' if piece_color == 'b' else 'b'
-                self.board[end_square-forward_dir] = '{}w'.format(enemy)
-                #TODO - validate this!
+    def check_zobrist_key(self, caller):
+        """
+        Debug check that the incrementally updated key matches a from scratch hash of the position
+        :param caller: name of the calling function (for the error message)
+        """
+        expected = self.compute_zobrist_key()
+        if self.zobrist_key != expected:
+            raise RuntimeError('Zobrist key mismatch after {}: {:016x} != {:016x} (last move {})'.format(
+                caller, self.zobrist_key, expected, self.move_log[-1] if self.move_log else None))
+        expected = zb.hash_pawns(self.board)
+        if self.pawn_key != expected:
+            raise RuntimeError('Pawn key mismatch after {}: {:016x} != {:016x} (last move {})'.format(
+                caller, self.pawn_key, expected, self.move_log[-1] if self.move_log else None))
 
 
     def turn_over(self):
@@ -146,574 +438,472 @@ class GameInstance:
         return 'w' if self.is_whites_turn else 'b'
 
     #@profile
-    def get_all_legal_moves(self):
-
-        king_pos = self.king_location['w'] if self.is_whites_turn else self.king_location['b']
-        self.is_in_check, self.pins, self.checks = self.check_pins_and_checks(king_pos)
-        self.get_all_possible_moves()
-        moves = self.possible_moves
-
-        enemy_color = 'b' if self.is_whites_turn else 'w'
-        color = 'w' if self.is_whites_turn else 'b'
-
-        if self.is_in_check:
-            if len(self.checks) == 1:
-                # Check from a singular piece - potential to block or take it
-                moves = self.get_all_possible_moves()
-
-                check_info = self.checks[0]
-                checking_piece_square = check_info[0]
-                checking_dir = check_info[1]
-
-                checking_piece_c, checking_piece = self.get_square_info(checking_piece_square)  # square contents
-
-                squares_to_stop_check = []
-                if checking_piece == 'N':
-                    squares_to_stop_check.append(checking_piece_square)
-                else:
-                    for step in range(1, 8):
-                        square_f = king_pos + checking_dir * step
-                        color_f, piece_f = self.get_square_info(square_f)  # end square contents
-                        if piece_f == '-' or piece_f == checking_piece:
-                            squares_to_stop_check.append(square_f)
-
-                        if piece_f == checking_piece:
-                            break
-
-                self.get_all_possible_moves()
-                moves = self.possible_moves
-                moves = [move for move in moves if (move[1] in squares_to_stop_check or 'K' in move[2])]
-
-                #print('downsampled for moves that remove check!')
-                #print(squares_to_stop_check)
-                #print(moves)
-
-            else:
-                # 2+ checks - only able to move the king # TODO - confirm this is true? fairly sure it is
-                moves = []
-                self.get_king_moves(king_pos, moves)
+    def get_all_legal_moves(self, buffer=False):
+        """
+        Fully legal moves - checks and pins are found once per node (from the king outwards) and the check mask/pin
+        ray handed to each piece generator, so only legal moves are produced (no make/unmake filtering)
+        :param buffer: fill the reusable move list of the current ply instead of a new list (the search/perft, the
+        list is only valid until moves are generated again at this ply)
+        :return: list of moves
+        """
+        color = s.white if self.is_whites_turn else s.black
+        king_squares = self.piece_lists[color | s.king]
+        if not king_squares:
+            return []
+        king = king_squares[0]
+        checks, pins = self.check_pins_and_checks(king)
+        self.checks = checks
+        self.is_in_check = bool(checks)
+
+        if buffer:
+            moves = self.move_buffers[len(self.move_log)]
+            moves.clear()
         else:
-            # All moves are valid (no checks) # TODO - pins still need to be added
-            pass
-            #self.get_all_possible_moves()
-            #moves = self.possible_moves
-
-        #moves = [move for move in moves if (move[0] not in self.pins.keys() or (len(self.pins[move[0]]) == 1 and (self.pins[move[0]][1] % abs(move[1]-move[0]) == 0)))]  # FIXME - can actually take the piece causing the pin! (so long as its the sole piece pinning it)
-
-        filtered_moves = []
-        for move in moves:
-            if move[0] not in self.pins.keys():
-                filtered_moves.append(move)
-            elif len(self.pins[move[0]]) == 1:
-                # FIXME - dont think multiple pins can be occouring on the same piece??
-                dir = self.pins[move[0]][0]
-                op_dir = -dir
-                delta_move = move[1] - move[0]
-                if delta_move % dir == 0 or delta_move % op_dir == 0:
-                    filtered_moves.append(move)
-
-        return filtered_moves
+            moves = []
+        if len(checks) < 2:
+            # Check mask - with a single check the other pieces can only take the checker or block its ray
+            targets = None
+            if checks:
+                checking_square, direction = checks[0]
+                targets = set(range(king + direction, checking_square + direction, direction)) if direction \
+                    else {checking_square}
+
+            piece_lists = self.piece_lists
+            move_functions = self.move_functions
+            for piece_type in (s.pawn, s.knight, s.bishop, s.rook, s.queen):
+                move_function = move_functions[piece_type]
+                for square in piece_lists[color | piece_type]:
+                    move_function(square, moves, targets, pins.get(square))
+            if self.en_passant_square is not None:
+                self.get_en_passant_moves(king, moves)
+
+        # note - double check, only the king can move
+        self.get_king_moves(king, moves)
+        return moves
 
     def check_pins_and_checks(self, square):
+        """
+        Pieces checking the king and own pieces pinned to it
+        :param square: king square
+        :return: checks - list of (checking square, direction from the king, 0 for knights and pawns),
+        pins - {pinned square: direction from the king}
+        """
+        board = self.board
+        color, enemy_color = (s.white, s.black) if self.is_whites_turn else (s.black, s.white)
+        checks = []
+        pins = {}
+
+        for directions, slider in ((s.linear_dirs, enemy_color | s.rook), (s.diagonal_dirs, enemy_color | s.bishop)):
+            queen = enemy_color | s.queen
+            for direction in directions:
+                pinned = None
+                square_f = square + direction
+                while True:
+                    piece_f = board[square_f]
+                    if piece_f != s.empty:
+                        if piece_f & color:
+                            if pinned is not None:
+                                break  # second own piece - no pin
+                            pinned = square_f
+                        else:
+                            # enemy piece or off the board
+                            if piece_f == slider or piece_f == queen:
+                                if pinned is None:
+                                    checks.append((square_f, direction))
+                                else:
+                                    pins[pinned] = direction
+                            break
+                    square_f += direction
 
-        pin_list = {}
-        check_list = []
-        is_in_check = False
-
-        enemy_color = 'b' if self.is_whites_turn else 'w'
-        color = 'w' if self.is_whites_turn else 'b'
-        pawn_direction = -1 if self.is_whites_turn else 1
-
-        pin_dir = {'R': (s.linear_dirs, 8),
-                      'B': (s.diagonal_dirs, 8),
-                      'Q': (s.linear_dirs + s.diagonal_dirs, 8),
-                      'p': (s.diagonal_dirs * pawn_direction, 1),
-                      'N': ([], 1),
-                      'K': ([], 1)}  # Fixme - why is N/K in here!
-
-        for direction in s.linear_dirs + s.diagonal_dirs:
-
-            possible_pin = False
-
-            for step in range(1, 8):
-                square_f = square + direction * step
-                color_f, piece_f = self.get_square_info(square_f)  # end square contents
-
-                if piece_f != 'F':  # on the board
-
-                    if color_f == color and not possible_pin:
-                        # first piece in direction (own)
-                        possible_pin = (square_f, direction)
-
-                    elif color_f == color and possible_pin:
-                        # second piece in direction (own) - no pin
-                        break
-
-                    elif color_f == enemy_color and possible_pin:
-                        # second piece in direction (enemy) - possible pin
-                        if direction in pin_dir[piece_f][0] and step <= pin_dir[piece_f][1]:
+        # note - with the attack maps an unattacked king can't be in check from a knight or pawn
+        if self.attack_maps and not self.attack_counts[enemy_color][square]:
+            return checks, pins
 
-                            # check if piece can deliver a pin
-                            if possible_pin[0] in pin_list:
-                                pin_list[possible_pin[0]].append(direction)
-                            else:
-                                pin_list[possible_pin[0]] = [direction]
+        enemy_knight = enemy_color | s.knight
+        for direction in s.knight_moves:
+            if board[square + direction] == enemy_knight:
+                checks.append((square + direction, 0))
 
-                        break
+        enemy_pawn = enemy_color | s.pawn
+        forward = -10 if self.is_whites_turn else 10
+        for square_f in (square + forward - 1, square + forward + 1):
+            if board[square_f] == enemy_pawn:
+                checks.append((square_f, 0))
 
-                    elif color_f == enemy_color and not possible_pin:
-                        # first piece in direction (enemy) - possible check
-                        if direction in pin_dir[piece_f][0] and step <= pin_dir[piece_f][1]:
-                            # check if piece can deliver a check
-                            check_list.append((square_f, direction))
-                            is_in_check = True
-                        break
-                else:
-                    # Off the board, stop checking in that dir
-                    break
+        return checks, pins
 
+    def square_attacked(self, square, enemy_color):
+        """
+        Is a square attacked by a color (on the board as it is)
+        :param square: square index
+        :param enemy_color: s.white or s.black
+        """
+        board = self.board
+        for directions, slider in ((s.linear_dirs, enemy_color | s.rook), (s.diagonal_dirs, enemy_color | s.bishop)):
+            queen = enemy_color | s.queen
+            for direction in directions:
+                square_f = square + direction
+                piece_f = board[square_f]
+                while piece_f == s.empty:
+                    square_f += direction
+                    piece_f = board[square_f]
+                if piece_f == slider or piece_f == queen:
+                    return True
+
+        enemy_knight = enemy_color | s.knight
         for direction in s.knight_moves:
-            square_f = square + direction
-            color_f, piece_f = self.get_square_info(square_f)  # end square contents
-            if color_f == enemy_color and piece_f == 'N':
-                check_list.append((square_f, direction))
-                is_in_check = True
-
-        #if is_in_check:
-            #print('CHECK!')
+            if board[square + direction] == enemy_knight:
+                return True
 
-        return is_in_check, pin_list, check_list
+        enemy_king = enemy_color | s.king
+        for direction in s.king_moves:
+            if board[square + direction] == enemy_king:
+                return True
 
-    def check_check(self, square):
-        # Checks if the square is valid for the king to move to
-        enemy_color = 'b' if self.is_whites_turn else 'w'
-        color = 'w' if self.is_whites_turn else 'b'
-        pawn_direction = -1 if self.is_whites_turn else 1
-
-        attack_dir = {'R': (s.linear_dirs, 8),
-                      'B': (s.diagonal_dirs, 8),
-                      'Q': (s.linear_dirs + s.diagonal_dirs, 8),
-                      'p': (s.diagonal_dirs * pawn_direction, 1),
-                      'N': ([], 1),
-                      'K': (s.diagonal_dirs + s.linear_dirs, 1)}  # Fixme - why is N/K in here!
-
-        for direction in s.linear_dirs + s.diagonal_dirs:
-            for step in range(1, 9):
-                square_f = square + direction * step
-                color_f, piece_f = self.get_square_info(square_f)  # end square contents
-
-                if color_f == color or piece_f == 'F':
-                    if piece_f != 'K':  # Hiding behind itself bug
-                        break
-                elif color_f == enemy_color:
-                    if direction in attack_dir[piece_f][0] and step <= attack_dir[piece_f][1]:
-                        #print('square {} is checked'.format(square))
-
-                        return True
-                    else:
-                        break
+        # note - enemy pawns attack against their direction of travel
+        enemy_pawn = enemy_color | s.pawn
+        forward = 10 if enemy_color == s.white else -10
+        return board[square + forward - 1] == enemy_pawn or board[square + forward + 1] == enemy_pawn
 
-        for direction in s.knight_moves:
-            square_f = square + direction
-            color_f, piece_f = self.get_square_info(square_f)  # end square contents
-            if color_f == enemy_color and piece_f == 'N':
-                return True
+    def attacked_squares(self, enemy_color, hidden=None):
+        """
+        Every square attacked by a color
+        :param enemy_color: s.white or s.black
+        :param hidden: square treated as empty - the defending king, so it can't step back along a slider's ray
+        :return: bytearray indexed by square, non zero if attacked
+        """
+        board = self.board
+        piece_lists = self.piece_lists
+        attacked = bytearray(s.board_square_count)
+        if hidden is not None:
+            hidden_piece = board[hidden]
+            board[hidden] = s.empty
+
+        forward = -10 if enemy_color == s.white else 10
+        for square in piece_lists[enemy_color | s.pawn]:
+            attacked[square + forward - 1] = 1
+            attacked[square + forward + 1] = 1
+        for piece_type, directions in ((s.knight, s.knight_moves), (s.king, s.king_moves)):
+            for square in piece_lists[enemy_color | piece_type]:
+                for direction in directions:
+                    attacked[square + direction] = 1
+        for piece_type, directions in ((s.bishop, s.diagonal_dirs), (s.rook, s.linear_dirs), (s.queen, s.king_moves)):
+            for square in piece_lists[enemy_color | piece_type]:
+                for direction in directions:
+                    square_f = square + direction
+                    while board[square_f] == s.empty:
+                        attacked[square_f] = 1
+                        square_f += direction
+                    attacked[square_f] = 1
+
+        if hidden is not None:
+            board[hidden] = hidden_piece
+        return attacked
 
-        #print('no checks for {}'.format(square))
-        return False
+    def check_check(self, square):
+        """
+        Is the square attacked by the side not to move (a lookup with the attack maps)
+        :param square: square index
+        """
+        enemy_color = s.black if self.is_whites_turn else s.white
+        if self.attack_maps:
+            return self.attack_counts[enemy_color][square] > 0
+        return self.square_attacked(square, enemy_color)
 
     #@profile
     def get_all_possible_moves(self):
         """
-        Get pseudo legal moves (without considering checks)
-        :return:
+        Get the legal moves of the side to move (see get_all_legal_moves)
         """
-        moves = []
-        for square in s.real_board_squares:
-            color, piece = self.get_square_info(square)
-            if piece in s.valid_pieces and self.turn == color:
-                # checking if piece owned by the turn taker is present on the square
-                self.move_functions[piece](square, moves)
-        self.possible_moves = moves
+        self.possible_moves = self.get_all_legal_moves()
+
     #@profile
-    def get_pawn_moves(self, square, moves):
-
-        enemy_color = 'b' if self.is_whites_turn else 'w'
-        #color = 'w' if self.is_whites_turn else 'b'
-
-        pawn_start_cords = s.white_pawn_start if self.is_whites_turn else s.black_pawn_start
-        enemy_pawn_start_cords = s.black_pawn_start if self.is_whites_turn else s.white_pawn_start
-        pawn_en_passant_cords = s.white_pawn_en_passant_cords if self.is_whites_turn else s.black_pawn_en_passant_cords
-        pawn_end_cords = s.white_pawn_end if self.is_whites_turn else s.black_pawn_end
-        pawn_direction = -1 if self.is_whites_turn else 1
-
-        #pawn_start_cords = s.white_pawn_start if self.is_whites_turn else s.black_pawn_start
-        #pawn_en_passant_cords = [cord + 10 * pawn_direction for cord in pawn_start_cords]
-        #pawn_end_cords = [cord + 10 * pawn_direction for cord in enemy_pawn_start_cords]
-        #color_s, piece_s = self.get_square_info(square)  # start square contents
-
-        piece_s = self.board[square][1]
-
-        # Moving forward
-        available_steps = [1, 2] if square in pawn_start_cords else [1]
-        for step_size in available_steps:
-            square_f = square + s.up * step_size * pawn_direction
-            #color_f, piece_f = self.get_square_info(square_f)  # end square contents
-            piece_f = self.board[square_f][1]
-
-            if piece_f == '-':  # empty
-                if square_f in pawn_end_cords:
-                    piece_e = "Q"
-                    piece_increase = (
-                            s.piece_value_mid_game[piece_e][square_f] - s.piece_value_mid_game[piece_s][square])
-                    moves.append((square, square_f, 'Qpromotion', piece_increase))
+    def get_pawn_moves(self, square, moves, targets=None, pin=None):
+        """
+        Legal pawn pushes and captures (all four promotions), en passant is left to get_en_passant_moves
+        :param square: square index of the pawn
+        :param moves: list the moves are appended to
+        :param targets: squares that stop a check (None if not in check)
+        :param pin: direction from the king of the pin ray the pawn is on (None if not pinned)
+        """
+        board = self.board
+        if self.is_whites_turn:
+            forward, enemy_color, start_row, promotion_row = -10, s.black, 8, 2
+        else:
+            forward, enemy_color, start_row, promotion_row = 10, s.white, 3, 9
+        square_values = s.pawn_mid
+        start_value = square_values[square]
+        promotion = (square + forward) // 10 == promotion_row
+        base = square + move_base  # note - packed moves, + (end << 7) + (delta_eval << score_shift)
+
+        # Moving forward - only along a vertical pin
+        if pin is None or pin == forward or pin == -forward:
+            square_f = square + forward
+            if board[square_f] == s.empty:
+                if targets is None or square_f in targets:
+                    if promotion:
+                        for piece_type, promotion_values in s.promotion_moves:
+                            moves.append(me.encode_move(square, square_f, me.promotion_flags[piece_type],
+                                                        promotion_values[square_f] - start_value))
+                    else:
+                        moves.append(base + (square_f << 7) +
+                                     ((square_values[square_f] - start_value) << score_shift))
+
+                square_f += forward
+                if square // 10 == start_row and board[square_f] == s.empty and (targets is None or square_f in targets):
+                    moves.append(me.encode_move(square, square_f, me.two_square_pawn,
+                                                square_values[square_f] - start_value))
+
+        # Taking on diagonal - only along a diagonal pin in the same direction
+        for step in (forward - 1, forward + 1):
+            if pin is not None and step != pin and step != -pin:
+                continue
+            square_f = square + step
+            piece_f = board[square_f]  # end square contents
+            if piece_f & enemy_color and (targets is None or square_f in targets):
+                capture_bonus = s.mvv_lva_by_type[piece_f & s.piece_type_mask]
+                if promotion:
+                    for piece_type, promotion_values in s.promotion_moves:
+                        moves.append(me.encode_move(square, square_f, me.promotion_flags[piece_type],
+                                                    promotion_values[square_f] - start_value + capture_bonus))
                 else:
-                    piece_increase = (
-                            s.piece_value_mid_game[piece_s][square_f] - s.piece_value_mid_game[piece_s][square])
-                    move_type = 'two_square_pawn' if step_size == 2 else 'no'
-                    moves.append((square, square_f, move_type, piece_increase))
-            else:
-                # Don't check 2 if 1 is blocked
-                break
-
-        # Taking on diagonal + enpassantg
-        available_steps = s.diagonals
-        for step in available_steps:
-            square_f = square + step * pawn_direction
-            color_f, piece_f = self.board[square_f][0], self.board[square_f][1]  # end square contents
-            if color_f == enemy_color:
-                if square_f in pawn_end_cords:
-                    # Promotion
-                    piece_e = "Q"
-                    piece_increase = (
-                            s.piece_value_mid_game[piece_e][square_f] - s.piece_value_mid_game[piece_s][square])
-                    moves.append((square, square_f, 'Qpromotion', piece_increase + s.mvv_lva_values[piece_f]))
+                    moves.append(base + (square_f << 7) +
+                                 ((square_values[square_f] - start_value + capture_bonus) << score_shift))
+
+    def get_en_passant_moves(self, king, moves):
+        """
+        En passant captures - tried on the board and kept if the king isn't attacked afterwards (covers pins, checks
+        and the discovered check along the rank when both pawns leave it)
+        :param king: king square of the side to move
+        :param moves: list the moves are appended to
+        """
+        board = self.board
+        square_f = self.en_passant_square
+        if self.is_whites_turn:
+            forward, pawn, enemy_color = -10, s.white | s.pawn, s.black
+        else:
+            forward, pawn, enemy_color = 10, s.black | s.pawn, s.white
+        taken_square = square_f - forward
+        taken_piece = board[taken_square]
+
+        for square in (taken_square - 1, taken_square + 1):
+            if board[square] == pawn:
+                board[square], board[taken_square], board[square_f] = s.empty, s.empty, pawn
+                legal = not self.square_attacked(king, enemy_color)
+                board[square], board[taken_square], board[square_f] = pawn, taken_piece, s.empty
+                if legal:
+                    moves.append(me.encode_move(square, square_f, me.en_passant,
+                                                s.pawn_mid[square_f] - s.pawn_mid[square]))
 
-                else:
-                    piece_increase = (
-                            s.piece_value_mid_game[piece_s][square_f] - s.piece_value_mid_game[piece_s][square])
-                    moves.append((square, square_f, 'no', piece_increase + s.mvv_lva_values[piece_f]))
-
-            elif square_f == self.en_passant_square and square_f not in pawn_en_passant_cords:
-                #print('enpassant we we!')
-                piece_increase = (s.piece_value_mid_game[piece_s][square_f] - s.piece_value_mid_game[piece_s][square])
-                moves.append((square, square_f, 'enpassant', piece_increase + s.mvv_lva_values[piece_f]))
-            # print(square_f, self.en_passant_square)
     #@profile
-    def get_knight_moves(self, square, moves):
-        enemy_color = 'b' if self.is_whites_turn else 'w'
+    def get_knight_moves(self, square, moves, targets=None, pin=None):
+        if pin is not None:
+            return  # note - a pinned knight can never stay on the pin ray
+        board = self.board
+        enemy_color = s.black if self.is_whites_turn else s.white
+        square_values = s.knight_mid
+        base = square + move_base
 
-        # TODO continue back here tomorrow :)
-        # note - currently not doing any pin checks! pseudo legal move generator.
         for direction in s.knight_moves:
             end_square = square + direction  # moving in the direction one step
-            color_s, piece_s = self.get_square_info(square)  # start square conents
-            color_e, piece_e = self.get_square_info(end_square)  # end square contents
-
-            if color_e in [enemy_color, '-']:  # seeing if enemy piece at final square or empty (valid sqare check)
-                # TODO - implement pin check logic
-                # if not piece_pinned or pin_direction in (d, -d):  #
+            piece_e = board[end_square]  # end square contents
 
+            if (piece_e == s.empty or piece_e & enemy_color) and (targets is None or end_square in targets):
                 # note - calculating the increase in piece value based on move and game phase
                 # TODO - increase this such that there are multiple tables extrapolated between based on phase
-                piece_increase = (s.piece_value_mid_game[piece_s][end_square] - s.piece_value_mid_game[piece_s][square])
+                piece_increase = square_values[end_square] - square_values[square]
 
-                # note - start/end sqaure - no (TODO  what this this)
                 # note -  delta of evaluation (based on the above tables + the taken piece (end square value)
-                moves.append((square, end_square, 'no', piece_increase + s.mvv_lva_values[piece_e]))
-
-                # note - these are not needed for knight as not a sliding piece
-                # note - if the end_square houses a enemy piece - stop checking in that direction.
-                # if color_e == enemy_color:
-                #    break  # break out of that direction
-            # else:
-            #    break
-    #@profile
-    def get_bishop_moves(self, square, moves):
-        enemy_color = 'b' if self.is_whites_turn else 'w'
-
-        # TODO continue back here tomorrow :)
-        # note - currently not doing any pin checks! pseudo legal move generator.
-        for direction in s.diagonal_dirs:
-            for i in range(1, 8):
-                end_square = square + direction * i  # moving in the direction one step
-                color_s, piece_s = self.get_square_info(square)  # start square conents
-                color_e, piece_e = self.get_square_info(end_square)  # end square contents
-
-                if color_e in [enemy_color, '-']:  # seeing if enemy piece at final square or empty (valid sqare check)
-                    # TODO - implement pin check logic
-                    # if not piece_pinned or pin_direction in (d, -d):  #
-
-                    # note - calculating the increase in piece value based on move and game phase
-                    # TODO - increase this such that there are multiple tables extrapolated between based on phase
-                    piece_increase = (s.piece_value_mid_game['R'][end_square] - s.piece_value_mid_game['R'][square])
-
-                    # note - start/end sqaure - no (TODO  what this this)
-                    # note -  delta of evaluation (based on the above tables + the taken piece (end square value)
-                    moves.append((square, end_square, 'no', piece_increase + s.mvv_lva_values[piece_e]))
+                moves.append(base + (end_square << 7) +
+                             ((piece_increase + s.mvv_lva_by_type[piece_e & s.piece_type_mask]) << score_shift))
 
-                    # note - if the end_square houses a enemy piece - stop checking in that direction.
-                    if color_e == enemy_color:
-                        break  # break out of that direction
-                else:
-                    break
+    def get_sliding_moves(self, square, moves, directions, square_values, targets=None, pin=None):
+        """
+        Legal moves for a sliding piece (bishop, rook, queen), stepping along each direction until blocked
+        :param square: square index of the piece
+        :param moves: list the moves are appended to
+        :param directions: step directions of the piece
+        :param square_values: mid game square table of the piece (for the move delta eval)
+        :param targets: squares that stop a check (None if not in check)
+        :param pin: direction from the king of the pin ray the piece is on (None if not pinned)
+        """
+        board = self.board
+        enemy_color = s.black if self.is_whites_turn else s.white
+        start_value = square_values[square]
+        base = square + move_base
+        if pin is not None:
+            directions = [direction for direction in directions if direction == pin or direction == -pin]
+
+        for direction in directions:
+            end_square = square + direction  # moving in the direction one step
+            piece_e = board[end_square]
+            while piece_e == s.empty:
+                if targets is None or end_square in targets:
+                    moves.append(base + (end_square << 7) +
+                                 ((square_values[end_square] - start_value) << score_shift))
+                end_square += direction
+                piece_e = board[end_square]
+
+            # note - if the end_square houses a enemy piece - take it and stop checking in that direction.
+            if piece_e & enemy_color and (targets is None or end_square in targets):
+                capture_bonus = s.mvv_lva_by_type[piece_e & s.piece_type_mask]
+                moves.append(base + (end_square << 7) +
+                             ((square_values[end_square] - start_value + capture_bonus) << score_shift))
     #@profile
-    def get_rook_moves(self, square, moves):
-        # note - tried to make this faster by cutting unused calls/leaving them as late as possible!
-
-
-        enemy_color = 'b' if self.is_whites_turn else 'w'
-        piece_s = 'R'
-        # TODO continue back here tomorrow :)
-        # note - currently not doing any pin checks! pseudo legal move generator.
-        for direction in s.linear_dirs:
-            for i in range(1, 8):
-                end_square = square + direction * i  # moving in the direction one step
-
-                #color_s, piece_s = self.board[square][0], self.board[square][1]  # start square contents
-                #color_e, piece_e = self.board[end_square][0], self.board[end_square][1]  # end square contents
-
-                color_e = self.board[end_square][0]
-                if color_e in [enemy_color, '-']:  # seeing if enemy piece at final square or empty (valid sqare check)
-                    # TODO - implement pin check logic
-                    # if not piece_pinned or pin_direction in (d, -d):  #
-
-                    # note - calculating the increase in piece value based on move and game phase
-                    # TODO - increase this such that there are multiple tables extrapolated between based on phase
-                    piece_increase = (
-                            s.piece_value_mid_game[piece_s][end_square] - s.piece_value_mid_game[piece_s][square])
-
-                    # note - start/end sqaure - no (TODO  what this this)
-                    # note -  delta of evaluation (based on the above tables + the taken piece (end square value)
-                    moves.append((square, end_square, 'no', piece_increase + s.mvv_lva_values[self.board[end_square][1]]))
-
-                    # note - if the end_square houses a enemy piece - stop checking in that direction.
-                    if color_e == enemy_color:
-                        break  # break out of that direction
-                else:
-                    break
+    def get_bishop_moves(self, square, moves, targets=None, pin=None):
+        self.get_sliding_moves(square, moves, s.diagonal_dirs, s.bishop_mid, targets, pin)
     #@profile
-    def get_queen_moves(self, square, moves):
-        enemy_color = 'b' if self.is_whites_turn else 'w'
-
-        # TODO continue back here tomorrow :)
-        # note - currently not doing any pin checks! pseudo legal move generator.
-        color_s, piece_s = self.get_square_info(square)  # start square contents
-
-        for direction in s.diagonal_dirs + s.linear_dirs:  # FIXME - this shouldn't be in the loop for rook, bishop, queen
-            for i in range(1, 8):
-                end_square = square + direction * i  # moving in the direction one step
-                color_e, piece_e = self.get_square_info(end_square)  # end square contents
-
-                if color_e in [enemy_color, '-']:  # seeing if enemy piece at final square or empty (valid sqare check)
-                    # TODO - implement pin check logic
-                    # if not piece_pinned or pin_direction in (d, -d):  #
-
-                    # note - calculating the increase in piece value based on move and game phase
-                    # TODO - increase this such that there are multiple tables extrapolated between based on phase
-                    piece_increase = (
-                            s.piece_value_mid_game[piece_s][end_square] - s.piece_value_mid_game[piece_s][square])
-
-                    # note - start/end sqaure - no (TODO  what this this)
-                    # note -  delta of evaluation (based on the above tables + the taken piece (end square value)
-                    moves.append((square, end_square, 'no', piece_increase + s.mvv_lva_values[piece_e]))
-
-                    # note - if the end_square houses a enemy piece - stop checking in that direction.
-                    if color_e == enemy_color:
-                        break  # break out of that direction
-                else:
-                    break
+    def get_rook_moves(self, square, moves, targets=None, pin=None):
+        self.get_sliding_moves(square, moves, s.linear_dirs, s.rook_mid, targets, pin)
     #@profile
+    def get_queen_moves(self, square, moves, targets=None, pin=None):
+        self.get_sliding_moves(square, moves, s.king_moves, s.queen_mid, targets, pin)
 
-    def get_king_moves(self, square, moves):
-        enemy_color = 'b' if self.is_whites_turn else 'w'
-        color = self.turn
-
-        # TODO continue back here tomorrow :)
-        # note - currently not doing any pin checks! pseudo legal move generator.
-        color_s, piece_s = self.get_square_info(square)  # start square contents
-
-
-
-        # note - come back to this in the morning! <3 
+    #@profile
+    def get_king_moves(self, square, moves, targets=None, pin=None):
         """
-        # Castling:
-        # Can't castle if in check, if square between K or R is under attack, or if castling rights are broken
-        if not self.is_in_check:
-            king_castle = 'K' if self.is_whites_turn else 'k'
-            queen_castle = 'Q' if self.is_whites_turn else 'q'
-
-            # Castle King side
-            if king_castle in self.castling_rights and all(x == '--' for x in (self.board[square + 1], self.board[square + 2])):
-
-                # Check if squares are in check or not
-                is_in_check_1 = self.check_for_checks(square + 1)
-                is_in_check_2 = self.check_for_checks(square + 2)
-
-                if not (is_in_check_1 or is_in_check_2):
-                    moves.append((square, square + 2, 'ck', 40))
-
-            # Castle Queen side
-            if queen_castle in self.castling_rights and all(x == '--' for x in (self.board[square - 1], self.board[square - 2], self.board[square - 3])):
-
-                # Check if squares are in check or not, king doesn't pass the knight square on queenside castle so no use in checking that square
-                is_in_check_1 = self.check_for_checks(square - 1)
-                is_in_check_2 = self.check_for_checks(square - 2)
-
-                if not (is_in_check_1 or is_in_check_2):
-                    moves.append((square, square - 2, 'cq', 40))
-
+        Legal king moves and castling - the enemy attack set (with the king lifted off the board) is only computed
+        if the king has a square to go to, most nodes in the opening/middle game don't need it. With the attack maps
+        it's a lookup instead
+        :param square: king square
+        :param moves: list the moves are appended to
         """
+        board = self.board
+        enemy_color = s.black if self.is_whites_turn else s.white
+        square_values = s.king_mid
+        base = square + move_base
+        attacked = None
+        behind_king = ()
+        if self.attack_maps:
+            attacked = self.attack_counts[enemy_color]
+            # note - the maps have the king on the board, so the square behind it on a checking slider's ray is
+            # missing from them
+            behind_king = [square - direction for _, direction in self.checks if direction]
+
+        for direction in s.king_moves:
+            end_square = square + direction  # moving in the direction one step
+            piece_e = board[end_square]  # end square contents
 
-
-
-
-
-
-
-        for direction in s.diagonal_dirs + s.linear_dirs:  # FIXME - this shouldn't be in the loop for rook, bishop, queen
-            for i in range(1, 2):
-                end_square = square + direction * i  # moving in the direction one step
-                color_e, piece_e = self.get_square_info(end_square)  # end square contents
-
-                if color_e in [enemy_color, '-']:  # seeing if enemy piece at final square or empty (valid sqare check)
-                    # TODO - implement pin check logic
-                    # if not piece_pinned or pin_direction in (d, -d):  #
-
-                    # note - calculating the increase in piece value based on move and game phase
-                    # TODO - increase this such that there are multiple tables extrapolated between based on phase
-                    piece_increase = (
-                            s.piece_value_mid_game[piece_s][end_square] - s.piece_value_mid_game[piece_s][square])
-
-                    # note - start/end sqaure - no (TODO  what this this)
+            if piece_e == s.empty or piece_e & enemy_color:  # enemy piece at final square or empty (valid square)
+                if attacked is None:
+                    attacked = self.attacked_squares(enemy_color, square)
+                if not attacked[end_square] and end_square not in behind_king:
                     # note -  delta of evaluation (based on the above tables + the taken piece (end square value)
-                    if not self.check_check(end_square):
-                        moves.append((square, end_square, '{}K'.format(color_s), piece_increase + s.mvv_lva_values[piece_e]))
-                        #if self.turn == 'b':
-                            #print('{} valid king square'.format(end_square))
-                    # note - if the end_square houses a enemy piece - stop checking in that direction???? #FIXME
-                    if color_e == enemy_color:
-                        break  # break out of that direction
-                else:
-                    break
-
-    def init_king_positions(self):
+                    delta_eval = square_values[end_square] - square_values[square] + \
+                        s.mvv_lva_by_type[piece_e & s.piece_type_mask]
+                    moves.append(base + (end_square << 7) + (delta_eval << score_shift))
+
+        # Castling - not out of, through or into check, rights are kept up to date by make_move so the king and rook
+        # are on their start squares
+        if not self.is_in_check and self.castling_rights != '-':
+            color = s.white if self.is_whites_turn else s.black
+            for king_end, (right, king_start, path, king_path) in s.castling_paths.items():
+                if right in self.castling_rights and king_start == square and board[square] == color | s.king and \
+                        all(board[square_f] == s.empty for square_f in path):
+                    if attacked is None:
+                        attacked = self.attacked_squares(enemy_color, square)
+                    if not any(attacked[square_f] for square_f in king_path):
+                        moves.append(me.encode_move(square, king_end, me.castle,
+                                                    square_values[king_end] - square_values[square]))
+
+    def init_piece_lists(self):
         """
-        Finds the locations of the kings (assumes only 2!) and updates the king location dictionary for each color
+        Single scan of the board to fill the piece lists (make/unmake keep them up to date afterwards)
         """
-        for square in self.board:
-            color, piece = self.get_square_info(square)
-            if piece == 'K':
-                self.king_location[color] = square
+        for square in s.real_board_squares:
+            piece = self.board[square]
+            if piece != s.empty:
+                self.piece_lists[piece].append(square)
 
-    def init_piece_values(self):
+    def piece_squares(self, code):
         """
-        Sets the starting values of the two piece value
-        Fixme - wonder if using a dict here is slower? doubt it
-        :return:
+        Squares of one piece code (the piece list itself, don't modify it)
         """
-        for square in self.board:
-            color, piece = self.get_square_info(square)
-            if color in s.valid_colors:
-                # TODO - include the square bonus here (will have to invert black position to use 1 board)
-                self.piece_values[color] += c.piece_value[piece]
+        return self.piece_lists[code]
 
-    def initialize_piece_count_dict(self):
+    @property
+    def king_location(self) -> dict:
         """
-        Iterates through self.board and initializes the number of pieces within piece dict (assumes values are at 0)
-        :return: None
+        King square of each color (from the piece lists, assumes only 2 kings!)
+        :return: {'w': square, 'b': square}
         """
-        for square, piece_data in self.board.items():
-            color = piece_data[0]
-            piece = piece_data[1]
+        return {'w': self.piece_lists[s.white | s.king][0], 'b': self.piece_lists[s.black | s.king][0]}
 
-            if piece in s.valid_pieces:
-                if color == 'b':
-                    self.piece_dict[1][piece] += 1
-                else:
-                    self.piece_dict[0][piece] += 1
-        return None
+    def has_non_pawn_material(self):
+        """
+        Does the side to move have a knight, bishop, rook or queen (from the piece lists, see null move pruning)
+        """
+        color = s.white if self.is_whites_turn else s.black
+        piece_lists = self.piece_lists
+        return bool(piece_lists[color | s.knight] or piece_lists[color | s.bishop] or piece_lists[color | s.rook] or
+                    piece_lists[color | s.queen])
 
-    @staticmethod
-    def initialize_piece_dict() -> list:
+    @property
+    def piece_dict(self) -> list:
         """
-        Creates a list containing dictionaries of piece counts for each player [white,black]
-        :return: list of dicts
+        Piece counts for each player [white, black], from the piece lists
+        :return: list of dicts (piece letter -> count)
         """
+        return [{piece: len(self.piece_lists[color | piece_type]) for piece, piece_type in zip(s.valid_pieces, s.piece_types)}
+                for color in (s.white, s.black)]
 
-        white_dict = {}
-        black_dict = {}
+    @property
+    def piece_values(self) -> dict:
+        """
+        Total material of each color (# note - no square bonus, see material_score for the evaluation)
+        :return: {'w': value, 'b': value}
+        """
+        return {color_str: sum(c.piece_value[piece] * len(self.piece_lists[color | piece_type])
+                               for piece, piece_type in zip(s.valid_pieces, s.piece_types))
+                for color_str, color in (('w', s.white), ('b', s.black))}
 
-        for piece in s.valid_pieces:
-            white_dict[piece] = 0
-            black_dict[piece] = 0
+    @property
+    def rook_columns_list(self) -> list:
+        """
+        Columns (square % 10) of the rooks of each color [white, black]
+        """
+        return [[square % 10 for square in self.piece_lists[color | s.rook]] for color in (s.white, s.black)]
 
-        return [white_dict, black_dict]
+    @property
+    def pawn_columns_list(self) -> list:
+        """
+        Columns (square % 10) of the pawns of each color [white, black]
+        """
+        return [[square % 10 for square in self.piece_lists[color | s.pawn]] for color in (s.white, s.black)]
 
-    #@jit
     def get_square_info(self, square):
-        return self.board[square][0], self.board[square][1]
-        #color = self.get_square_color(square)
-        #piece = self.get_square_piece(square)
-        #return color, piece
+        """
+        Compatibility accessor for the GUI - piece string of the array board code split into color and piece
+        :param square: square index
+        :return: color ('w', 'b', '-' empty or 'F' off board), piece ('p', 'N'... '-' or 'F')
+        """
+        piece = s.code_to_piece[self.board[square]]
+        return piece[0], piece[1]
 
-    #@profile
-    def get_square_color(self, square: int, none_check=False) -> str:
+    def get_square_color(self, square: int) -> str:
         """
-        Gets color of piece based on board dict index
+        Gets color of piece based on board index
         :param square: square index
-        :param none_check: flag if a non valid (empty or off board) piece should be returned as None
-        :return: w/b or None if empty square/outside of game board
+        :return: w/b, '-' if empty or 'F' if outside of game board
         """
-        return self.board[square][0]
-        color = self.board[square][0]
-        return color if color in s.valid_colors else None if none_check else color
-    #@profile
-    def get_square_piece(self, square: int, none_check=False) -> str:
+        return s.code_to_piece[self.board[square]][0]
+
+    def get_square_piece(self, square: int) -> str:
         """
-        Gets piece based on board dict index
+        Gets piece based on board index
         :param square: square index
-        :param none_check: flag if a non valid (empty or off board) piece should be returned as None
-        :return: w/b or None if empty square/outside of game board
-        :return:
-        """
-        return self.board[square][1]
-        piece = self.board[square][1]
-        return piece if piece in s.valid_pieces else None if none_check else piece
-
-    def init_piece_columns(self):
-        """
-        Populates these random empty lists, such that the square column is added to a list for each color/
-        piece of interest
-        :return: None
-        """
-        # FIXME - hate lots of this lol! # note - don't think this is super important for now though
-        for square in self.board:
-            piece_type, color = self.get_square_piece(square), self.get_square_color(square)
-            # FIXME - for now just going to continue iterating over every cell, but in future would like to track
-            #       - the pieces location (wasted loops on non pieces may add up? probably not but will see!)
-            if piece_type in c.column_pieces:
-                # FIXME - surely generalize such that you can track any column?
-                #       - this makes me think that this is very specific evaluation helper data
-                if piece_type == 'R':
-                    if color == 'w':
-                        # Fixme - don't like how the individual colors are referenced here with 0/1 implied
-                        self.rook_columns_list[0].append(square % 10)
-                    elif color == 'b':
-                        self.rook_columns_list[1].append(square % 10)
-                elif piece_type == 'p':
-                    if color == 'w':
-                        self.pawn_columns_list[0].append(square % 10)
-                    elif color == 'b':
-                        self.pawn_columns_list[1].append(square % 10)
+        :return: piece letter, '-' if empty or 'F' if outside of game board
+        """
+        return s.code_to_piece[self.board[square]][1]
 
     def game_constant_A(self):
         """
-        Constant to be used in evaluating
+        Game phase of the starting position - 1 with all the pieces on the board, 0 with only pawns and kings
+        (# note - the search uses the phase kept by make/unmake, see AlphaBetaPruning.evaluation)
         :return: A value
         """
-        example = min(self.full_move, 50) / 50
-        return example
+        phase = sum(s.phase_values[code] * len(squares) for code, squares in enumerate(self.piece_lists))
+        return min(phase, s.max_phase) / s.max_phase
 
     def game_constant_B(self):
         """
@@ -752,18 +942,6 @@ def move_counter(game, depth):
 
 
 
-test_fen = '1k1r4/pp1b1R2/3q2pp/4p3/2B5/4Q3/PPP2B2/2K5 b - - 0 1'
-test_instance = GameInstance(starting_fen=test_fen)
-
-t0 = time.time()
-move_count = move_counter(test_instance, depth=4)
-t1 = time.time()
-my_time = t1-t0
-print("{} boards found".format(move_count))
-print("{} secs".format(t1-t0))
-print("{} boards/sec".format(move_count/(t1-t0)))
-
-
 def move_counter2(board, depth):
     if depth == 0:
         return 1
@@ -780,24 +958,37 @@ def move_counter2(board, depth):
     return count
 
 
-
-
-print('starting pychess test')
-board = chess.Board()
-t0 = time.time()
-move_count = move_counter2(board, depth=4)
-t1 = time.time()
-print("{} boards found".format(move_count))
-print("{} secs".format(t1-t0))
-print("{} boards/sec".format(move_count/(t1-t0)))
-their_time = t1-t0
-
-print("{0:.2f}% speed up!".format(100*((their_time/my_time)-1)))
-
-"""
-while 1:
-    test_instance.get_all_possible_moves()
-    move = random.choice(test_instance.possible_moves)
-    test_instance.make_move(move)
-#print('exiting')
-"""
\ No newline at end of file
+def benchmark(depth=4):
+    """
+    Perft race of GameInstance (move_counter) against python-chess (move_counter2), see perft.py for the
+    correctness suite
+    :param depth: perft depth
+    """
+    import chess  # note - only needed for the race, keeps python-chess out of the engine imports
+
+    test_fen = '1k1r4/pp1b1R2/3q2pp/4p3/2B5/4Q3/PPP2B2/2K5 b - - 0 1'
+    test_instance = GameInstance(starting_fen=test_fen)
+
+    t0 = time.time()
+    move_count = move_counter(test_instance, depth=depth)
+    t1 = time.time()
+    my_time = t1-t0
+    print("{} boards found".format(move_count))
+    print("{} secs".format(t1-t0))
+    print("{} boards/sec".format(move_count/(t1-t0)))
+
+    print('starting pychess test')
+    board = chess.Board(test_fen)
+    t0 = time.time()
+    move_count = move_counter2(board, depth=depth)
+    t1 = time.time()
+    print("{} boards found".format(move_count))
+    print("{} secs".format(t1-t0))
+    print("{} boards/sec".format(move_count/(t1-t0)))
+    their_time = t1-t0
+
+    print("{0:.2f}% speed up!".format(100*((their_time/my_time)-1)))
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
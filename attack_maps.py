@@ -0,0 +1,204 @@
+import sys
+import time
+
+import config as c
+import fen_settings as s
+
+# Attack maps - per color counts of the pieces attacking each square (120 square bytearrays, indexed by the color
+# code in a list like the piece lists), so "is this square attacked" is a lookup. GameInstance keeps them up to date
+# in make_move by replaying the squares the move changed through set_square - the pieces on those squares have their
+# attacks removed/added and only the slider rays passing through them are re-scanned
+colors = s.white | s.black
+empty, off_board, piece_type_mask = s.empty, s.off_board, s.piece_type_mask  # note - module globals, hot loops
+
+# Sliders that attack along a direction (by piece type)
+_ray_sliders = {direction: (s.rook, s.queen) if direction in s.linear_dirs else (s.bishop, s.queen)
+                for direction in s.king_moves}
+_slider_directions = {s.bishop: s.diagonal_dirs, s.rook: s.linear_dirs, s.queen: s.king_moves}
+_step_directions = {s.knight: s.knight_moves, s.king: s.king_moves}
+
+
+def compute_attack_counts(board):
+    """
+    Attack maps of a board from scratch
+    :param board: mailbox board (GameInstance.board bytearray)
+    :return: list indexed by color code (s.white, s.black) of 120 square bytearrays - attackers of each square
+    """
+    attack_counts = new_attack_counts()
+    for square in s.real_board_squares:
+        piece = board[square]
+        if piece != empty:
+            piece_attacks(board, attack_counts[piece & colors], square, piece, 1)
+    return attack_counts
+
+
+def new_attack_counts():
+    """
+    Empty attack maps (no square attacked)
+    """
+    attack_counts = [None] * (s.black + 1)
+    attack_counts[s.white] = bytearray(s.board_square_count)
+    attack_counts[s.black] = bytearray(s.board_square_count)
+    return attack_counts
+
+
+def copy_attack_counts(attack_counts, copied=None):
+    """
+    :param attack_counts: attack maps copied
+    :param copied: attack maps overwritten with the copy (preallocated, see GameInstance.init_undo_stack), None for
+    new ones
+    :return: copied
+    """
+    if copied is None:
+        copied = new_attack_counts()
+    copied[s.white][:] = attack_counts[s.white]
+    copied[s.black][:] = attack_counts[s.black]
+    return copied
+
+
+def piece_attacks(board, counts, square, piece, delta):
+    """
+    Adds (delta 1) or removes (delta -1) the attacks of one piece (off board squares are never counted)
+    :param board: mailbox board
+    :param counts: attack map of the piece's color
+    :param square: square of the piece
+    :param piece: piece code
+    :param delta: 1 or -1
+    """
+    piece_type = piece & piece_type_mask
+    if piece_type == s.pawn:
+        forward = -10 if piece & s.white else 10
+        for square_f in (square + forward - 1, square + forward + 1):
+            if board[square_f] != off_board:
+                counts[square_f] += delta
+    elif piece_type in _step_directions:
+        for direction in _step_directions[piece_type]:
+            if board[square + direction] != off_board:
+                counts[square + direction] += delta
+    else:
+        for direction in _slider_directions[piece_type]:
+            square_f = square + direction
+            piece_f = board[square_f]
+            while piece_f == empty:
+                counts[square_f] += delta
+                square_f += direction
+                piece_f = board[square_f]
+            if piece_f != off_board:
+                counts[square_f] += delta
+
+
+def slider_rays(board, attack_counts, square, delta):
+    """
+    Extends (delta 1, the square has just been emptied) or cuts short (delta -1, the square is about to be filled)
+    the slider rays that reach the square - the squares beyond it up to the next piece
+    :param board: mailbox board (the square is empty)
+    :param attack_counts: attack maps
+    :param square: square whose occupancy changes
+    :param delta: 1 or -1
+    """
+    # note - a slider ray through the square attacks it, so an unattacked square has none to update
+    if not attack_counts[s.white][square] and not attack_counts[s.black][square]:
+        return
+
+    for direction in s.king_moves:
+        # First piece looking out from the square, a slider attacking back along the direction passes through it
+        square_f = square + direction
+        piece_f = board[square_f]
+        while piece_f == empty:
+            square_f += direction
+            piece_f = board[square_f]
+        if piece_f & piece_type_mask not in _ray_sliders[direction]:  # note - off board & type mask is 0
+            continue
+
+        counts = attack_counts[piece_f & colors]
+        square_f = square - direction
+        piece_f = board[square_f]
+        while piece_f == empty:
+            counts[square_f] += delta
+            square_f -= direction
+            piece_f = board[square_f]
+        if piece_f != off_board:
+            counts[square_f] += delta
+
+
+def set_square(board, attack_counts, square, piece):
+    """
+    Puts a piece (or s.empty) on a square, keeping the attack maps up to date
+    :param board: mailbox board
+    :param attack_counts: attack maps
+    :param square: square index
+    :param piece: piece code placed (s.empty to clear the square)
+    """
+    old_piece = board[square]
+    if old_piece != empty:
+        piece_attacks(board, attack_counts[old_piece & colors], square, old_piece, -1)
+    elif piece != empty:
+        slider_rays(board, attack_counts, square, -1)
+
+    board[square] = piece
+    if piece != empty:
+        piece_attacks(board, attack_counts[piece & colors], square, piece, 1)
+    elif old_piece != empty:
+        slider_rays(board, attack_counts, square, 1)
+
+
+def evaluate(board):
+    """
+    Mobility/king safety term from the attack maps - every attack on the board (attacks on own pieces count as
+    defence) minus the attacks on the squares around each king
+    :param board: game instance with attack maps
+    :return: score (white positive)
+    """
+    white_counts, black_counts = board.attack_counts[s.white], board.attack_counts[s.black]
+    score = c.mobility_weight * (sum(white_counts) - sum(black_counts))
+    for king in board.piece_lists[s.white | s.king]:
+        score -= c.king_zone_attack_penalty * king_zone_attacks(black_counts, king)
+    for king in board.piece_lists[s.black | s.king]:
+        score += c.king_zone_attack_penalty * king_zone_attacks(white_counts, king)
+    return score
+
+
+def king_zone_attacks(counts, king):
+    """
+    Attacks on the king's square and the 8 around it (the 3 rows of 3 as slices)
+    """
+    return sum(counts[king - 11:king - 8]) + sum(counts[king - 1:king + 2]) + sum(counts[king + 9:king + 12])
+
+
+def benchmark(depth=None):
+    """
+    Perft suite (mailbox) and search nodes/sec with the attack maps off and on
+    :param depth: perft depth for every position (None for the default depths)
+    """
+    import contextlib
+    import io
+    import AlphaBetaPruning as ab
+    import move_ordering as mo
+    import perft
+    import search_benchmark as sb
+    import transposition as tt
+
+    saved = c.attack_maps
+    try:
+        for attack_maps in (False, True):
+            c.attack_maps = attack_maps
+            report = perft.run_suite('mailbox', depth)
+            total, nodes = 0, 0
+            for fen in sb.benchmark_positions.values():
+                board = ab.new_game(fen)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    t0 = time.perf_counter()
+                    ab.minimaxRoot(4, board, board.is_whites_turn, True,
+                                   transposition_table=tt.TranspositionTable(16), move_orderer=mo.MoveOrderer())
+                    total += time.perf_counter() - t0
+                nodes += ab.search_stats['nodes'] + ab.search_stats['qs_nodes']
+            print('attack maps {:<5}  perft {:>7} nodes {} {:6.2f}s {:>8} nodes/sec  search depth 4 {:>7} nodes '
+                  '{:6.2f}s {:>6.0f} nodes/sec'.format(str(attack_maps), report['total_nodes'],
+                                                       'ok' if report['passed'] else 'FAIL', report['total_elapsed'],
+                                                       report['nodes_per_sec'], nodes, total, nodes / total))
+    finally:
+        c.attack_maps = saved
+
+
+if __name__ == "__main__":
+    benchmark(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,212 @@
+import argparse
+import collections
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import AlphaBetaPruning as ab
+import config as c
+import move_encoding as me
+import perft
+
+# Batch analysis of position dumps - fens are read lazily and fanned out to a process pool with a bounded number of
+# positions in flight, so memory use doesn't grow with the input. Results stream back as json lines
+
+
+def parse_fen_line(line):
+    """
+    Fen of an input line - full fens, or epd lines (4 fields + opcodes) which get '0 1' as the move counters
+    :param line: input line
+    :return: fen string (None for blank and '#' comment lines)
+    """
+    fields = line.split()
+    if not fields or fields[0].startswith('#'):
+        return None
+    if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit():
+        return ' '.join(fields[:6])
+    return ' '.join(fields[:4] + ['0', '1'])
+
+
+def check_kings(fen):
+    """
+    Raises ValueError unless the fen has one king of each color (the move generators and search need both)
+    """
+    placement = fen.split()[0]
+    if placement.count('K') != 1 or placement.count('k') != 1:
+        raise ValueError('fen needs one white and one black king: {}'.format(fen))
+
+
+def analyse_fen(index, fen, depth, time_limit=None, backend=None, square_bonus=True):
+    """
+    Searches one position (run in the worker processes)
+    :param index: position number in the input (passed through so unordered results can be matched up)
+    :param fen: position
+    :param depth: maximum depth
+    :param time_limit: seconds per position (None for no limit)
+    :param backend: 'mailbox' or 'bitboard' (defaults to c.game_backend)
+    :param square_bonus: include the square bonus in the evaluation
+    :return: dict of the best move (uci), score (white positive), mate (moves, negative if black mates), depth,
+    nodes, seconds, result ('checkmate' or 'stalemate' if the side to move has no legal moves, else None) and the
+    error (if the fen couldn't be searched)
+    """
+    result = {'index': index, 'fen': fen, 'best_move': None, 'score': None, 'mate': None, 'depth': 0, 'nodes': 0,
+              'seconds': 0.0, 'result': None, 'error': None}
+    t0 = time.perf_counter()
+    try:
+        check_kings(fen)
+        board = perft.new_game(backend or c.game_backend, fen)
+        if not board.get_all_legal_moves():
+            result.update(result='checkmate' if board.is_in_check else 'stalemate',
+                          seconds=round(time.perf_counter() - t0, 4))
+            return result
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            best_move = ab.minimaxRoot(depth, board, board.is_whites_turn, square_bonus, time_limit=time_limit,
+                                       workers=1)
+    except Exception as error:  # note - a bad line shouldn't end the batch
+        result['error'] = '{}: {}'.format(type(error).__name__, error)
+        return result
+
+    score = ab.search_stats['best_score']
+    if score is not None and abs(score) >= ab.mate_threshold:
+        result['mate'] = (ab.mate_score - abs(score) + 1) // 2 * (1 if score > 0 else -1)
+    result.update(best_move=me.move_to_uci(best_move) if best_move else None,
+                  score=score,
+                  depth=ab.search_stats['depth'],
+                  nodes=ab.search_stats['nodes'] + ab.search_stats['qs_nodes'],
+                  seconds=round(time.perf_counter() - t0, 4))
+    return result
+
+
+def analyse_stream(fens, depth, time_limit=None, workers=None, ordered=True, max_pending=None, backend=None,
+                   square_bonus=True):
+    """
+    Generator of analysis results for an iterable of fens (e.g. a file), keeping at most max_pending positions in
+    flight
+    :param fens: iterable of fen strings
+    :param depth: maximum depth per position
+    :param time_limit: seconds per position (None for no limit)
+    :param workers: processes (defaults to c.search_workers, 1 searches in this process)
+    :param ordered: yield results in input order (else in completion order)
+    :param max_pending: positions submitted but not yet yielded (defaults to 4 per worker)
+    :param backend: 'mailbox' or 'bitboard' (defaults to c.game_backend)
+    :param square_bonus: include the square bonus in the evaluation
+    :return: generator of result dicts (see analyse_fen)
+    """
+    workers = workers or c.search_workers
+    if workers == 1:
+        for index, fen in enumerate(fens):
+            yield analyse_fen(index, fen, depth, time_limit, backend, square_bonus)
+        return
+
+    max_pending = max_pending or 4 * workers
+    with ProcessPoolExecutor(workers) as pool:
+        pending = collections.deque()
+        fens = iter(enumerate(fens))
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                item = next(fens, None)
+                if item is None:
+                    exhausted = True
+                else:
+                    pending.append(pool.submit(analyse_fen, *item, depth, time_limit, backend, square_bonus))
+            if not pending:
+                break
+
+            if ordered:
+                yield pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield future.result()
+
+
+def evaluate_stream(fens, chunk_size=4096, square_bonus=True):
+    """
+    Generator of static evaluations (no search) - fens are scored a chunk at a time with the vectorised evaluator
+    :param fens: iterable of fen strings
+    :param chunk_size: positions per numpy batch (bounds the memory use)
+    :param square_bonus: include the square bonus, pawn structure and attack map terms in the evaluation (the same
+    score as AlphaBetaPruning.evaluation)
+    :return: generator of result dicts in input order (see analyse_fen, depth 0 and no best move - checkmate and
+    stalemate aren't detected, result is always None)
+    """
+    import itertools
+    import numpy as np
+    import fen_logic as fl
+    import pawn_structure as pawns
+    import vector_evaluation as ve
+
+    fens = iter(enumerate(fens))
+    while True:
+        chunk = list(itertools.islice(fens, chunk_size))
+        if not chunk:
+            return
+        t0 = time.perf_counter()
+        results, arrays, extra = [], [], []
+        for index, fen in chunk:
+            result = {'index': index, 'fen': fen, 'best_move': None, 'score': None, 'mate': None, 'depth': 0,
+                      'nodes': 1, 'seconds': 0.0, 'result': None, 'error': None}
+            try:
+                check_kings(fen)
+                board = fl.decode_fen(fen)[0]
+                # note - the terms the vectorised evaluator doesn't have are added per position
+                score = pawns.evaluate_board(board) if square_bonus and c.pawn_structure else 0
+                if square_bonus and c.attack_maps:
+                    score += ab.am.evaluate(ab.new_game(fen))
+                arrays.append(ve.board_array(board))
+                extra.append(score)
+            except Exception as error:
+                result.update(nodes=0, error='{}: {}'.format(type(error).__name__, error))
+            results.append(result)
+
+        scores = iter(ve.evaluate_batch(np.stack(arrays), 'evaluation' if square_bonus else 'material') +
+                      np.array(extra, dtype=np.int32) if arrays else [])
+        seconds = round((time.perf_counter() - t0) / len(chunk), 6)
+        for result in results:
+            if result['error'] is None:
+                result.update(score=int(next(scores)), seconds=seconds)
+            yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Searches every fen of a file/stdin, writing json lines')
+    parser.add_argument('input', nargs='?', default='-', help="fen/epd file, one position per line ('-' for stdin)")
+    parser.add_argument('--output', default='-', help="json lines file ('-' for stdout)")
+    parser.add_argument('--depth', type=int, default=4, help='0 for the static evaluation only (vectorised)')
+    parser.add_argument('--time-limit', type=float, help='seconds per position')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--unordered', action='store_true', help='write results as they complete')
+    parser.add_argument('--backend', choices=('mailbox', 'bitboard'), default=c.game_backend)
+    parser.add_argument('--square-bonus', action=argparse.BooleanOptionalAction, default=True,
+                        help='include the square bonus in the evaluation (--no-square-bonus for material only)')
+    args = parser.parse_args(argv)
+
+    input_file = sys.stdin if args.input == '-' else open(args.input)
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        fens = (fen for fen in map(parse_fen_line, input_file) if fen is not None)
+        errors = 0
+        if args.depth == 0:
+            results = evaluate_stream(fens, square_bonus=args.square_bonus)
+        else:
+            results = analyse_stream(fens, args.depth, args.time_limit, args.workers, not args.unordered,
+                                     backend=args.backend, square_bonus=args.square_bonus)
+        for result in results:
+            errors += result['error'] is not None
+            output_file.write(json.dumps(result) + '\n')
+            output_file.flush()
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,3 +7,65 @@ piece_value = {"p": 100,
                "R": 500,
                "Q": 900,
                "K": 20000}
+
+# Pawn structure (pawn_structure) - the pawn terms are cached in a pawn hash table by the pawn only zobrist key
+pawn_structure = True
+pawn_hash_mb = 2
+doubled_pawn_penalty = 10  # per extra pawn on a file
+isolated_pawn_penalty = 15
+backward_pawn_penalty = 8
+passed_pawn_bonus = [0, 0, 5, 10, 20, 35, 60, 100, 0]  # by rank from the pawn's side
+rook_open_file_bonus = 20
+rook_half_open_file_bonus = 10
+
+# Attack maps - per color attacker counts of every square kept up to date by make/unmake (mailbox only), so square
+# attacked queries are lookups. Also adds a mobility/king safety term to the evaluation
+attack_maps = False
+mobility_weight = 2  # per attack on the board
+king_zone_attack_penalty = 6  # per enemy attack on the king's square and the squares around it
+
+# Move generation backend - 'mailbox' (GameInstance) or 'bitboard' (BitboardInstance, fully legal)
+game_backend = 'mailbox'
+
+# Search
+transposition_table_mb = 64  # memory budget of the transposition table
+incremental_evaluation = True  # keep material/square bonus up to date in make/unmake (O(1) leaf evaluation)
+tapered_evaluation = True  # blend the mid/end game square bonus by the game phase (incremental evaluation only)
+undo_stack_plies = 256  # preallocated make/unmake undo slots and move lists (grown if a game gets longer)
+
+# Opening book (opening_book) - Polyglot .bin file probed before each search, None for no book
+opening_book = None
+max_book_ply = 16  # plies into the game the book is used for
+book_weighted_random = True  # pick book moves in proportion to their weights (else always the highest weight)
+
+# Iterative deepening - depths 1..max_search_depth are searched until the time limit (seconds per move) runs out
+search_time_limit = 2.0
+max_search_depth = 32
+aspiration_window = 50  # centipawns either side of the previous iteration's score
+aspiration_min_depth = 3  # iterations before this use the full window (shallow scores swing too much)
+search_workers = 1  # processes searching (1 searches in this process)
+parallel_search = 'root'  # 'root' (root moves split across the workers) or 'lazy_smp' (shared transposition table)
+helper_stop_timeout = 5  # seconds a stopped Lazy SMP search waits for its helpers to report before going on without them
+
+# Selective search - null move pruning (skipped in check and with only pawns left) and late move reductions
+null_move_pruning = True
+null_move_reduction = 2  # plies the null move search is reduced by (on top of the null move itself)
+null_move_min_depth = 3
+late_move_reductions = True
+lmr_min_moves = 4  # moves searched at full depth before quiet moves are reduced
+lmr_min_depth = 3
+lmr_reduction = 1
+
+# Quiescence search (captures/promotions only at the minimax leaves)
+quiescence = True
+quiescence_max_depth = 8  # plies of captures below a leaf
+quiescence_max_nodes = 100000  # per root search, leaves are scored with the static evaluation once used up
+quiescence_delta_margin = 200  # captures that can't get the score within this of alpha/beta are skipped
+
+# Score all the children of a depth 1 node in one numpy batch (vector_evaluation) - only used with quiescence off
+vectorized_frontier = False
+
+# Debug switches (slow - recompute from scratch after every make/unmake and raise on mismatch)
+verify_zobrist = False
+verify_evaluation = False
+verify_attack_maps = False
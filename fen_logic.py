@@ -1,14 +1,14 @@
 import fen_settings as s
 
 
-def decode_fen(fen: str) -> dict:
+def decode_fen(fen: str) -> tuple:
     """
-    Decodes a fen into a dictionary containing ??? TODO  fill this out once complete
+    Decodes a fen into the array board (bytearray of piece codes, see fen_settings) + the rest of the game state
     :param fen: string
-    :return:
+    :return: board, castling_rights, en_passant_square, half_turn, full_turn, is_whites_turn
     """
 
-    board = {}
+    board = bytearray(s.board_square_count)
     # splitting the fen into parts
     square_data, turn, castling_rights, en_passant, half_turn, full_turn = fen.split(" ")
     square_data = square_data.replace('/', '')
@@ -16,9 +16,9 @@ def decode_fen(fen: str) -> dict:
     # Create an empty board
     for square in range(s.board_square_count):
         if square in s.real_board_squares:
-            board[square] = "--"  # on the board
+            board[square] = s.empty  # on the board
         else:
-            board[square] = "FF"  # not on the board
+            board[square] = s.off_board  # not on the board
 
     # Populating board with fen data
     square_index = 0
@@ -27,7 +27,7 @@ def decode_fen(fen: str) -> dict:
             square_index += int(square_content)  # step over the number of squares
         else:
             board_index = s.real_board_squares[square_index]
-            board[board_index] = s.fen_to_piece[square_content]
+            board[board_index] = s.fen_to_code[square_content]
             square_index += 1  # increment for next insertion
 
     # Processing en_passant square
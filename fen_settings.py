@@ -1,3 +1,5 @@
+import config as c
+
 # Board used for start-up drawing of the board
 # note - this is using Square list method (see https://en.wikipedia.org/wiki/Board_representation_(computer_chess))
 # TODO - rename this from fen to just settings?
@@ -9,6 +11,7 @@
 
 linear_dirs = [-10, -1, 10, 1]
 diagonal_dirs = [-11, -9, 9, 11]
+king_moves = linear_dirs + diagonal_dirs  # also the queen directions
 knight_moves = [-21, -19, -12, -8, 8, 12, 19, 21]  # Up-up-left, up-up-right ......
 
 opposite_dir_dict = {-10: 10,
@@ -21,12 +24,42 @@ opposite_dir_dict = {-10: 10,
                      11: -9}
 
 
+# Castling rights lost when a piece moves from/to (rook captured) these squares
+castling_rights_squares = {95: 'KQ', 91: 'Q', 98: 'K',
+                           25: 'kq', 21: 'q', 28: 'k'}
+
+# Castling - king end square -> (castling right, rook start square, rook end square)
+castling_moves = {97: ('K', 98, 96), 93: ('Q', 91, 94),
+                  27: ('k', 28, 26), 23: ('q', 21, 24)}
+
+# Castling - king end square -> (castling right, king start square, squares that must be empty,
+# squares the king crosses that must not be attacked)
+castling_paths = {}
+for _king_end, (_right, _rook_start, _) in castling_moves.items():
+    _king_start = 95 if _right.isupper() else 25
+    _step = 1 if _rook_start > _king_start else -1
+    castling_paths[_king_end] = (_right, _king_start, list(range(_king_start + _step, _rook_start, _step)),
+                                 list(range(_king_start + _step, _king_end + _step, _step)))
+
+
 diagonals = [9, 11]
 up = 10
 board_square_count = 120  # 12x10
 valid_pieces = 'pNBRQK'
 valid_colors = 'wb'
 
+# Array board piece codes - piece type in the low 3 bits, color as a bit flag (GameInstance.board is a bytearray)
+empty = 0
+pawn, knight, bishop, rook, queen, king = 1, 2, 3, 4, 5, 6
+piece_types = (pawn, knight, bishop, rook, queen, king)
+white, black = 8, 16
+off_board = 32
+piece_type_mask = 7
+piece_code_count = off_board + 1  # length of lists indexed by piece code
+
+# Piece types a pawn can promote to (in the order the generators emit them)
+promotion_pieces = (queen, rook, bishop, knight)
+
 start_board = {0: 'FF',   1: 'FF',   2: 'FF',   3: 'FF',   4: 'FF',   5: 'FF',   6: 'FF',   7: 'FF',   8: 'FF',   9: 'FF',   # [  0,   1,   2,   3,   4,   5,   6,   7,   8,   9]
               10: 'FF',  11: 'FF',  12: 'FF',  13: 'FF',  14: 'FF',  15: 'FF',  16: 'FF',  17: 'FF',  18: 'FF',  19: 'FF',   # [ 10,  11,  12,  13,  14,  15,  16,  17,  18,  19]
               20: 'FF',  21: 'bR',  22: 'bN',  23: 'bB',  24: 'bQ',  25: 'bK',  26: 'bB',  27: 'bN',  28: 'bR',  29: 'FF',   # [ 20,  21,  22,  23,  24,  25,  26,  27,  28,  29]
@@ -86,6 +119,10 @@ algebraic_to_square_id = {'a8': 21, 'b8': 22, 'c8': 23, 'd8': 24, 'e8': 25, 'f8'
 
 square_id_to_algebraic = {v: k for k, v in algebraic_to_square_id.items()}
 
+# 64 square index used by python-chess/the evaluation tables (a1 = 0, h8 = 63)
+square_id_to_index_64 = {square: (9 - square // 10) * 8 + square % 10 - 1 for square in real_board_squares}
+index_64_to_square_id = sorted(real_board_squares, key=lambda square: square_id_to_index_64[square])
+
 # FEN representation to board pieces
 fen_to_piece = {'p': 'bp',
                 'n': 'bN',
@@ -100,6 +137,14 @@ fen_to_piece = {'p': 'bp',
                 'Q': 'wQ',
                 'K': 'wK'}
 
+# Piece strings <-> array board codes (the strings are kept for the GUI, see GameInstance.get_square_info)
+piece_to_code = {'--': empty, 'FF': off_board}
+for piece_index, piece in enumerate(valid_pieces):
+    piece_to_code['w' + piece] = white | (piece_index + 1)
+    piece_to_code['b' + piece] = black | (piece_index + 1)
+code_to_piece = {code: piece for piece, code in piece_to_code.items()}
+fen_to_code = {fen_char: piece_to_code[piece] for fen_char, piece in fen_to_piece.items()}
+
 
 
 king_mid = [0,   0,   0,   0,   0,   0,   0,   0,   0, 0,
@@ -187,6 +232,100 @@ piece_value_mid_game = {'K': king_mid,
                         'B': bishop_mid,
                         'N': knight_mid,
                         'p': pawn_mid}
+piece_value_mid_game_by_type = [None, pawn_mid, knight_mid, bishop_mid, rook_mid, queen_mid, king_mid]
+
+# Promotion pieces with the square table of the piece promoted to (for the move delta eval)
+promotion_moves = [(piece_type, piece_value_mid_game_by_type[piece_type]) for piece_type in promotion_pieces]
+
+
+# End game counterparts of the mid game tables - the king heads for the centre and pawns are worth more the further
+# up the board they are (used by the tapered evaluation, see end_game_values)
+king_end = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+            0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+            0, -50, -40, -30, -20, -20, -30, -40, -50, 0,
+            0, -30, -20, -10,   0,   0, -10, -20, -30, 0,
+            0, -30, -10,  20,  30,  30,  20, -10, -30, 0,
+            0, -30, -10,  30,  40,  40,  30, -10, -30, 0,
+            0, -30, -10,  30,  40,  40,  30, -10, -30, 0,
+            0, -30, -10,  20,  30,  30,  20, -10, -30, 0,
+            0, -30, -30,   0,   0,   0,   0, -30, -30, 0,
+            0, -50, -30, -30, -30, -30, -30, -30, -50, 0,
+            0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+            0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+
+queen_end = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+             0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+             0, -20, -10, -10,  -5,  -5, -10, -10, -20, 0,
+             0, -10,   0,   0,   0,   0,   0,   0, -10, 0,
+             0, -10,   0,   5,  10,  10,   5,   0, -10, 0,
+             0,  -5,   0,  10,  15,  15,  10,   0,  -5, 0,
+             0,  -5,   0,  10,  15,  15,  10,   0,  -5, 0,
+             0, -10,   0,   5,  10,  10,   5,   0, -10, 0,
+             0, -10,   0,   0,   0,   0,   0,   0, -10, 0,
+             0, -20, -10, -10,  -5,  -5, -10, -10, -20, 0,
+             0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+             0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+
+rook_end = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+            0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+            0,   0,   0,   0,   0,   0,   0,   0,   0, 0,
+            0,  10,  10,  10,  10,  10,  10,  10,  10, 0,
+            0,   0,   0,   0,   0,   0,   0,   0,   0, 0,
+            0,   0,   0,   0,   0,   0,   0,   0,   0, 0,
+            0,   0,   0,   0,   0,   0,   0,   0,   0, 0,
+            0,   0,   0,   0,   0,   0,   0,   0,   0, 0,
+            0,   0,   0,   0,   0,   0,   0,   0,   0, 0,
+            0,   0,   0,   0,   0,   0,   0,   0,   0, 0,
+            0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+            0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+
+bishop_end = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+              0, -20, -10, -10, -10, -10, -10, -10, -20, 0,
+              0, -10,   0,   0,   0,   0,   0,   0, -10, 0,
+              0, -10,   0,   5,  10,  10,   5,   0, -10, 0,
+              0, -10,   0,  10,  15,  15,  10,   0, -10, 0,
+              0, -10,   0,  10,  15,  15,  10,   0, -10, 0,
+              0, -10,   0,   5,  10,  10,   5,   0, -10, 0,
+              0, -10,   0,   0,   0,   0,   0,   0, -10, 0,
+              0, -20, -10, -10, -10, -10, -10, -10, -20, 0,
+              0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+
+knight_end = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+              0, -50, -40, -30, -30, -30, -30, -40, -50, 0,
+              0, -40, -20,   0,   0,   0,   0, -20, -40, 0,
+              0, -30,   0,  10,  15,  15,  10,   0, -30, 0,
+              0, -30,   5,  15,  20,  20,  15,   5, -30, 0,
+              0, -30,   5,  15,  20,  20,  15,   5, -30, 0,
+              0, -30,   0,  10,  15,  15,  10,   0, -30, 0,
+              0, -40, -20,   0,   5,   5,   0, -20, -40, 0,
+              0, -50, -40, -30, -30, -30, -30, -40, -50, 0,
+              0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+
+pawn_end = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+            0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+            0,   0,   0,   0,   0,   0,   0,   0,   0, 0,
+            0,  80,  80,  80,  80,  80,  80,  80,  80, 0,
+            0,  50,  50,  50,  50,  50,  50,  50,  50, 0,
+            0,  30,  30,  30,  30,  30,  30,  30,  30, 0,
+            0,  15,  15,  15,  15,  15,  15,  15,  15, 0,
+            0,   5,   5,   5,   5,   5,   5,   5,   5, 0,
+            0,   0,   0,   0,   0,   0,   0,   0,   0, 0,
+            0,   0,   0,   0,   0,   0,   0,   0,   0, 0,
+            0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+            0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+
+
+piece_value_end_game = {'K': king_end,
+                        'Q': queen_end,
+                        'R': rook_end,
+                        'B': bishop_end,
+                        'N': knight_end,
+                        'p': pawn_end}
+piece_value_end_game_by_type = [None, pawn_end, knight_end, bishop_end, rook_end, queen_end, king_end]
 
 # MVV-LVA move ordering  https://www.chessprogramming.org/MVV-LVA
 mvv_lva_values = {'K': 20000,
@@ -195,4 +334,98 @@ mvv_lva_values = {'K': 20000,
                   'B': 320,
                   'N': 290,
                   'p': 100,
-                  '-': 0}
\ No newline at end of file
+                  '-': 0}
+mvv_lva_by_type = [0] + [mvv_lva_values[piece] for piece in valid_pieces] + [0]  # indexed by code & piece_type_mask
+
+
+
+# Piece square tables used by the evaluation (64 squares, rank 8 first from whites point of view)
+BOUNDS_DICT = {
+    "P": [0, 0, 0, 0, 0, 0, 0, 0,
+          50, 50, 50, 50, 50, 50, 50, 50,
+          10, 10, 20, 30, 30, 20, 10, 10,
+          5, 5, 10, 25, 25, 10, 5, 5,
+          0, 0, 0, 20, 20, 0, 0, 0,
+          5, -5, -10, 0, 0, -10, -5, 5,
+          5, 10, 10, -20, -20, 10, 10, 5,
+          0, 0, 0, 0, 0, 0, 0, 0],
+
+    "N": [-50, -40, -30, -30, -30, -30, -40, -50,
+          -40, -20, 0, 0, 0, 0, -20, -40,
+          -30, 0, 10, 15, 15, 10, 0, -30,
+          -30, 5, 15, 20, 20, 15, 5, -30,
+          -30, 0, 15, 20, 20, 15, 0, -30,
+          -30, 5, 10, 15, 15, 10, 5, -30,
+          -40, -20, 0, 5, 5, 0, -20, -40,
+          -50, -40, -30, -30, -30, -30, -40, -50, ],
+
+    "B": [-20, -10, -10, -10, -10, -10, -10, -20,
+          -10, 0, 0, 0, 0, 0, 0, -10,
+          -10, 0, 5, 10, 10, 5, 0, -10,
+          -10, 5, 5, 10, 10, 5, 5, -10,
+          -10, 0, 10, 10, 10, 10, 0, -10,
+          -10, 10, 10, 10, 10, 10, 10, -10,
+          -10, 5, 0, 0, 0, 0, 5, -10,
+          -20, -10, -10, -10, -10, -10, -10, -20, ],
+
+    "R": [0, 0, 0, 0, 0, 0, 0, 0,
+          5, 10, 10, 10, 10, 10, 10, 5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          0, 0, 0, 5, 5, 0, 0, 0],
+
+    "Q": [-20, -10, -10, -5, -5, -10, -10, -20,
+          -10, 0, 0, 0, 0, 0, 0, -10,
+          -10, 0, 5, 5, 5, 5, 0, -10,
+          -5, 0, 5, 5, 5, 5, 0, -5,
+          0, 0, 5, 5, 5, 5, 0, -5,
+          -10, 5, 5, 5, 5, 5, 0, -10,
+          -10, 0, 5, 0, 0, 0, 0, -10,
+          -20, -10, -10, -5, -5, -10, -10, -20],
+
+    "K": [-30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -20, -30, -30, -40, -40, -30, -30, -20,
+          -10, -20, -20, -20, -20, -20, -20, -10,
+          20, 20, 0, 0, 0, 0, 20, 20,
+          20, 30, 10, 0, 0, 10, 30, 20]}
+
+
+# Incremental evaluation tables (see GameInstance.make_move) - signed (black negative) value of each piece code
+# on each board square, the piece values plus the BOUNDS_DICT square bonus (mirrored for black)
+material_values = [0] * piece_code_count
+square_bonus_values = [None] * piece_code_count
+for color in valid_colors:
+    sign = 1 if color == 'w' else -1
+    for piece in valid_pieces:
+        code = piece_to_code[color + piece]
+        material_values[code] = sign * c.piece_value[piece]
+
+        square_bonus_values[code] = [0] * board_square_count
+        for square in real_board_squares:
+            position = square_id_to_index_64[square] if color == 'w' else 63 - square_id_to_index_64[square]
+            square_bonus_values[code][square] = sign * BOUNDS_DICT[piece.upper()][(7 - position // 8) * 8 + position % 8]
+
+
+# Tapered evaluation https://www.chessprogramming.org/Tapered_Eval - signed end game square bonus of each piece code
+# (the piece_value_end_game tables, mirrored for black) and the game phase weight of each piece code. The phase is
+# max_phase with all the pieces on the board, 0 with only pawns and kings left
+phase_by_type = [0, 0, 1, 1, 2, 4, 0]  # indexed by code & piece_type_mask
+max_phase = 24
+end_game_values = [None] * piece_code_count
+phase_values = [0] * piece_code_count
+for color in valid_colors:
+    sign = 1 if color == 'w' else -1
+    for piece in valid_pieces:
+        code = piece_to_code[color + piece]
+        phase_values[code] = phase_by_type[code & piece_type_mask]
+
+        end_game_values[code] = [0] * board_square_count
+        for square in real_board_squares:
+            table_square = square if color == 'w' else (11 - square // 10) * 10 + square % 10
+            end_game_values[code][square] = sign * piece_value_end_game[piece][table_square]
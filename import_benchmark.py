@@ -0,0 +1,72 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Import time of the engine modules, each measured in a fresh interpreter (worker processes pay this on every spawn)
+engine_modules = ['fen_settings', 'move_encoding', 'zobrist', 'transposition', 'pawn_structure', 'attack_maps',
+                  'GameInstance', 'BitboardInstance', 'AlphaBetaPruning', 'perft', 'parallel_search', 'lazy_smp',
+                  'batch_analysis', 'opening_book']
+
+# Optional dependencies that should only be loaded by the code that uses them
+heavy_modules = ['chess', 'numba', 'numpy', 'tkinter', 'PIL']
+
+_probe = """
+import contextlib, io, json, sys, time
+t0 = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()) as output:
+    import {module}
+elapsed = time.perf_counter() - t0
+print(json.dumps([elapsed, sorted(name for name in {heavy_modules!r} if name in sys.modules), output.getvalue()]))
+"""
+
+
+def time_import(module, repeat=5):
+    """
+    Best of repeat import times of a module in a fresh interpreter
+    :param module: module name
+    :param repeat: number of interpreters started
+    :return: dict of seconds, heavy modules it loaded, whether it printed anything and the import error (if any)
+    """
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', _probe.format(module=module, heavy_modules=heavy_modules)],
+                                cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+        if result.returncode != 0:
+            return {'module': module, 'seconds': None, 'heavy_modules': [], 'printed': False,
+                    'error': result.stderr.strip().splitlines()[-1]}
+        elapsed, loaded, output = json.loads(result.stdout.strip().splitlines()[-1])
+        best = elapsed if best is None else min(best, elapsed)
+    return {'module': module, 'seconds': round(best, 4), 'heavy_modules': loaded, 'printed': bool(output),
+            'error': None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import time of the engine modules')
+    parser.add_argument('modules', nargs='*', default=engine_modules)
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per module (best is kept)')
+    parser.add_argument('--json', metavar='PATH', help="write the results as json ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    results = [time_import(module, args.repeat) for module in args.modules]
+    if args.json == '-':
+        print(json.dumps(results, indent=2))
+    else:
+        if args.json:
+            with open(args.json, 'w') as json_file:
+                json.dump(results, json_file, indent=2)
+        for result in results:
+            if result['error']:
+                print('{:<18} failed: {}'.format(result['module'], result['error']))
+            else:
+                print('{:<18} {:7.1f}ms  {}{}'.format(result['module'], 1000 * result['seconds'],
+                                                      ', '.join(result['heavy_modules']),
+                                                      '  (prints on import!)' if result['printed'] else ''))
+
+    # note - fails if a module can't be imported, pulls in an optional dependency or does work that prints on import
+    return 1 if any(result['error'] or result['heavy_modules'] or result['printed'] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import atexit
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+import AlphaBetaPruning as ab
+import config as c
+import parallel_search as ps
+import transposition as tt
+
+# Lazy SMP https://www.chessprogramming.org/Lazy_SMP - helper processes run the same iterative deepening search as
+# the main process, starting 1-3 depths ahead of it in turn, all sharing one transposition table in shared memory. The
+# helpers fill the table with results the main search then cuts off on, the main search's best move is returned
+_shared_table = None  # see get_helpers
+_helpers = []  # (process, task queue)
+_results = None
+_stop_event = None
+
+
+def _helper_loop(helper_index, table_name, table_mb, tasks, results, stop_event):
+    """
+    Helper process - searches each task until the main search sets the stop event, then reports its nodes
+    """
+    table = tt.SharedTranspositionTable(table_mb, name=table_name)
+    ab.search_limits['stop_event'] = stop_event
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        for game_class, fen, moves, depth, square_bonus, age in iter(tasks.get, None):
+            # note - the age is per process, so it's taken from the main table (cleared tables and restarted helpers
+            # would drift otherwise). minimaxRoot's new_search then advances it in step with the main search
+            table.age = age
+            board = ps.worker_position(game_class, fen, moves)
+            ab.minimaxRoot(depth, board, board.is_whites_turn, square_bonus, transposition_table=table, workers=1,
+                           start_depth=2 + helper_index % 3)  # note - main search starts at 1, helpers spread ahead
+            results.put((helper_index, ab.search_stats['depth'],
+                         ab.search_stats['nodes'] + ab.search_stats['qs_nodes'], table.age))
+    table.close()
+
+
+def get_helpers(count):
+    """
+    Shared transposition table and helper processes, started on first use and kept between moves
+    :param count: number of helper processes
+    :return: SharedTranspositionTable
+    """
+    global _shared_table, _results, _stop_event
+    if _shared_table is None or len(_helpers) != count:
+        shutdown_helpers()
+        _shared_table = tt.SharedTranspositionTable(c.transposition_table_mb)
+        _results = multiprocessing.Queue()
+        _stop_event = multiprocessing.Event()
+        for helper_index in range(count):
+            tasks = multiprocessing.Queue()
+            process = multiprocessing.Process(target=_helper_loop, daemon=True,
+                                              args=(helper_index, _shared_table.name, c.transposition_table_mb,
+                                                    tasks, _results, _stop_event))
+            process.start()
+            _helpers.append((process, tasks))
+    return _shared_table
+
+
+def shutdown_helpers():
+    """
+    Stops the helper processes and frees the shared table
+    """
+    global _shared_table
+    for process, tasks in _helpers:
+        tasks.put(None)
+    for process, _ in _helpers:
+        process.join()
+    _helpers.clear()
+    if _shared_table is not None:
+        _shared_table.close()
+        _shared_table.unlink()
+        _shared_table = None
+
+
+atexit.register(shutdown_helpers)
+
+
+def lazy_smp_search(depth, board, square_bonus=False, time_limit=None, workers=None):
+    """
+    minimaxRoot with workers - 1 helper processes searching the same position
+    :param depth: maximum depth
+    :param board: game instance (GameInstance or BitboardInstance)
+    :param square_bonus: include the square bonus in the evaluation
+    :param time_limit: seconds for the whole search (None for no limit)
+    :param workers: processes searching, the main one included (defaults to c.search_workers)
+    :return: best move of the main search (None if there are no legal moves)
+    """
+    table = get_helpers((workers or c.search_workers) - 1)
+    task = (type(board), board.starting_fen, tuple(board.move_log), depth, square_bonus, table.age)
+
+    _stop_event.clear()
+    for _, tasks in _helpers:
+        tasks.put(task)
+    try:
+        best_move = ab.minimaxRoot(depth, board, board.is_whites_turn, square_bonus, transposition_table=table,
+                                   time_limit=time_limit, workers=1)
+    finally:
+        _stop_event.set()
+        helper_results = collect_results()
+
+    ab.search_stats['helper_depths'] = [result[1] for result in sorted(helper_results)]
+    ab.search_stats['helper_nodes'] = sum(result[2] for result in helper_results)
+    ab.search_stats['helper_ages'] = [result[3] for result in sorted(helper_results)]
+    return best_move
+
+
+def collect_results():
+    """
+    Results of the stopped helpers - waits at most c.helper_stop_timeout and stops waiting as soon as a helper has
+    died, so a crashed helper can't hang the search (the main search's move is used either way). The helpers are
+    restarted on the next search if any didn't report
+    :return: list of (helper index, depth, nodes, table age)
+    """
+    results = []
+    deadline = time.perf_counter() + c.helper_stop_timeout
+    while len(results) < len(_helpers):
+        try:
+            results.append(_results.get(timeout=0.1))
+        except queue.Empty:
+            if time.perf_counter() > deadline or not all(process.is_alive() for process, _ in _helpers):
+                break
+    if len(results) < len(_helpers):
+        print('Lazy SMP: {} of {} helpers reported, restarting them'.format(len(results), len(_helpers)))
+        for process, _ in _helpers:
+            process.terminate()
+        shutdown_helpers()
+    return results
+
+
+def benchmark(depth=5, worker_counts=(1, 2, 4, 8)):
+    """
+    Time to depth and nodes/sec (all processes) of the main search for each worker count on a fixed position set
+    :param depth: depth searched
+    :param worker_counts: process counts to time
+    """
+    import contextlib
+    import io
+    import perft
+    fens = [perft.perft_positions[name][0] for name in ('start', 'kiwipete', 'position_3', 'position_6')]
+
+    print('{} cores, depth {}'.format(multiprocessing.cpu_count(), depth))
+    baseline = None
+    for workers in worker_counts:
+        total, nodes = 0, 0
+        for fen in fens:
+            board = ab.new_game(fen)
+            table = tt.TranspositionTable(c.transposition_table_mb) if workers == 1 else get_helpers(workers - 1)
+            table.clear()  # note - process start up and clearing the table aren't timed
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                if workers > 1:
+                    lazy_smp_search(depth, board, workers=workers)
+                else:
+                    ab.minimaxRoot(depth, board, board.is_whites_turn, workers=1, transposition_table=table)
+                total += time.perf_counter() - t0
+            nodes += ab.search_stats['nodes'] + ab.search_stats['qs_nodes'] + \
+                (ab.search_stats.pop('helper_nodes', 0) if workers > 1 else 0)
+        baseline = baseline or total
+        print('{} workers  time to depth {:6.2f}s  {:>9} nodes  {:>8.0f} nodes/sec  speedup {:.2f}x'.format(
+            workers, total, nodes, nodes / total, baseline / total))
+    shutdown_helpers()
+
+
+if __name__ == "__main__":
+    benchmark(*[int(arg) for arg in sys.argv[1:2]])
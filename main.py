@@ -5,7 +5,9 @@ from PIL import Image, ImageTk
 from AlphaBetaPruning import *
 from GameInstance import GameInstance
 import cProfile
+import config as c
 import fen_settings as s
+import move_encoding as me
 
 
 import chess
@@ -272,7 +274,7 @@ def canvasMotion(event):
     move = chess.Move(from_square=clickStartSquare, to_square=boardIndex)
     islegal = False
     for legalmove in board.get_all_legal_moves():
-        if str(move) == str(legalmove): islegal = True
+        if me.move_to_uci(legalmove)[:4] == str(move): islegal = True
     if islegal:
         # draw green square over moused over square
         boardCanvas.create_rectangle(tileScrX + 3, tileScrY + 3, (tileScrX + (squareSize - 2)),
@@ -317,7 +319,7 @@ def canvasRelease(event):
     islegal = False
 
     for legalmove in board.get_all_legal_moves():
-        decoded_move = s.square_id_to_algebraic[legalmove[0]]+s.square_id_to_algebraic[legalmove[1]]
+        decoded_move = me.move_to_uci(legalmove)[:4]
         #print(decoded_move)
         if str(move) == str(decoded_move):
             islegal = True
@@ -353,9 +355,9 @@ def AI_1(board):
     'de'
     move_type = random.choice([1, 2, 3])
     if move_type > 1:
-        move = minimaxRoot(random.choice([2, 3]), board, True)
+        move = minimaxRoot(c.max_search_depth, board, board.is_whites_turn, time_limit=random.choice([0.25, 0.5]))
     else:
-        move = random.choice(list(board.legal_moves))
+        move = random.choice(board.get_all_legal_moves())
 
     return move
 
@@ -364,7 +366,7 @@ def AI_2(board, white_move=False):
     '"Beep boop I am slightly better at Chess... hopefully" - AI_2'
     'do'
     # move = random.choice(list(board.legal_moves))
-    move = minimaxRoot(2, board, board.turn)
+    move = minimaxRoot(c.max_search_depth, board, board.is_whites_turn, time_limit=1.0)
     # TODO: Add some noise or randomness into the move selection (normalize it beforehand by ?)
     return move
 
@@ -373,7 +375,7 @@ def AI_2(board, white_move=False):
 def AI_3(board):
     'mo'
 
-    move = minimaxRoot(4, board, board.turn, square_bonus=True)
+    move = minimaxRoot(c.max_search_depth, board, board.is_whites_turn, square_bonus=True, time_limit=c.search_time_limit)
 
     return move
 
@@ -657,5 +659,6 @@ def initGame(player1, player2):
         getAIMove(turn='black')
 
 
-main()
-# cProfile.run('foo()')
+if __name__ == "__main__":
+    main()
+    # cProfile.run('foo()')
@@ -0,0 +1,82 @@
+import fen_settings as s
+
+# Packed int moves - start square (bits 0-6), end square (7-13), flag (14-16) and the move's ordering score (the
+# delta_eval the generators compute, + score_offset so it's never negative) in bits 17-29. Sorting a move list sorts
+# by the score, the low bits (move_key) identify the move. 0 is never a move (square 0 is off the board)
+# note - kept under 30 bits so moves are single digit CPython ints (cheaper arithmetic, 28 bytes each)
+normal, two_square_pawn, en_passant, castle = 0, 1, 2, 3
+promotion = 4  # flags 4-7 are promotions, to the piece type flag - 2 (knight 4, bishop 5, rook 6, queen 7)
+flag_shift = 14
+score_shift = 17
+score_offset = 1 << 12  # scores -4096..4095 (delta_eval is within about +-1100)
+key_mask = (1 << score_shift) - 1
+square_mask = 127
+# note - start + move_base + (end << 7) + (score << score_shift) is a normal move (what the generators append)
+move_base = score_offset << score_shift
+
+promotion_flags = {piece_type: piece_type + 2 for piece_type in (s.knight, s.bishop, s.rook, s.queen)}
+promotion_letters = {s.knight: 'n', s.bishop: 'b', s.rook: 'r', s.queen: 'q'}
+
+
+def encode_move(start, end, flag=normal, score=0):
+    """
+    :param start: start square index
+    :param end: end square index (the king's end square for castling)
+    :param flag: normal, two_square_pawn, en_passant, castle or a promotion_flags value
+    :param score: ordering score (delta_eval)
+    :return: packed move
+    """
+    return start | end << 7 | flag << flag_shift | (score + score_offset) << score_shift
+
+
+def move_start(move):
+    return move & square_mask
+
+
+def move_end(move):
+    return move >> 7 & square_mask
+
+
+def move_flag(move):
+    return move >> flag_shift & 7
+
+
+def promotion_piece(move):
+    """
+    :return: piece type promoted to (0 if not a promotion)
+    """
+    flag = move >> flag_shift & 7
+    return flag - 2 if flag >= promotion else 0
+
+
+def move_score(move):
+    return (move >> score_shift) - score_offset
+
+
+def move_key(move):
+    """
+    Move without the ordering score
+    """
+    return move & key_mask
+
+
+def move_to_uci(move):
+    """
+    UCI string of a move (e.g. 'e2e4', 'a7a8q')
+    """
+    return s.square_id_to_algebraic[move & square_mask] + s.square_id_to_algebraic[move >> 7 & square_mask] + \
+        promotion_letters.get(promotion_piece(move), '')
+
+
+def uci_to_move(board, uci):
+    """
+    Legal move of a position matching a UCI string
+    :param board: game instance
+    :param uci: e.g. 'e2e4', 'e7e8q' (a promotion without the letter matches the queen promotion)
+    :return: move or None if it isn't legal
+    """
+    for move in board.get_all_legal_moves():
+        move_uci = move_to_uci(move)
+        if move_uci == uci or move_uci == uci + 'q':
+            return move
+    return None
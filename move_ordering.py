@@ -0,0 +1,134 @@
+import fen_settings as s
+import move_encoding as me
+
+# Move ordering https://www.chessprogramming.org/Move_Ordering
+# Stages - hash move, winning/equal captures (MVV-LVA), killer moves, quiet moves (history heuristic), losing captures
+max_ply = 128  # deepest ply with killer slots (deeper plies share the last one)
+killer_slots = 2
+
+
+def is_capture(board, move):
+    """
+    Captures (including en passant) and promotions - the moves searched by quiescence
+    :param board: game the move is for
+    :param move: packed move (see move_encoding)
+    :return: bool
+    """
+    flag = move >> me.flag_shift & 7
+    return board.board[move >> 7 & me.square_mask] != s.empty or flag == me.en_passant or flag >= me.promotion
+
+
+def capture_score(board, move):
+    """
+    MVV-LVA score of a capture/promotion - most valuable victim first, least valuable attacker breaking ties
+    :param board: game the move is for
+    :param move: capture or promotion
+    :return: score (higher first), is the capture winning or equal (victim worth at least the attacker)
+    """
+    flag = move >> me.flag_shift & 7
+    attacker = board.board[move & me.square_mask] & s.piece_type_mask
+    victim = s.pawn if flag == me.en_passant else board.board[move >> 7 & me.square_mask] & s.piece_type_mask
+    victim_value = s.mvv_lva_by_type[victim]
+    if flag >= me.promotion:
+        victim_value += s.mvv_lva_by_type[me.promotion_piece(move)] - s.mvv_lva_by_type[s.pawn]
+        return victim_value * 8 - attacker, True
+    return victim_value * 8 - attacker, victim_value >= s.mvv_lva_by_type[attacker] or attacker == s.king
+
+
+def ordered_captures(board, moves):
+    """
+    Captures/promotions of a move list in MVV-LVA order (quiescence)
+    :param board: game instance
+    :param moves: legal moves
+    :return: list of moves
+    """
+    captures = [(capture_score(board, move)[0], move) for move in moves if is_capture(board, move)]
+    captures.sort(key=lambda scored_move: scored_move[0], reverse=True)
+    return [move for _, move in captures]
+
+
+class MoveOrderer:
+    """
+    Staged move ordering for the search, with the killer moves (quiet moves that caused a beta cutoff at the same
+    ply) and history heuristic (cutoff counts per piece code/end square) it learns from the cutoffs
+    """
+
+    def __init__(self):
+        self.killers = [[None] * killer_slots for _ in range(max_ply)]
+        self.history = [[0] * s.board_square_count for _ in range(s.piece_code_count)]
+        self.root_ply = 0
+
+    def new_search(self, root_ply):
+        """
+        Called once per root search - killers are cleared and the history is aged so recent cutoffs count more
+        :param root_ply: length of the game move log at the root (plies are counted from here)
+        """
+        self.root_ply = root_ply
+        self.killers = [[None] * killer_slots for _ in range(max_ply)]
+        for piece_history in self.history:
+            for square in range(s.board_square_count):
+                piece_history[square] >>= 1
+
+    def ply(self, board):
+        return min(len(board.move_log) - self.root_ply, max_ply - 1)
+
+    def ordered_moves(self, board, hash_move=None):
+        """
+        Generator of the legal moves in stage order. Moves are only generated after the hash move has been searched
+        and each stage is only sorted when it is reached, so a cutoff skips the remaining work
+        :param board: game instance
+        :param hash_move: best move from the transposition table (or None)
+        :return: generator of moves
+        """
+        color = s.white if board.is_whites_turn else s.black
+        # note - the hash move came from a position with the same zobrist key, so only a sanity check is done
+        if hash_move is not None and board.board[hash_move & me.square_mask] & color and \
+                not board.board[hash_move >> 7 & me.square_mask] & color:
+            yield hash_move
+        else:
+            hash_move = None
+
+        good_captures = []
+        bad_captures = []
+        quiet_moves = []
+        for move in board.get_all_legal_moves(buffer=True):
+            if move == hash_move:
+                continue
+            if is_capture(board, move):
+                score, is_winning = capture_score(board, move)
+                (good_captures if is_winning else bad_captures).append((score, move))
+            else:
+                quiet_moves.append(move)
+
+        good_captures.sort(key=lambda scored_move: scored_move[0], reverse=True)
+        for _, move in good_captures:
+            yield move
+
+        killers = [move for move in self.killers[self.ply(board)] if move is not None and move in quiet_moves]
+        for move in killers:
+            yield move
+
+        history = self.history
+        board_squares = board.board
+        # note - ties broken by the packed move itself, which sorts by its delta_eval (the high bits)
+        quiet_moves.sort(key=lambda move: (history[board_squares[move & 127]][move >> 7 & 127], move), reverse=True)
+        for move in quiet_moves:
+            if move not in killers:
+                yield move
+
+        bad_captures.sort(key=lambda scored_move: scored_move[0], reverse=True)
+        for _, move in bad_captures:
+            yield move
+
+    def update(self, board, move, depth):
+        """
+        Records a quiet move that caused a beta cutoff (call with the move unmade)
+        :param board: game instance
+        :param move: cutoff move
+        :param depth: remaining depth of the node (deeper cutoffs weigh more)
+        """
+        killers = self.killers[self.ply(board)]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[board.board[move & me.square_mask]][move >> 7 & me.square_mask] += depth * depth
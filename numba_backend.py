@@ -0,0 +1,550 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import config as c
+import fen_logic as fl
+import fen_settings as s
+import move_encoding as me
+
+# Numba backend - the position lives in numpy arrays (mailbox board, piece lists, side/en passant/castling/clock state
+# and an undo stack) that @njit(cache=True) kernels generate moves on, make/unmake moves on, evaluate and run perft on
+# without going back to python. Compiled kernels are cached on disk (__pycache__, or NUMBA_CACHE_DIR) so only the
+# first run after a change pays the compile. Moves are the packed ints of move_encoding (with a 0 ordering score)
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:  # note - optional dependencies, new_game falls back to the pure python backend without them
+    np = njit = None
+available = njit is not None
+_compiled = False  # see compile_kernels
+_compiling = False
+_fallback_reported = False  # see new_game
+
+
+def kernel(function):
+    return njit(cache=True)(function) if available else function
+
+
+# Position arrays (all int64 so the kernels never mix integer types)
+max_pieces = 10  # of one piece code - 8 promoted pawns + the 2 starting knights/bishops/rooks
+# Per ply move buffer - the kernels write moves[ply, count] without bounds checks, so it holds the most pseudo legal
+# moves one side can have: 9 queens (27 moves each), 2 rooks (14), 2 bishops (13), 2 knights (8) and the king (8 + 2
+# castling). A pawn has at most 12 (4 promotions on 3 squares) and is counted as the queen it can promote to, so
+# captures and under promotions only lower the count. NumbaInstance rejects fens with more material (see move_bound)
+max_moves = 9 * 27 + 2 * 14 + 2 * 13 + 2 * 8 + 10
+side, en_passant, castling, half_move, full_move = range(5)  # state array
+state_size = 5
+undo_captured, undo_en_passant, undo_castling, undo_half_move, undo_full_move = range(5)  # undo stack row
+undo_fields = 5
+
+empty, off_board, piece_type_mask = s.empty, s.off_board, s.piece_type_mask
+white, black, colors = s.white, s.black, s.white | s.black
+pawn, knight, bishop, rook, queen, king = s.pawn, s.knight, s.bishop, s.rook, s.queen, s.king
+move_bound_weights = {pawn: 27, knight: 8, bishop: 13, rook: 14, queen: 27, king: 10}  # see max_moves
+normal, two_square_pawn, en_passant_flag, castle, promotion = \
+    me.normal, me.two_square_pawn, me.en_passant, me.castle, me.promotion
+move_base = me.move_base  # note - score 0
+
+castling_bits = {'K': 1, 'Q': 2, 'k': 4, 'q': 8}
+
+if available:
+    knight_steps = np.array(s.knight_moves, np.int64)
+    king_steps = np.array(s.king_moves, np.int64)
+    bishop_directions = np.array(s.diagonal_dirs, np.int64)
+    rook_directions = np.array(s.linear_dirs, np.int64)
+    real_squares = np.array(s.real_board_squares, np.int64)
+
+    # Castling rights kept when a piece moves from/to a square (rights &= mask of both squares)
+    castling_masks = np.full(s.board_square_count, 15, np.int64)
+    for _square, _rights in s.castling_rights_squares.items():
+        for _right in _rights:
+            castling_masks[_square] &= ~castling_bits[_right]
+
+    # Castling moves in s.castling_paths order - king start/end, rook start/end, right bit, squares that must be
+    # empty (padded with 0) and squares the king crosses (must not be attacked)
+    castling_table = np.zeros((len(s.castling_paths), 10), np.int64)
+    rook_moves = np.zeros((s.board_square_count, 2), np.int64)  # king end square -> rook start, rook end
+    for _row, (_king_end, (_right, _king_start, _empty_path, _king_path)) in enumerate(s.castling_paths.items()):
+        _, _rook_start, _rook_end = s.castling_moves[_king_end]
+        castling_table[_row, :5] = (_king_start, _king_end, _rook_start, _rook_end, castling_bits[_right])
+        castling_table[_row, 5:5 + len(_empty_path)] = _empty_path
+        castling_table[_row, 8:8 + len(_king_path)] = _king_path
+        rook_moves[_king_end] = (_rook_start, _rook_end)
+
+    # Evaluation tables indexed by piece code (see GameInstance.compute_evaluation)
+    material_table = np.array(s.material_values, np.int64)
+    phase_table = np.array(s.phase_values, np.int64)
+    square_bonus_table = np.array([values or [0] * s.board_square_count for values in s.square_bonus_values],
+                                  np.int64)
+    end_game_table = np.array([values or [0] * s.board_square_count for values in s.end_game_values], np.int64)
+
+
+@kernel
+def add_piece(position, square, piece):
+    board, piece_squares, piece_counts, piece_index, _, _ = position
+    count = piece_counts[piece]
+    piece_squares[piece, count] = square
+    piece_index[square] = count
+    piece_counts[piece] = count + 1
+    board[square] = piece
+
+
+@kernel
+def remove_piece(position, square):
+    board, piece_squares, piece_counts, piece_index, _, _ = position
+    piece = board[square]
+    count = piece_counts[piece] - 1
+    last_square = piece_squares[piece, count]
+    index = piece_index[square]
+    piece_squares[piece, index] = last_square  # note - the last square of the list fills the gap
+    piece_index[last_square] = index
+    piece_counts[piece] = count
+    board[square] = empty
+
+
+@kernel
+def move_piece(position, start, end):
+    board, piece_squares, _, piece_index, _, _ = position
+    piece = board[start]
+    index = piece_index[start]
+    piece_squares[piece, index] = end
+    piece_index[end] = index
+    board[end] = piece
+    board[start] = empty
+
+
+@kernel
+def square_attacked(board, square, color):
+    """
+    Is a square attacked by a color's pieces
+    """
+    pawn_square = square + 10 if color == white else square - 10  # note - where an attacking pawn comes from
+    if board[pawn_square - 1] == color | pawn or board[pawn_square + 1] == color | pawn:
+        return True
+    for step in knight_steps:
+        if board[square + step] == color | knight:
+            return True
+    for step in king_steps:
+        if board[square + step] == color | king:
+            return True
+    for direction in rook_directions:
+        square_f = square + direction
+        while board[square_f] == empty:
+            square_f += direction
+        if board[square_f] == color | rook or board[square_f] == color | queen:
+            return True
+    for direction in bishop_directions:
+        square_f = square + direction
+        while board[square_f] == empty:
+            square_f += direction
+        if board[square_f] == color | bishop or board[square_f] == color | queen:
+            return True
+    return False
+
+
+@kernel
+def add_pawn_moves(moves, ply, count, start, end, promoting):
+    if promoting:
+        for piece_type in (queen, rook, bishop, knight):
+            moves[ply, count] = move_base + start + (end << 7) + ((piece_type + 2) << 14)
+            count += 1
+        return count
+    moves[ply, count] = move_base + start + (end << 7)
+    return count + 1
+
+
+@kernel
+def generate_moves(position, moves, ply):
+    """
+    Pseudo legal moves of the side to move (castling is checked for attacks here, everything else by legal_moves)
+    :return: number of moves written to moves[ply]
+    """
+    board, piece_squares, piece_counts, _, state, _ = position
+    color = state[side]
+    enemy = color ^ colors
+    count = 0
+
+    forward = -10 if color == white else 10
+    start_row = 8 if color == white else 3
+    promotion_row = 2 if color == white else 9
+    for index in range(piece_counts[color | pawn]):
+        start = piece_squares[color | pawn, index]
+        end = start + forward
+        if board[end] == empty:
+            count = add_pawn_moves(moves, ply, count, start, end, end // 10 == promotion_row)
+            if start // 10 == start_row and board[end + forward] == empty:
+                moves[ply, count] = move_base + start + ((end + forward) << 7) + (two_square_pawn << 14)
+                count += 1
+        for end in (start + forward - 1, start + forward + 1):
+            if board[end] & enemy:
+                count = add_pawn_moves(moves, ply, count, start, end, end // 10 == promotion_row)
+            elif end == state[en_passant]:
+                moves[ply, count] = move_base + start + (end << 7) + (en_passant_flag << 14)
+                count += 1
+
+    for piece_type, steps in ((knight, knight_steps), (king, king_steps)):
+        for index in range(piece_counts[color | piece_type]):
+            start = piece_squares[color | piece_type, index]
+            for step in steps:
+                end = start + step
+                if board[end] == empty or board[end] & enemy:
+                    moves[ply, count] = move_base + start + (end << 7)
+                    count += 1
+
+    for piece_type, directions in ((bishop, bishop_directions), (rook, rook_directions), (queen, bishop_directions),
+                                   (queen, rook_directions)):
+        for index in range(piece_counts[color | piece_type]):
+            start = piece_squares[color | piece_type, index]
+            for direction in directions:
+                end = start + direction
+                while board[end] == empty:
+                    moves[ply, count] = move_base + start + (end << 7)
+                    count += 1
+                    end += direction
+                if board[end] & enemy:
+                    moves[ply, count] = move_base + start + (end << 7)
+                    count += 1
+
+    # Castling - rights are kept up to date so the king and rook are on their start squares
+    for row in range(castling_table.shape[0]):
+        king_start = castling_table[row, 0]
+        if not state[castling] & castling_table[row, 4] or board[king_start] != color | king:
+            continue
+        path_empty = True
+        for column in range(5, 8):
+            if castling_table[row, column] and board[castling_table[row, column]] != empty:
+                path_empty = False
+        if not path_empty or square_attacked(board, king_start, enemy):
+            continue
+        if not square_attacked(board, castling_table[row, 8], enemy) and \
+                not square_attacked(board, castling_table[row, 9], enemy):
+            moves[ply, count] = move_base + king_start + (castling_table[row, 1] << 7) + (castle << 14)
+            count += 1
+    return count
+
+
+@kernel
+def make_move(position, move, ply):
+    board, _, _, _, state, undo = position
+    start = move & 127
+    end = move >> 7 & 127
+    flag = move >> 14 & 7
+    color = state[side]
+    piece = board[start]
+    captured = board[end]
+
+    undo[ply, undo_captured] = captured
+    undo[ply, undo_en_passant] = state[en_passant]
+    undo[ply, undo_castling] = state[castling]
+    undo[ply, undo_half_move] = state[half_move]
+    undo[ply, undo_full_move] = state[full_move]
+
+    if captured != empty:
+        remove_piece(position, end)
+    move_piece(position, start, end)
+    state[en_passant] = 0
+    if flag == two_square_pawn:
+        state[en_passant] = (start + end) // 2
+    elif flag == en_passant_flag:
+        remove_piece(position, end + 10 if color == white else end - 10)
+    elif flag == castle:
+        move_piece(position, rook_moves[end, 0], rook_moves[end, 1])
+    elif flag >= promotion:
+        remove_piece(position, end)
+        add_piece(position, end, color | (flag - 2))
+
+    state[castling] &= castling_masks[start] & castling_masks[end]
+    state[half_move] = 0 if piece & piece_type_mask == pawn or captured != empty else state[half_move] + 1
+    if color == black:
+        state[full_move] += 1
+    state[side] = color ^ colors
+
+
+@kernel
+def unmake_move(position, move, ply):
+    board, _, _, _, state, undo = position
+    start = move & 127
+    end = move >> 7 & 127
+    flag = move >> 14 & 7
+    color = state[side] ^ colors
+    state[side] = color
+
+    if flag >= promotion:
+        remove_piece(position, end)
+        add_piece(position, end, color | pawn)
+    move_piece(position, end, start)
+    if undo[ply, undo_captured] != empty:
+        add_piece(position, end, undo[ply, undo_captured])
+    if flag == en_passant_flag:
+        add_piece(position, end + 10 if color == white else end - 10, (color ^ colors) | pawn)
+    elif flag == castle:
+        move_piece(position, rook_moves[end, 1], rook_moves[end, 0])
+
+    state[en_passant] = undo[ply, undo_en_passant]
+    state[castling] = undo[ply, undo_castling]
+    state[half_move] = undo[ply, undo_half_move]
+    state[full_move] = undo[ply, undo_full_move]
+
+
+@kernel
+def leaves_king_attacked(board, move, king_square, color):
+    """
+    Does a pseudo legal move leave the mover's king attacked - played and taken back on the board alone (the piece
+    lists and state don't matter to square_attacked, and a promoting pawn blocks the same as the new piece)
+    """
+    start = move & 127
+    end = move >> 7 & 127
+    piece = board[start]
+    captured = board[end]
+    board[end] = piece
+    board[start] = empty
+    taken_square = 0
+    if move >> 14 & 7 == en_passant_flag:
+        taken_square = end + 10 if color == white else end - 10
+        board[taken_square] = empty
+    attacked = square_attacked(board, end if piece == color | king else king_square, color ^ colors)
+    if taken_square:
+        board[taken_square] = (color ^ colors) | pawn
+    board[start] = piece
+    board[end] = captured
+    return attacked
+
+
+@kernel
+def legal_moves(position, moves, ply):
+    """
+    Legal moves of the side to move - pseudo legal moves that don't leave the king attacked
+    :return: number of moves written to moves[ply]
+    """
+    board, piece_squares, _, _, state, _ = position
+    color = state[side]
+    king_square = piece_squares[color | king, 0]
+    count = generate_moves(position, moves, ply)
+    legal_count = 0
+    for index in range(count):
+        move = moves[ply, index]
+        if not leaves_king_attacked(board, move, king_square, color):
+            moves[ply, legal_count] = move
+            legal_count += 1
+    return legal_count
+
+
+@kernel
+def perft(position, moves, depth, ply):
+    """
+    Leaf nodes of the legal move tree (depth >= 1, bulk counted at depth 1)
+    """
+    count = legal_moves(position, moves, ply)
+    if depth == 1:
+        return count
+    nodes = 0
+    for index in range(count):
+        move = moves[ply, index]
+        make_move(position, move, ply)
+        nodes += perft(position, moves, depth - 1, ply + 1)
+        unmake_move(position, move, ply)
+    return nodes
+
+
+@kernel
+def evaluate(board):
+    """
+    :return: material score, square bonus score, end game square bonus score (white positive), game phase
+    """
+    material_score = 0
+    square_bonus_score = 0
+    end_game_score = 0
+    phase = 0
+    for square in real_squares:
+        piece = board[square]
+        material_score += material_table[piece]
+        square_bonus_score += square_bonus_table[piece, square]
+        end_game_score += end_game_table[piece, square]
+        phase += phase_table[piece]
+    return material_score, square_bonus_score, end_game_score, phase
+
+
+def move_bound(board, color):
+    """
+    Upper bound of the pseudo legal moves of one side, now or after any promotions (see max_moves)
+    :param board: mailbox board
+    :param color: s.white or s.black
+    :return: number of moves
+    """
+    return sum(move_bound_weights[board[square] & piece_type_mask] for square in s.real_board_squares
+               if board[square] & color)
+
+
+class NumbaInstance:
+    """
+    Game backed by the numba kernels, with the make_move/unmake_move/get_all_legal_moves API of GameInstance for
+    perft and tools (the search needs the incremental state of GameInstance/BitboardInstance)
+    """
+
+    def __init__(self, starting_fen):
+        compile_kernels()
+        self.starting_fen = starting_fen
+        board, castling_rights, en_passant_square, half_move_clock, full_move_number, is_whites_turn = \
+            fl.decode_fen(starting_fen)
+
+        for color in (white, black):
+            if move_bound(board, color) > max_moves:
+                raise ValueError('too much material for the move buffers: {}'.format(starting_fen))
+
+        self.board = np.full(s.board_square_count, off_board, np.int64)
+        self.piece_list_squares = np.zeros((s.piece_code_count, max_pieces), np.int64)
+        self.piece_list_counts = np.zeros(s.piece_code_count, np.int64)
+        self.piece_list_index = np.zeros(s.board_square_count, np.int64)  # position of each square in its list
+        self.state = np.zeros(state_size, np.int64)
+        self.state[side] = white if is_whites_turn else black
+        self.state[en_passant] = en_passant_square or 0
+        self.state[castling] = sum(castling_bits.get(right, 0) for right in castling_rights)
+        self.state[half_move], self.state[full_move] = half_move_clock, full_move_number
+        self.move_log = []
+        self.allocate_stack(c.undo_stack_plies)
+        for square in s.real_board_squares:
+            self.board[square] = empty
+            if board[square] != empty:
+                add_piece(self.position, square, board[square])
+
+    def allocate_stack(self, plies):
+        """
+        (Re)allocates the undo stack and per ply move buffers - the kernels don't bounds check, so the python side
+        makes sure they are deep enough before calling them (and max_moves wide enough, see move_bound)
+        """
+        undo = np.zeros((plies, undo_fields), np.int64)
+        moves = np.zeros((plies, max_moves), np.int64)
+        if self.move_log:
+            undo[:len(self.undo)] = self.undo
+            moves[:len(self.moves)] = self.moves
+        self.undo, self.moves = undo, moves
+        self.position = (self.board, self.piece_list_squares, self.piece_list_counts, self.piece_list_index, self.state,
+                         self.undo)
+
+    def reserve(self, plies):
+        if len(self.move_log) + plies >= len(self.undo):
+            self.allocate_stack(2 * (len(self.move_log) + plies))
+
+    @property
+    def is_whites_turn(self):
+        return self.state[side] == white
+
+    @property
+    def en_passant_square(self):
+        return int(self.state[en_passant]) or None
+
+    @property
+    def castling_rights(self):
+        return ''.join(right for right, bit in castling_bits.items() if self.state[castling] & bit) or '-'
+
+    def piece_squares(self, code):
+        return self.piece_list_squares[code, :self.piece_list_counts[code]].tolist()
+
+    def get_all_legal_moves(self, buffer=False):
+        """
+        :param buffer: unused - the kernel always fills the preallocated moves of the ply, the list is a copy
+        :return: list of moves
+        """
+        self.reserve(1)
+        ply = len(self.move_log)
+        return self.moves[ply, :legal_moves(self.position, self.moves, ply)].tolist()
+
+    def make_move(self, move):
+        self.reserve(1)
+        make_move(self.position, move, len(self.move_log))
+        self.move_log.append(move)
+
+    def unmake_move(self):
+        move = self.move_log.pop()
+        unmake_move(self.position, move, len(self.move_log))
+
+    def king_in_check(self):
+        color = self.state[side]
+        return square_attacked(self.board, self.piece_list_squares[color | king, 0], color ^ colors)
+
+    def compute_evaluation(self):
+        """
+        :return: material score, square bonus score, end game square bonus score (white positive), game phase
+        """
+        return tuple(int(term) for term in evaluate(self.board))
+
+    def perft(self, depth):
+        if depth == 0:
+            return 1
+        self.reserve(depth)
+        return int(perft(self.position, self.moves, depth, len(self.move_log)))
+
+
+def compile_kernels():
+    """
+    Compiles the kernels (or loads them from the on disk cache) by running them once, so the first timed call
+    doesn't include the compile
+    :return: seconds taken (0 once compiled)
+    """
+    global _compiled, _compiling
+    if _compiled or _compiling:  # note - the warm up game's __init__ calls back in here
+        return 0
+    _compiling = True
+    try:
+        t0 = time.perf_counter()
+        game = NumbaInstance('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+        game.perft(2)
+        game.compute_evaluation()
+        _compiled = True  # note - only once the warm up worked, a failed compile is retried on the next call
+    finally:
+        _compiling = False
+    return time.perf_counter() - t0
+
+
+def new_game(fen):
+    """
+    NumbaInstance, or the pure python bitboard backend if numba/numpy aren't installed
+    :param fen: starting fen
+    :return: NumbaInstance or BitboardInstance
+    """
+    global _fallback_reported
+    if available:
+        return NumbaInstance(fen)
+    if not _fallback_reported:
+        print('numba not installed - using the pure python bitboard backend')
+        _fallback_reported = True
+    from BitboardInstance import BitboardInstance
+    return BitboardInstance(fen)
+
+
+def benchmark(depth=None):
+    """
+    Compile time in a fresh interpreter with an empty and then a warm on disk cache, and perft nodes/sec of the
+    kernels against the pure python backends
+    :param depth: perft depth for every position (None for the default depths)
+    """
+    import perft
+
+    if not available:
+        print('numba not installed')
+        return
+    probe = 'import numba_backend as nb; print(nb.compile_kernels())'
+    with tempfile.TemporaryDirectory() as cache_dir:
+        environment = dict(os.environ, NUMBA_CACHE_DIR=cache_dir,
+                           PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                                    os.environ.get('PYTHONPATH')])))
+        for cache in ('cold', 'cached'):
+            t0 = time.perf_counter()
+            output = subprocess.run([sys.executable, '-c', probe], env=environment, capture_output=True, text=True,
+                                    check=True).stdout
+            print('{:<6} start  compile {:6.2f}s  interpreter total {:6.2f}s'.format(
+                cache, float(output.split()[-1]), time.perf_counter() - t0))
+
+    compile_kernels()
+    for backend in ('numba', 'bitboard', 'mailbox'):
+        report = perft.run_suite(backend, depth)
+        print('{:<8} perft {:>9} nodes {} {:7.2f}s {:>10} nodes/sec'.format(
+            backend, report['total_nodes'], 'ok' if report['passed'] else 'FAIL', report['total_elapsed'],
+            report['nodes_per_sec']))
+
+
+if __name__ == "__main__":
+    benchmark(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,277 @@
+import argparse
+import collections
+import mmap
+import os
+import random
+import struct
+import sys
+
+import config as c
+import fen_settings as s
+import move_encoding as me
+
+# Opening book https://www.chessprogramming.org/PolyGlot - Polyglot .bin books are arrays of 16 byte entries (key,
+# move, weight, learn - big endian) sorted by the Polyglot zobrist key of the position. The file is memory mapped and
+# binary searched, so a probe only touches the pages of the entries it reads whatever the size of the book
+entry_struct = struct.Struct('>QHHI')
+_book = None  # see get_book
+_random_array = None  # see polyglot_random_array
+
+# Polyglot piece index (kind) of each piece code - black pawn 0, white pawn 1, black knight 2 ... white king 11
+_piece_kinds = [0] * s.piece_code_count
+for _piece_type in s.piece_types:
+    _piece_kinds[s.black | _piece_type] = 2 * (_piece_type - 1)
+    _piece_kinds[s.white | _piece_type] = 2 * (_piece_type - 1) + 1
+_castling_offsets = {'K': 768, 'Q': 769, 'k': 770, 'q': 771}
+
+
+def polyglot_random_array():
+    """
+    The 781 Polyglot Random64 keys (from python-chess, loaded the first time a key is needed)
+    :return: list of ints
+    """
+    global _random_array
+    if _random_array is None:
+        import chess.polyglot  # note - optional dependency, only the book needs it
+        _random_array = list(chess.polyglot.POLYGLOT_RANDOM_ARRAY)
+    return _random_array
+
+
+def polyglot_key(board):
+    """
+    Polyglot key of a position (not the engine's zobrist key - the Polyglot random numbers and layout are fixed by
+    the book format). The en passant file only counts if a pawn of the side to move can capture there
+    :param board: game instance
+    :return: 64 bit key
+    """
+    random_array = polyglot_random_array()
+    key = 0
+    for square in s.real_board_squares:
+        piece = board.board[square]
+        if piece != s.empty:
+            key ^= random_array[64 * _piece_kinds[piece] + s.square_id_to_index_64[square]]
+
+    for right in board.castling_rights:
+        if right in _castling_offsets:
+            key ^= random_array[_castling_offsets[right]]
+
+    if board.en_passant_square is not None:
+        pawn = s.white | s.pawn if board.is_whites_turn else s.black | s.pawn
+        capture_square = board.en_passant_square + (10 if board.is_whites_turn else -10)
+        if board.board[capture_square - 1] == pawn or board.board[capture_square + 1] == pawn:
+            key ^= random_array[772 + board.en_passant_square % 10 - 1]
+
+    if board.is_whites_turn:
+        key ^= random_array[780]
+    return key
+
+
+def encode_move(start, end, promotion=0):
+    """
+    Polyglot move - to square (bits 0-5), from square (6-11), promotion piece (12-14, 1 knight .. 4 queen)
+    :param start: from square (64 square index, a1 = 0)
+    :param end: to square (64 square index) - the rook's square for castling (e1h1, e1a1 ...)
+    :param promotion: promotion piece type - 1
+    :return: int
+    """
+    return end | start << 6 | promotion << 12
+
+
+def move_code(move):
+    """
+    Polyglot move of an engine move
+    :param move: packed move (see move_encoding)
+    :return: int
+    """
+    start, end = me.move_start(move), me.move_end(move)
+    if me.move_flag(move) == me.castle:
+        end = s.castling_moves[end][1]
+    promotion = me.promotion_piece(move)
+    return encode_move(s.square_id_to_index_64[start], s.square_id_to_index_64[end], promotion - 1 if promotion else 0)
+
+
+def game_ply(board):
+    """
+    Plies played in the game (from the move number, so books work from any starting fen)
+    """
+    return 2 * (board.full_move - 1) + (0 if board.is_whites_turn else 1)
+
+
+class OpeningBook:
+    """
+    Memory mapped Polyglot book
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size // entry_struct.size
+        # note - empty files can't be mapped
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+
+    def __len__(self):
+        return self.size
+
+    def key_at(self, index):
+        return struct.unpack_from('>Q', self.data, index * entry_struct.size)[0]
+
+    def entries(self, key):
+        """
+        Book entries of a position - binary search for the first entry of the key, then read while it matches
+        :param key: Polyglot key
+        :return: list of (key, move, weight, learn) tuples
+        """
+        index = self.lower_bound(key)
+        entries = []
+        while index < self.size:
+            entry = entry_struct.unpack_from(self.data, index * entry_struct.size)
+            if entry[0] != key:
+                break
+            entries.append(entry)
+            index += 1
+        return entries
+
+    def lower_bound(self, key):
+        """
+        Index of the first entry with a key >= key
+        """
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def moves(self, board):
+        """
+        Legal book moves of a position (entries whose move doesn't match a legal move are skipped)
+        :param board: game instance
+        :return: list of (move, weight) in book order
+        """
+        entries = self.entries(polyglot_key(board))
+        if not entries:
+            return []
+        legal_moves = {move_code(move): move for move in board.get_all_legal_moves()}
+        return [(legal_moves[entry[1]], entry[2]) for entry in entries if entry[1] in legal_moves]
+
+    def choose_move(self, board, weighted_random=True, rng=random):
+        """
+        :param board: game instance
+        :param weighted_random: pick a move with probability proportional to its weight (else the highest weight)
+        :param rng: random source
+        :return: move or None if the position isn't in the book
+        """
+        moves = [(move, weight) for move, weight in self.moves(board) if weight > 0]
+        if not moves:
+            return None
+        if not weighted_random:
+            return max(moves, key=lambda move_weight: move_weight[1])[0]
+        return rng.choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+    def close(self):
+        if self.size:
+            self.data.close()
+        self.file.close()
+
+
+def get_book():
+    """
+    Book of c.opening_book, opened on first use and kept open between moves
+    :return: OpeningBook or None if no book is configured
+    """
+    global _book
+    if _book is None and c.opening_book:
+        _book = OpeningBook(c.opening_book)
+    return _book
+
+
+def book_move(board):
+    """
+    Book move for a position, checked before searching
+    :param board: game instance
+    :return: move or None (no book, past c.max_book_ply or not in the book)
+    """
+    if not c.opening_book or game_ply(board) >= c.max_book_ply:
+        return None
+    return get_book().choose_move(board, c.book_weighted_random)
+
+
+def build_book(pgn_paths, output_path, max_ply=None, min_games=1):
+    """
+    Builds a Polyglot book from local pgn files (python-chess reads the games). Each (position, move) is weighted
+    by its results for the side playing it - 2 per win, 1 per draw
+    :param pgn_paths: pgn files
+    :param output_path: .bin file written
+    :param max_ply: plies of each game added (defaults to c.max_book_ply)
+    :param min_games: games a move needs to be played in to be kept
+    :return: number of entries written
+    """
+    import chess
+    import chess.pgn
+    import chess.polyglot
+
+    max_ply = max_ply or c.max_book_ply
+    weights = collections.Counter()
+    games = collections.Counter()
+    for path in pgn_paths:
+        with open(path) as pgn_file:
+            for game in iter(lambda: chess.pgn.read_game(pgn_file), None):
+                result = game.headers.get('Result', '*')
+                board = game.board()
+                for ply, move in enumerate(game.mainline_moves()):
+                    if ply >= max_ply:
+                        break
+                    end = move.to_square
+                    if board.is_castling(move):
+                        end = chess.square(7 if chess.square_file(end) > 4 else 0, chess.square_rank(end))
+                    entry = (chess.polyglot.zobrist_hash(board),
+                             encode_move(move.from_square, end, move.promotion - 1 if move.promotion else 0))
+                    winner = {'1-0': chess.WHITE, '0-1': chess.BLACK}.get(result)
+                    weights[entry] += 1 if result == '1/2-1/2' else 2 if winner == board.turn else 0
+                    games[entry] += 1
+                    board.push(move)
+
+    entries = [(key, move, weight) for (key, move), weight in weights.items()
+               if weight > 0 and games[(key, move)] >= min_games]
+    scale = max([weight for _, _, weight in entries] + [0xffff]) / 0xffff  # weights are 16 bit
+    entries.sort(key=lambda entry: (entry[0], -entry[2]))
+    with open(output_path, 'wb') as book_file:
+        for key, move, weight in entries:
+            book_file.write(entry_struct.pack(key, move, max(1, int(weight / scale)), 0))
+    return len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Polyglot opening book tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='build a book from pgn files')
+    build.add_argument('pgn', nargs='+')
+    build.add_argument('--output', '-o', required=True)
+    build.add_argument('--max-ply', type=int, default=c.max_book_ply)
+    build.add_argument('--min-games', type=int, default=1)
+    probe = commands.add_parser('probe', help='book moves of a position')
+    probe.add_argument('book')
+    probe.add_argument('fen', nargs='?', default='rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        count = build_book(args.pgn, args.output, args.max_ply, args.min_games)
+        print('{} entries written to {}'.format(count, args.output))
+        return 0
+
+    import AlphaBetaPruning as ab
+    book = OpeningBook(args.book)
+    board = ab.new_game(args.fen)
+    moves = book.moves(board)
+    total = sum(weight for _, weight in moves) or 1
+    print('{:016x}: {} book moves ({} entries in the book)'.format(polyglot_key(board), len(moves), len(book)))
+    for move, weight in moves:
+        print('{:<6} {:>6} {:6.1%}'.format(me.move_to_uci(move), weight, weight / total))
+    book.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
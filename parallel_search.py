@@ -0,0 +1,206 @@
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import AlphaBetaPruning as ab
+import config as c
+import move_encoding as me
+
+# Parallel root search - the root moves of each iteration are split across a pool of worker processes. Each worker
+# rebuilds the position from the starting fen and move list, and the best root score so far is shared between the
+# workers (a multiprocessing Value) so moves started later are searched with a better alpha and still get cutoffs
+_process_pool = None  # see get_process_pool
+_pool_workers = 0
+_shared_alpha = None
+
+# Worker process state
+_worker_alpha = None
+_worker_root = None  # (game class, fen, moves) the worker position was built from
+_worker_game = None
+
+
+def _init_worker(shared_alpha):
+    global _worker_alpha
+    _worker_alpha = shared_alpha
+
+
+def get_process_pool(workers):
+    """
+    Pool of worker processes, created on first use and kept between moves (workers keep their transposition tables)
+    :param workers: number of processes
+    :return: ProcessPoolExecutor, shared alpha Value
+    """
+    global _process_pool, _pool_workers, _shared_alpha
+    if _process_pool is None or _pool_workers != workers:
+        shutdown_process_pool()
+        _shared_alpha = multiprocessing.Value('i', -ab.infinity)
+        _process_pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(_shared_alpha,))
+        _pool_workers = workers
+    return _process_pool, _shared_alpha
+
+
+def shutdown_process_pool():
+    global _process_pool, _pool_workers
+    if _process_pool is not None:
+        _process_pool.shutdown()
+    _process_pool, _pool_workers = None, 0
+
+
+def worker_position(game_class, fen, moves):
+    """
+    Root position in a worker - rebuilt from the fen and move list, reused while the root stays the same
+    :param game_class: GameInstance or BitboardInstance
+    :param fen: starting fen of the game
+    :param moves: moves played since (tuple)
+    :return: game instance
+    """
+    global _worker_root, _worker_game
+    if _worker_root != (game_class, fen, moves):
+        _worker_game = game_class(fen)
+        for move in moves:
+            _worker_game.make_move(move)
+        _worker_root = (game_class, fen, moves)
+        ab.get_move_orderer().new_search(len(moves))
+    return _worker_game
+
+
+def search_root_move(game_class, fen, moves, root_move, depth, square_bonus, deadline):
+    """
+    Worker task - searches one root move with alpha read from the shared bound, raising the bound if it beats it
+    :param root_move: move to search
+    :param depth: depth of the iteration (including the root move)
+    :param deadline: time.perf_counter() the search stops at (None for no limit)
+    :return: root move, score (None if stopped), nodes, quiescence nodes
+    """
+    board = worker_position(game_class, fen, moves)
+    root_ply = len(board.move_log)
+    ab.search_stats.update(nodes=0, qs_nodes=0)
+    ab.search_limits.update(deadline=deadline, node_limit=None, stop=False)
+
+    alpha = _worker_alpha.value
+    board.make_move(root_move)
+    try:
+        # note - a score <= alpha is only an upper bound, but then the move can't be the best one
+        score = -ab.negamax(depth - 1, board, -ab.infinity, -alpha, 1, square_bonus, ab.get_transposition_table(),
+                            ab.get_move_orderer())
+    except ab.SearchStopped:
+        score = None
+    ab.unwind(board, root_ply)
+
+    if score is not None and score > alpha:
+        with _worker_alpha.get_lock():
+            if score > _worker_alpha.value:
+                _worker_alpha.value = score
+    return root_move, score, ab.search_stats['nodes'], ab.search_stats['qs_nodes']
+
+
+def parallel_root_search(depth, board, square_bonus=False, iterative_deeping=True, time_limit=None, workers=None):
+    """
+    minimaxRoot with the root moves split across worker processes. The first (previous best) move of each iteration
+    is searched on its own to set alpha, then the rest are searched in parallel
+    :param depth: maximum depth
+    :param board: game instance (GameInstance or BitboardInstance)
+    :param square_bonus: include the square bonus in the evaluation
+    :param iterative_deeping: search depths 1..depth
+    :param time_limit: seconds for the whole search (None for no limit)
+    :param workers: number of processes (defaults to c.search_workers)
+    :return: best move (None if there are no legal moves)
+    """
+    tic = time.perf_counter()
+    deadline = tic + time_limit if time_limit else None
+    pool, shared_alpha = get_process_pool(workers or c.search_workers)
+    ab.search_stats.update(nodes=0, qs_nodes=0, depth=0, best_move=None, best_score=None)
+
+    possible_moves = board.get_all_legal_moves()
+    if not possible_moves:
+        return None
+    root = (type(board), board.starting_fen, tuple(board.move_log))
+    white_sign = 1 if board.is_whites_turn else -1
+
+    best_move = possible_moves[0]
+    best_move_score = None
+    for search_depth in range(1, depth + 1) if iterative_deeping else [depth]:
+        shared_alpha.value = -ab.infinity
+        results = [pool.submit(search_root_move, *root, possible_moves[0], search_depth, square_bonus,
+                               deadline).result()]
+        if results[0][1] is not None:
+            futures = [pool.submit(search_root_move, *root, move, search_depth, square_bonus, deadline)
+                       for move in possible_moves[1:]]
+            results += [future.result() for future in futures]
+
+        ab.search_stats['nodes'] += sum(result[2] for result in results)
+        ab.search_stats['qs_nodes'] += sum(result[3] for result in results)
+        move_scores = {move: score for move, score, _, _ in results if score is not None}
+        if len(move_scores) < len(possible_moves):
+            # Stopped - any move that beat the previous best move (searched first) is better
+            if move_scores and possible_moves[0] in move_scores:
+                iteration_best_move = max(move_scores, key=move_scores.get)
+                best_move, best_move_score = iteration_best_move, move_scores[iteration_best_move]
+            break
+
+        best_move = max(possible_moves, key=move_scores.get)  # note - first of equal scores, the earlier alpha
+        best_move_score = move_scores[best_move]
+        ab.search_stats.update(depth=search_depth, best_move=best_move, best_score=white_sign * best_move_score)
+
+        toc = time.perf_counter()
+        print("Depth {0}: best move {1}, score {2}, nodes {3}, {4:.2f}s".format(
+            search_depth, me.move_to_uci(best_move), ab.score_to_string(white_sign * best_move_score),
+            ab.search_stats['nodes'] + ab.search_stats['qs_nodes'], toc - tic))
+
+        possible_moves.sort(key=lambda move: move_scores[move], reverse=True)
+        possible_moves.remove(best_move)
+        possible_moves.insert(0, best_move)
+        if time_limit and toc - tic > time_limit / 2:
+            break
+        if abs(best_move_score) >= ab.mate_threshold and ab.mate_score - abs(best_move_score) <= search_depth:
+            break
+
+    toc = time.perf_counter()
+    move_count = ab.search_stats['nodes'] + ab.search_stats['qs_nodes']
+    print("Best score: ", ab.score_to_string(white_sign * best_move_score) if best_move_score is not None else None)
+    print("Best move: ", me.move_to_uci(best_move) if best_move is not None else None)
+    print("Depth reached: ", str(ab.search_stats['depth']))
+    print("Moves evaluated: ", str(move_count))
+    print("Evals/sec: {0:.1f}".format(move_count / (toc - tic)))
+    print("Time: {0:.1f}s ({1} workers)".format(toc - tic, _pool_workers))
+
+    return best_move
+
+
+def benchmark(depth=5, worker_counts=(1, 2, 4, 8)):
+    """
+    Time to depth of the parallel root search against the serial search on a fixed position set
+    :param depth: depth searched
+    :param worker_counts: process counts to time
+    """
+    import contextlib
+    import io
+    import perft
+    fens = [perft.perft_positions[name][0] for name in ('start', 'kiwipete', 'position_3', 'position_6')]
+
+    def time_to_depth(search):
+        total, nodes = 0, 0
+        for fen in fens:
+            board = ab.new_game(fen)
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                search(board)
+                total += time.perf_counter() - t0
+            nodes += ab.search_stats['nodes'] + ab.search_stats['qs_nodes']
+        return total, nodes
+
+    print('{} cores, depth {}'.format(multiprocessing.cpu_count(), depth))
+    serial_time, serial_nodes = time_to_depth(lambda board: ab.minimaxRoot(
+        depth, board, board.is_whites_turn, transposition_table=ab.tt.TranspositionTable(16), workers=1))
+    print('serial     {:6.2f}s {:>9} nodes'.format(serial_time, serial_nodes))
+    for workers in worker_counts:
+        get_process_pool(workers)
+        pool_time, pool_nodes = time_to_depth(lambda board: parallel_root_search(depth, board, workers=workers))
+        print('{} workers  {:6.2f}s {:>9} nodes  speedup {:.2f}x'.format(workers, pool_time, pool_nodes,
+                                                                        serial_time / pool_time))
+    shutdown_process_pool()
+
+
+if __name__ == "__main__":
+    benchmark(*[int(arg) for arg in sys.argv[1:2]])
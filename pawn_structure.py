@@ -0,0 +1,249 @@
+import sys
+import time
+
+import config as c
+import fen_settings as s
+import zobrist as zb
+
+# Pawn structure evaluation https://www.chessprogramming.org/Pawn_Structure - doubled, isolated, backward and passed
+# pawns, plus rooks on open/half open files. The pawn terms only depend on the pawns, so they are cached in a pawn
+# hash table keyed by the pawn only zobrist key (GameInstance.pawn_key) and recomputed only when the pawns change.
+# The cached entry keeps the pawn files of each color so the rook terms are a few lookups
+_pawn_table = None  # see get_pawn_table
+
+# note - rough size of one entry: 4-tuple (~72 bytes) + 64 bit key int (~36 bytes) + list slot pointer (8 bytes)
+pawn_entry_bytes = 116
+
+
+class PawnHashTable:
+    """
+    Fixed size, always replace table of pawn structure entries - tuples of (pawn key, score, white pawn files,
+    black pawn files), the files are bit masks of 1 << column
+    """
+
+    def __init__(self, size_mb=c.pawn_hash_mb):
+        entry_count = 1
+        while entry_count * 2 * pawn_entry_bytes <= size_mb * 1024 * 1024:  # largest power of 2
+            entry_count *= 2
+
+        self.size_mb = size_mb
+        self.mask = entry_count - 1
+        self.entries = [None] * entry_count
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        self.entries = [None] * (self.mask + 1)
+        self.reset_stats()
+
+    def probe(self, key):
+        """
+        :param key: pawn key
+        :return: entry tuple or None
+        """
+        self.probes += 1
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, entry):
+        self.entries[entry[0] & self.mask] = entry
+
+    def stats(self):
+        """
+        :return: dict of the probes, hit rate and fill (sampled over the first 1000 slots)
+        """
+        sample = self.entries[:1000]
+        return {'size_mb': self.size_mb,
+                'entries': self.mask + 1,
+                'fill': sum(entry is not None for entry in sample) / len(sample),
+                'probes': self.probes,
+                'hit_rate': self.hits / max(self.probes, 1)}
+
+
+def get_pawn_table():
+    """
+    Pawn hash table, created on first use so entries carry over between moves
+    :return: PawnHashTable
+    """
+    global _pawn_table
+    if _pawn_table is None:
+        _pawn_table = PawnHashTable(c.pawn_hash_mb)
+    return _pawn_table
+
+
+def pawn_score(own_pawns, enemy_pawns, forward):
+    """
+    Pawn structure score of one side
+    :param own_pawns: squares of the side's pawns
+    :param enemy_pawns: squares of the other side's pawns
+    :param forward: direction the side's pawns move (-10 white, 10 black)
+    :return: score (positive good for the side)
+    """
+    # Ranks from the side's point of view (1..8), rearmost own and most advanced enemy pawn rank of each column
+    base, sign = (10, -1) if forward < 0 else (-1, 1)
+    file_counts = [0] * 10
+    own_rear = [9] * 10
+    enemy_front = [0] * 10
+    for square in own_pawns:
+        column, rank = square % 10, base + sign * (square // 10)
+        file_counts[column] += 1
+        if rank < own_rear[column]:
+            own_rear[column] = rank
+    for square in enemy_pawns:
+        column, rank = square % 10, base + sign * (square // 10)
+        if rank > enemy_front[column]:
+            enemy_front[column] = rank
+    score = -c.doubled_pawn_penalty * sum(count - 1 for count in file_counts if count > 1)
+
+    for square in own_pawns:
+        column, rank = square % 10, base + sign * (square // 10)
+        isolated = not file_counts[column - 1] and not file_counts[column + 1]
+        if isolated:
+            score -= c.isolated_pawn_penalty
+
+        # Passed - no enemy pawns ahead on its own or the neighbouring files
+        if enemy_front[column - 1] <= rank and enemy_front[column] <= rank and enemy_front[column + 1] <= rank:
+            score += c.passed_pawn_bonus[rank]
+
+        # Backward - no own pawns on the neighbouring files level with or behind it to support its advance, and the
+        # square in front is guarded by an enemy pawn
+        elif not isolated and own_rear[column - 1] > rank and own_rear[column + 1] > rank:
+            if square + 2 * forward - 1 in enemy_pawns or square + 2 * forward + 1 in enemy_pawns:
+                score -= c.backward_pawn_penalty
+    return score
+
+
+def pawn_entry(key, white_pawns, black_pawns):
+    """
+    Computes a pawn hash entry from scratch
+    :param key: pawn key
+    :param white_pawns: squares of the white pawns
+    :param black_pawns: squares of the black pawns
+    :return: (key, score (white positive), white pawn files, black pawn files)
+    """
+    white_files = 0
+    for square in white_pawns:
+        white_files |= 1 << square % 10
+    black_files = 0
+    for square in black_pawns:
+        black_files |= 1 << square % 10
+    score = pawn_score(white_pawns, black_pawns, -10) - pawn_score(black_pawns, white_pawns, 10)
+    return key, score, white_files, black_files
+
+
+def evaluate(board):
+    """
+    Pawn structure + rook file score of a position, the pawn terms from the pawn hash table when they are cached
+    :param board: game instance (GameInstance or BitboardInstance)
+    :return: score (white positive)
+    """
+    table = _pawn_table or get_pawn_table()
+    entry = table.probe(board.pawn_key)
+    if entry is None:
+        entry = pawn_entry(board.pawn_key, board.piece_squares(s.white | s.pawn),
+                           board.piece_squares(s.black | s.pawn))
+        table.store(entry)
+    return entry[1] + rook_file_score(entry, board.piece_squares(s.white | s.rook),
+                                      board.piece_squares(s.black | s.rook))
+
+
+def rook_file_score(entry, white_rooks, black_rooks):
+    """
+    Rooks on open/half open files
+    :param entry: pawn hash entry (for the pawn files)
+    :param white_rooks: squares of the white rooks
+    :param black_rooks: squares of the black rooks
+    :return: score (white positive)
+    """
+    _, _, white_files, black_files = entry
+    score = 0
+    for square in white_rooks:
+        file_bit = 1 << square % 10
+        if not white_files & file_bit:
+            score += c.rook_half_open_file_bonus if black_files & file_bit else c.rook_open_file_bonus
+    for square in black_rooks:
+        file_bit = 1 << square % 10
+        if not black_files & file_bit:
+            score -= c.rook_half_open_file_bonus if white_files & file_bit else c.rook_open_file_bonus
+    return score
+
+
+def evaluate_board(board):
+    """
+    evaluate for a bare mailbox board (no game instance, e.g. a decoded fen) - the squares are collected from the
+    board and the pawn key computed from scratch
+    :param board: mailbox board (square index -> piece code)
+    :return: score (white positive)
+    """
+    squares = {code: [] for code in (s.white | s.pawn, s.black | s.pawn, s.white | s.rook, s.black | s.rook)}
+    for square in s.real_board_squares:
+        if board[square] in squares:
+            squares[board[square]].append(square)
+    key = zb.hash_pawns(board)
+    table = _pawn_table or get_pawn_table()
+    entry = table.probe(key)
+    if entry is None:
+        entry = pawn_entry(key, squares[s.white | s.pawn], squares[s.black | s.pawn])
+        table.store(entry)
+    return entry[1] + rook_file_score(entry, squares[s.white | s.rook], squares[s.black | s.rook])
+
+
+def benchmark(depth=4):
+    """
+    Search nodes/sec and evaluation time per call with the pawn structure terms off and on, with the pawn hash hit
+    rate of the search and the cost of a pawn hash miss
+    :param depth: depth searched
+    """
+    import contextlib
+    import io
+    import AlphaBetaPruning as ab
+    import move_ordering as mo
+    import search_benchmark as sb
+    import transposition as tt
+
+    get_pawn_table = ab.pawns.get_pawn_table  # note - the search's module, not __main__ when run as a script
+    fens = list(sb.benchmark_positions.values())
+    boards = [ab.new_game(fen) for fen in fens]
+    saved = c.pawn_structure
+    try:
+        for pawn_structure in (False, True):
+            c.pawn_structure = pawn_structure
+            table = get_pawn_table()
+            table.clear()
+            total, nodes, probes, hits = 0, 0, 0, 0
+            for fen in fens:
+                board = ab.new_game(fen)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    t0 = time.perf_counter()
+                    ab.minimaxRoot(depth, board, board.is_whites_turn, True,
+                                   transposition_table=tt.TranspositionTable(16), move_orderer=mo.MoveOrderer())
+                    total += time.perf_counter() - t0
+                nodes += ab.search_stats['nodes'] + ab.search_stats['qs_nodes']
+                probes, hits = probes + table.probes, hits + table.hits
+
+            t0 = time.perf_counter()
+            for _ in range(2000):
+                for board in boards:
+                    ab.evaluation(board, True)
+            evaluation_time = (time.perf_counter() - t0) / (2000 * len(boards))
+            print('pawn structure {:<5}  depth {}  {:>7} nodes  {:6.2f}s  {:5.1f}us/node  evaluation {:5.2f}us  '
+                  'pawn hash hit rate {:.1%}'.format(str(pawn_structure), depth, nodes, total, total / nodes * 1e6,
+                                                     evaluation_time * 1e6, hits / max(probes, 1)))
+    finally:
+        c.pawn_structure = saved
+
+    t0 = time.perf_counter()
+    for _ in range(2000):
+        for board in boards:
+            pawn_entry(board.pawn_key, board.piece_squares(s.white | s.pawn), board.piece_squares(s.black | s.pawn))
+    print('pawn hash miss (entry from scratch) {:.2f}us'.format((time.perf_counter() - t0) / (2000 * len(boards)) * 1e6))
+
+
+if __name__ == "__main__":
+    benchmark(*[int(arg) for arg in sys.argv[1:2]])
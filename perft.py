@@ -0,0 +1,269 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import config as c
+import move_encoding as me
+
+# Perft https://www.chessprogramming.org/Perft_Results
+# name -> fen, node counts from depth 1
+perft_positions = {
+    'start': ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+              [20, 400, 8902, 197281, 4865609, 119060324]),
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+                 [48, 2039, 97862, 4085603, 193690690]),
+    'position_3': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+                   [14, 191, 2812, 43238, 674624, 11030083]),
+    'position_4': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+                   [6, 264, 9467, 422333, 15833292]),
+    'position_5': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+                   [44, 1486, 62379, 2103487, 89941194]),
+    'position_6': ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+                   [46, 2079, 89890, 3894594, 164075551]),
+}
+
+# Depth each position is run to by default (a few seconds each in pure python)
+default_depths = {'start': 4, 'kiwipete': 3, 'position_3': 4, 'position_4': 3, 'position_5': 3, 'position_6': 3}
+
+backends = ('mailbox', 'bitboard', 'numba', 'python-chess')
+
+
+def new_game(backend, fen):
+    """
+    Game of the given backend (imported on use so python-chess/numba are only needed when they are asked for)
+    :param backend: 'mailbox', 'bitboard', 'numba' or 'python-chess'
+    :param fen: starting fen
+    :return: GameInstance, BitboardInstance, NumbaInstance or chess.Board
+    """
+    if backend == 'mailbox':
+        from GameInstance import GameInstance
+        return GameInstance(fen)
+    if backend == 'bitboard':
+        from BitboardInstance import BitboardInstance
+        return BitboardInstance(fen)
+    if backend == 'numba':
+        import numba_backend
+        return numba_backend.new_game(fen)
+    if backend == 'python-chess':
+        import chess
+        return chess.Board(fen)
+    raise ValueError('Unknown backend {}, expected one of {}'.format(backend, backends))
+
+
+def legal_moves(game):
+    """
+    Legal moves of either move API as (uci string, move) pairs
+    """
+    if hasattr(game, 'legal_moves'):
+        return [(move.uci(), move) for move in game.legal_moves]
+    return [(me.move_to_uci(move), move) for move in game.get_all_legal_moves()]
+
+
+def move_functions(game):
+    """
+    Move generation and make/unmake functions of either move API (python-chess boards use push/pop)
+    :return: get moves, make move, unmake move
+    """
+    if hasattr(game, 'legal_moves'):
+        return lambda: list(game.legal_moves), game.push, game.pop
+    return lambda: game.get_all_legal_moves(buffer=True), game.make_move, game.unmake_move
+
+
+def perft(game, depth):
+    """
+    Number of leaf nodes of the legal move tree
+    :param game: GameInstance/BitboardInstance/NumbaInstance (or chess.Board)
+    :param depth: depth of the tree
+    :return: node count
+    """
+    if hasattr(game, 'perft'):
+        return game.perft(depth)  # note - the numba backend runs the whole tree in a compiled kernel
+    get_moves, make_move, unmake_move = move_functions(game)
+    return _perft(get_moves, make_move, unmake_move, depth)
+
+
+def _perft(get_moves, make_move, unmake_move, depth):
+    if depth == 0:
+        return 1
+
+    moves = get_moves()
+    if depth == 1:
+        return len(moves)  # note - bulk counting, the generators are legal so leaves don't need making
+
+    count = 0
+    for move in moves:
+        make_move(move)
+        count += _perft(get_moves, make_move, unmake_move, depth - 1)
+        unmake_move()
+    return count
+
+
+def divide(game, depth):
+    """
+    Perft split by root move, for bisecting a wrong node count against a trusted engine
+    :param game: game to search
+    :param depth: depth of the tree (including the root move)
+    :return: dict of uci string -> node count
+    """
+    _, make_move, unmake_move = move_functions(game)
+    counts = {}
+    for uci, move in legal_moves(game):
+        make_move(move)
+        counts[uci] = perft(game, depth - 1)
+        unmake_move()
+    return counts
+
+
+def run_suite(backend='bitboard', depth=None, names=None):
+    """
+    Runs the perft positions and compares the node counts with the reference values
+    :param backend: 'mailbox', 'bitboard', 'numba' or 'python-chess'
+    :param depth: depth for every position (None for default_depths)
+    :param names: positions to run (None for all)
+    :return: report dict (json serialisable)
+    """
+    results = []
+    for name in names or perft_positions:
+        fen, expected_counts = perft_positions[name]
+        position_depth = min(depth or default_depths[name], len(expected_counts))
+        game = new_game(backend, fen)
+
+        t0 = time.perf_counter()
+        nodes = perft(game, position_depth)
+        elapsed = time.perf_counter() - t0
+
+        results.append({'name': name,
+                        'fen': fen,
+                        'depth': position_depth,
+                        'nodes': nodes,
+                        'expected': expected_counts[position_depth - 1],
+                        'passed': nodes == expected_counts[position_depth - 1],
+                        'elapsed': round(elapsed, 4),
+                        'nodes_per_sec': round(nodes / elapsed) if elapsed else None})
+
+    total_nodes = sum(result['nodes'] for result in results)
+    total_elapsed = sum(result['elapsed'] for result in results)
+    return {'backend': backend,
+            'python': platform.python_version(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'passed': all(result['passed'] for result in results),
+            'total_nodes': total_nodes,
+            'total_elapsed': round(total_elapsed, 4),
+            'nodes_per_sec': round(total_nodes / total_elapsed) if total_elapsed else None,
+            'results': results}
+
+
+def allocation_stats(backend='mailbox', name='start', depth=5):
+    """
+    Garbage made by a perft run - garbage collections during it (each one means allocations outran the frees by the
+    gc threshold), the memory still allocated after it / at the peak (tracemalloc, slows the run down) and the
+    memory blocks make_move leaves allocated per move along a line of first moves (the undo state it keeps - ints
+    for the new keys and scores, no containers)
+    :param backend: 'mailbox' or 'bitboard'
+    :param name: perft position
+    :param depth: depth searched
+    :return: report dict
+    """
+    game = new_game(backend, perft_positions[name][0])
+    moves_made = blocks = 0
+    for _ in range(c.undo_stack_plies // 2):
+        moves = game.get_all_legal_moves()
+        if not moves:
+            break
+        before = sys.getallocatedblocks()
+        game.make_move(moves[0])
+        blocks += sys.getallocatedblocks() - before
+        moves_made += 1
+    while game.move_log:
+        game.unmake_move()
+
+    collections = [generation['collections'] for generation in gc.get_stats()]
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    nodes = perft(game, depth)
+    elapsed = time.perf_counter() - t0
+    current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'backend': backend,
+            'name': name,
+            'depth': depth,
+            'nodes': nodes,
+            'gc_collections': [generation['collections'] - before
+                               for generation, before in zip(gc.get_stats(), collections)],
+            'blocks_per_move': round(blocks / max(moves_made, 1), 2),
+            'retained_bytes': current_bytes,
+            'peak_bytes': peak_bytes,
+            'elapsed': round(elapsed, 4)}
+
+
+def print_divide(backend, fen, depth, reference='python-chess'):
+    """
+    Prints the divide of a position next to the reference engine, flagging root moves whose counts differ
+    :return: True if every root move matches
+    """
+    counts = divide(new_game(backend, fen), depth)
+    reference_counts = divide(new_game(reference, fen), depth) if reference else {}
+
+    matched = True
+    for uci in sorted(set(counts) | set(reference_counts)):
+        count, reference_count = counts.get(uci), reference_counts.get(uci)
+        flag = ''
+        if reference and count != reference_count:
+            flag = '  <- {} {}'.format(reference, reference_count)
+            matched = False
+        print('{}: {}{}'.format(uci, count, flag))
+
+    print('\n{} moves, {} nodes'.format(len(counts), sum(counts.values())))
+    return matched
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Perft correctness/throughput suite')
+    parser.add_argument('--backend', choices=backends, default='bitboard')
+    parser.add_argument('--depth', type=int, help='depth for every position (default: per position)')
+    parser.add_argument('--positions', nargs='+', choices=list(perft_positions), help='positions to run')
+    parser.add_argument('--json', metavar='PATH', help="write the report as json ('-' for stdout)")
+    parser.add_argument('--divide', metavar='FEN', help='per root move counts of a fen (or position name)')
+    parser.add_argument('--reference', default='python-chess',
+                        help="backend the divide is compared against ('none' to skip)")
+    parser.add_argument('--allocations', action='store_true',
+                        help='gc collections and tracemalloc memory of a perft of the start position (--depth, 5)')
+    args = parser.parse_args(argv)
+
+    if args.allocations:
+        stats = allocation_stats(args.backend, depth=args.depth or 5)
+        print('{backend} perft({depth}) {nodes} nodes  gc collections {gc_collections}  retained {retained_bytes} '
+              'bytes  peak {peak_bytes} bytes  {blocks_per_move} blocks per make_move  {elapsed:.1f}s (tracemalloc on)'
+              .format(**stats))
+        return 0
+
+    if args.divide:
+        fen = perft_positions[args.divide][0] if args.divide in perft_positions else args.divide
+        reference = None if args.reference == 'none' else args.reference
+        return 0 if print_divide(args.backend, fen, args.depth or 3, reference) else 1
+
+    report = run_suite(args.backend, args.depth, args.positions)
+    if args.json:
+        if args.json == '-':
+            print(json.dumps(report, indent=2))
+        else:
+            with open(args.json, 'w') as json_file:
+                json.dump(report, json_file, indent=2)
+
+    if args.json != '-':
+        for result in report['results']:
+            print('{:<12} depth {}  {:>10} nodes  expected {:>10}  {:<4}  {:7.2f}s  {:>8} nodes/sec'.format(
+                result['name'], result['depth'], result['nodes'], result['expected'],
+                'ok' if result['passed'] else 'FAIL', result['elapsed'], result['nodes_per_sec']))
+        print('{} total nodes, {:.2f}s, {} nodes/sec'.format(
+            report['total_nodes'], report['total_elapsed'], report['nodes_per_sec']))
+
+    return 0 if report['passed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+
+import AlphaBetaPruning as ab
+import config as c
+import move_encoding as me
+import move_ordering as mo
+import perft
+import transposition as tt
+
+# Fixed depth search over a position suite, with the selective search switches on and off
+benchmark_positions = dict({name: fen for name, (fen, _) in perft.perft_positions.items()},
+                           italian='r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3',
+                           queens_gambit='r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP2BPPP/R2QKB1R w KQ - 0 8',
+                           pawn_endgame='8/5k2/3p4/1p1Pp2p/pP2Pp1P/P4P1K/8/8 b - - 99 50')
+
+# name -> config switches (the first is the baseline the best moves are compared with)
+search_modes = {'unreduced': {'null_move_pruning': False, 'late_move_reductions': False},
+                'null_move': {'null_move_pruning': True, 'late_move_reductions': False},
+                'lmr': {'null_move_pruning': False, 'late_move_reductions': True},
+                'null_move+lmr': {'null_move_pruning': True, 'late_move_reductions': True}}
+
+
+def search_position(fen, depth, switches):
+    """
+    Fixed depth search of a position (full evaluation, square_bonus on) with a fresh transposition table/move orderer
+    and the given config switches
+    :return: dict of best move, score, nodes and time to depth
+    """
+    saved = {name: getattr(c, name) for name in switches}
+    for name, value in switches.items():
+        setattr(c, name, value)
+    try:
+        board = ab.new_game(fen)
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            best_move = ab.minimaxRoot(depth, board, board.is_whites_turn, True,
+                                       transposition_table=tt.TranspositionTable(16), move_orderer=mo.MoveOrderer())
+            elapsed = time.perf_counter() - t0
+    finally:
+        for name, value in saved.items():
+            setattr(c, name, value)
+    return {'best_move': me.move_to_uci(best_move) if best_move else None,
+            'score': ab.search_stats['best_score'],
+            'nodes': ab.search_stats['nodes'] + ab.search_stats['qs_nodes'],
+            'seconds': round(elapsed, 4)}
+
+
+def run_benchmark(depth=4, modes=None, names=None):
+    """
+    :param depth: search depth
+    :param modes: search_modes names (None for all)
+    :param names: benchmark_positions names (None for all)
+    :return: report dict (json serialisable) - per mode totals and the fraction of best moves matching the baseline
+    """
+    modes = modes or list(search_modes)
+    names = names or list(benchmark_positions)
+    report = {'depth': depth, 'modes': {}}
+    baseline = None
+    for mode in modes:
+        results = {name: search_position(benchmark_positions[name], depth, search_modes[mode]) for name in names}
+        baseline = baseline or results
+        report['modes'][mode] = {
+            'nodes': sum(result['nodes'] for result in results.values()),
+            'seconds': round(sum(result['seconds'] for result in results.values()), 4),
+            'best_move_agreement': sum(results[name]['best_move'] == baseline[name]['best_move']
+                                       for name in names) / len(names),
+            'positions': results}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Nodes, time to depth and best move agreement of the search modes')
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--modes', nargs='+', choices=list(search_modes))
+    parser.add_argument('--positions', nargs='+', choices=list(benchmark_positions))
+    parser.add_argument('--json', metavar='PATH', help="write the report as json ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.depth, args.modes, args.positions)
+    if args.json == '-':
+        print(json.dumps(report, indent=2))
+        return 0
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(report, json_file, indent=2)
+
+    print('depth {}'.format(report['depth']))
+    for mode, result in report['modes'].items():
+        print('{:<14} {:>9} nodes  {:7.2f}s  best move agreement {:.0%}'.format(
+            mode, result['nodes'], result['seconds'], result['best_move_agreement']))
+        for name, position in result['positions'].items():
+            print('    {:<14} {:<6} {:>7} {:>9} nodes  {:6.2f}s'.format(
+                name, position['best_move'], ab.score_to_string(position['score']), position['nodes'],
+                position['seconds']))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import AlphaBetaPruning as ab
+import config as c
+import move_encoding as me
+import transposition as tt
+from BitboardInstance import BitboardInstance
+from GameInstance import GameInstance
+
+defended_pawn_fen = '4k3/8/3p4/4p3/8/8/4Q3/4K3 w - - 0 1'  # Qxe5 wins a pawn but dxe5 loses the queen
+
+
+def search(fen, depth, quiescence):
+    quiescence_setting = c.quiescence
+    c.quiescence = quiescence
+    try:
+        game = GameInstance(fen)
+        return ab.minimaxRoot(depth, game, game.is_whites_turn, transposition_table=tt.TranspositionTable(1))
+    finally:
+        c.quiescence = quiescence_setting
+
+
+def test_quiescence_sees_recapture():
+    queen_takes = 'e2e5'
+    assert me.move_to_uci(search(defended_pawn_fen, 1, quiescence=False)) == queen_takes  # horizon effect
+    assert me.move_to_uci(search(defended_pawn_fen, 1, quiescence=True)) != queen_takes
+    assert ab.search_stats['qs_nodes'] > 0
+
+
+def test_quiescence_stand_pat():
+    game = GameInstance('4k3/8/8/8/8/8/8/4K3 w - - 0 1')  # no captures - static evaluation
+    assert ab.quiescence(game, -ab.infinity, ab.infinity, False) == ab.evaluation(game, False)
+
+
+def test_quiescence_in_check():
+    game = GameInstance('7k/6Q1/6K1/8/8/8/8/8 b - - 0 1')  # checkmated - no stand pat on the extra queen
+    assert ab.quiescence(game, -ab.infinity, ab.infinity, True, ply=3) == -ab.mate_score + 3
+
+    saved = c.quiescence_max_depth
+    try:
+        c.quiescence_max_depth = 0
+        ab.search_stats.update(qs_node_limit_hits=0, qs_depth_limit_hits=0)
+        ab.quiescence(game, -ab.infinity, ab.infinity, True)
+        assert ab.search_stats['qs_depth_limit_hits'] == 1 and ab.search_stats['qs_node_limit_hits'] == 0
+    finally:
+        c.quiescence_max_depth = saved
+
+
+def test_iterative_deepening_node_limit():
+    game = GameInstance('r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP2BPPP/R2QKB1R w KQ - 0 8')
+    start_board, start_key = bytes(game.board), game.zobrist_key
+
+    move = ab.minimaxRoot(c.max_search_depth, game, True, transposition_table=tt.TranspositionTable(1),
+                          node_limit=20000)
+    assert move in game.get_all_legal_moves()
+    assert 1 <= ab.search_stats['depth'] < c.max_search_depth
+    assert ab.search_stats['nodes'] + ab.search_stats['qs_nodes'] <= 20000 + 2 * ab.limit_check_interval  # checked on both counters
+    assert (bytes(game.board), game.zobrist_key) == (start_board, start_key)  # stopped search is unwound
+
+
+def test_mate_score():
+    back_rank_mate_fen = '6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1'
+    assert me.move_to_uci(search(back_rank_mate_fen, 4, quiescence=True)) == 'a1a8'  # Ra8#
+    assert ab.search_stats['best_score'] == ab.mate_score - 1
+    assert ab.score_to_string(ab.search_stats['best_score']) == 'mate 1'
+    game = GameInstance(back_rank_mate_fen)
+    game.make_move(next(move for move in game.get_all_legal_moves() if me.move_to_uci(move) == 'a1a8'))
+    assert ab.negamax(1, game, -ab.infinity, ab.infinity, 1, False) == -ab.mate_score + 1
+
+
+def test_stalemate_scores_draw():
+    game = GameInstance('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1')  # black is a queen down but has no moves
+    assert ab.negamax(2, game, -ab.infinity, ab.infinity, 0, False) == 0
+
+
+def test_null_move_zugzwang_safeguard():
+    for backend in (GameInstance, BitboardInstance):
+        assert not ab.has_non_pawn_material(backend('8/5k2/3p4/1p1Pp2p/pP2Pp1P/P4P1K/8/8 b - - 0 50'))
+        assert ab.has_non_pawn_material(backend(defended_pawn_fen))
+        assert not ab.has_non_pawn_material(backend(defended_pawn_fen.replace(' w ', ' b ')))  # black has pawns only
+
+
+def test_evaluation_without_incremental_scores(monkeypatch):
+    fens = [defended_pawn_fen, '4k3/p7/8/8/8/P7/P7/4K3 w - - 0 1',
+            'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1']
+    incremental = [ab.evaluation(GameInstance(fen)) for fen in fens]
+    monkeypatch.setattr(c, 'incremental_evaluation', False)
+    assert [ab.evaluation(GameInstance(fen)) for fen in fens] == incremental
+    assert [ab.evaluation(BitboardInstance(fen)) for fen in fens] == incremental
@@ -0,0 +1,36 @@
+import random
+
+import attack_maps as am
+import config as c
+import fen_settings as s
+import move_encoding as me
+import perft
+from GameInstance import GameInstance
+
+
+def test_attack_maps_random_playout(monkeypatch):
+    monkeypatch.setattr(c, 'attack_maps', True)
+    random.seed(1)
+    for name in ('kiwipete', 'position_4', 'position_5'):
+        game = GameInstance(perft.perft_positions[name][0])
+        game.verify_attack_maps = True  # raises if the incremental maps drift from a full recompute
+        for _ in range(60):
+            moves = game.get_all_legal_moves()
+            if not moves:
+                break
+            game.make_move(random.choice(moves))
+        while game.move_log:
+            game.unmake_move()
+        assert game.attack_counts == am.compute_attack_counts(game.board)
+
+
+def test_attack_maps_perft_and_lookups(monkeypatch):
+    monkeypatch.setattr(c, 'attack_maps', True)
+    report = perft.run_suite('mailbox', depth=2)
+    assert report['passed']
+
+    # Black queen checking along the e file - e1 is behind the king (missing from the maps) but still attacked
+    game = GameInstance('4k3/8/8/8/4q3/8/4K3/8 w - - 0 1')
+    assert game.king_in_check()
+    assert game.attack_counts[s.black][s.algebraic_to_square_id['e1']] == 0
+    assert s.algebraic_to_square_id['e1'] not in [me.move_end(move) for move in game.get_all_legal_moves()]
@@ -0,0 +1,48 @@
+import batch_analysis as ba
+
+fens = ['6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1',
+        'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3',
+        '4k3/8/3p4/4p3/8/8/4Q3/4K3 w - - 0 1']
+
+
+def test_parse_fen_line():
+    assert ba.parse_fen_line(fens[0] + '\n') == fens[0]
+    assert ba.parse_fen_line('6k1/5ppp/8/8/8/8/8/R5K1 w - - bm Ra8#;') == fens[0]  # epd
+    assert ba.parse_fen_line('# comment') is None and ba.parse_fen_line('\n') is None
+
+
+def test_analyse_stream():
+    results = list(ba.analyse_stream(fens + ['not a fen'], depth=2, workers=1))
+    assert [result['index'] for result in results] == [0, 1, 2, 3]
+    assert results[0]['best_move'] == 'a1a8' and results[0]['mate'] == 1
+    assert all(result['depth'] == 2 and result['nodes'] > 0 for result in results[1:3])
+    assert results[3]['error'] is not None
+
+    unordered = list(ba.analyse_stream(iter(fens), depth=2, workers=2, ordered=False, max_pending=2))
+    assert sorted(result['index'] for result in unordered) == [0, 1, 2]
+    assert all(result['best_move'] and result['error'] is None for result in unordered)
+
+
+def test_positions_without_moves():
+    checkmate, stalemate, no_king = ('7k/6Q1/6K1/8/8/8/8/8 b - - 0 1', '7k/5Q2/6K1/8/8/8/8/8 b - - 0 1',
+                                     '4k3/8/8/8/8/8/8/8 w - - 0 1')
+    results = list(ba.analyse_stream([checkmate, stalemate, no_king], depth=2, workers=1))
+    assert [result['result'] for result in results] == ['checkmate', 'stalemate', None]
+    assert results[0]['error'] is None and results[0]['best_move'] is None
+    assert results[2]['error'].startswith('ValueError')
+    assert next(ba.evaluate_stream([no_king]))['error'].startswith('ValueError')
+
+
+def test_static_scores_match_evaluation():
+    import AlphaBetaPruning as ab
+    pawn_fens = ['4k3/p7/8/8/8/P7/P7/4K3 w - - 0 1', '4k3/p1p4r/8/8/8/P7/P2P4/R3K3 w - - 0 1']
+    for result, fen in zip(ba.evaluate_stream(pawn_fens + fens), pawn_fens + fens):
+        assert result['score'] == ab.evaluation(ab.new_game(fen))
+    assert next(ba.evaluate_stream(pawn_fens[:1]))['score'] == 80  # doubled and isolated a pawns
+
+
+def test_static_scores_match_across_depths():
+    # note - a3a4 is whites only move and leaves black nothing to capture, so depth 1 scores the child statically
+    results = list(ba.analyse_stream(['8/7p/8/8/8/P7/P1k5/K7 w - - 0 1'], depth=1, workers=1))
+    assert results[0]['best_move'] == 'a3a4'
+    assert results[0]['score'] == next(ba.evaluate_stream(['8/7p/8/8/P7/8/P1k5/K7 b - - 0 1']))['score']
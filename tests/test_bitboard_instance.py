@@ -0,0 +1,41 @@
+import random
+
+from BitboardInstance import BitboardInstance
+from GameInstance import move_counter
+
+# https://www.chessprogramming.org/Perft_Results
+perft_positions = [('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 3, 8902),
+                   ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', 2, 2039),
+                   ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', 3, 2812),
+                   ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', 3, 9467),
+                   ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', 2, 1486)]
+
+
+def test_perft():
+    for fen, depth, expected in perft_positions:
+        assert move_counter(BitboardInstance(fen), depth) == expected, fen
+
+
+def test_incremental_state_random_playout():
+    random.seed(1)
+    for fen, _, _ in perft_positions:
+        game = BitboardInstance(fen)
+        game.verify_zobrist = True
+        game.verify_evaluation = True
+        start_key, start_board, start_bitboards = game.zobrist_key, bytes(game.board), list(game.bitboards)
+
+        moves_made = 0
+        for _ in range(60):
+            moves = game.get_all_legal_moves()
+            if not moves:
+                break
+            game.make_move(random.choice(moves))
+            moves_made += 1
+            assert game.bitboards == game.compute_bitboards()
+
+        for _ in range(moves_made):
+            game.unmake_move()
+
+        assert game.zobrist_key == start_key
+        assert game.board == start_board
+        assert game.bitboards == start_bitboards
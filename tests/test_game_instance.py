@@ -0,0 +1,150 @@
+import random
+
+import AlphaBetaPruning as ab
+import config as c
+import fen_settings as s
+import move_encoding as me
+from BitboardInstance import BitboardInstance
+from GameInstance import GameInstance
+
+start_fen = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+kiwipete_fen = 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'
+
+
+def play(game, start, end):
+    game.make_move(me.uci_to_move(game, start + end))
+
+
+def piece_lists_from_board(game):
+    piece_lists = [[] for _ in range(s.piece_code_count)]
+    for square in s.real_board_squares:
+        if game.board[square] != s.empty:
+            piece_lists[game.board[square]].append(square)
+    return piece_lists
+
+
+def test_incremental_state_random_playout():
+    random.seed(0)
+    for fen in (start_fen, kiwipete_fen):
+        game = GameInstance(fen)
+        game.verify_zobrist = True  # raises if the incremental key drifts from the from scratch hash
+        game.verify_evaluation = True  # same for the incremental material/square bonus scores
+        start_key, start_board = game.zobrist_key, bytes(game.board)
+
+        moves_made = 0
+        for _ in range(60):
+            moves = game.get_all_legal_moves()
+            if not moves:
+                break
+            game.make_move(random.choice(moves))
+            moves_made += 1
+            assert [sorted(squares) for squares in game.piece_lists] == piece_lists_from_board(game)
+
+        for _ in range(moves_made):
+            game.unmake_move()
+            assert [sorted(squares) for squares in game.piece_lists] == piece_lists_from_board(game)
+
+        assert game.zobrist_key == start_key
+        assert game.board == start_board
+
+
+def test_zobrist_key_transposition():
+    game_1 = GameInstance(start_fen)
+    for start, end in (('g1', 'f3'), ('g8', 'f6'), ('b1', 'c3')):
+        play(game_1, start, end)
+
+    game_2 = GameInstance(start_fen)
+    for start, end in (('b1', 'c3'), ('g8', 'f6'), ('g1', 'f3')):
+        play(game_2, start, end)
+
+    assert game_1.zobrist_key == game_2.zobrist_key
+
+
+def test_zobrist_key_en_passant_and_castling_rights():
+    game = GameInstance(start_fen)
+    play(game, 'e2', 'e4')
+    assert game.en_passant_square == s.algebraic_to_square_id['e3']
+    play(game, 'e7', 'e6')
+    assert game.en_passant_square is None
+
+    play(game, 'e1', 'e2')
+    assert game.castling_rights == 'kq'
+    assert game.zobrist_key == game.compute_zobrist_key()
+
+    game.unmake_move()
+    assert game.castling_rights == 'KQkq'
+    assert game.zobrist_key == game.compute_zobrist_key()
+
+
+def test_incremental_evaluation_promotion_and_en_passant():
+    game = GameInstance('4k3/1P6/8/8/5p2/8/4P3/4K3 w - - 0 1')
+    game.verify_evaluation = True
+    play(game, 'b7', 'b8')
+    assert game.material_score == 900  # queen + pawn vs pawn
+    play(game, 'e8', 'd7')
+    play(game, 'e2', 'e4')
+    play(game, 'f4', 'e3')
+    assert game.material_score == 800  # e pawn taken en passant
+    assert (game.material_score, game.square_bonus_score, game.end_game_score, game.phase) == \
+        game.compute_evaluation()
+    assert game.phase == 4  # the promoted queen
+
+
+def test_tapered_evaluation():
+    game = GameInstance(start_fen)
+    assert game.phase == s.max_phase
+    assert ab.evaluation(game, True) == game.material_score + game.square_bonus_score  # all mid game
+
+    game = GameInstance('4k3/8/8/3p4/8/8/4P3/4K3 w - - 0 1')
+    assert game.phase == 0
+    assert ab.evaluation(game, True) == game.material_score + game.end_game_score  # all end game
+
+    game = GameInstance(kiwipete_fen)
+    game.verify_evaluation = True
+    play(game, 'e5', 'f7')  # knight takes a pawn, king takes the knight back
+    play(game, 'e8', 'f7')
+    assert game.phase == s.max_phase - 1
+    game.unmake_move()
+    game.unmake_move()
+    assert game.phase == s.max_phase
+
+
+def test_piece_lists_derived_state():
+    game = GameInstance(kiwipete_fen)
+    assert game.king_location == {'w': s.algebraic_to_square_id['e1'], 'b': s.algebraic_to_square_id['e8']}
+    assert game.piece_dict[0] == {'p': 8, 'N': 2, 'B': 2, 'R': 2, 'Q': 1, 'K': 1}
+    assert sorted(game.rook_columns_list[1]) == [1, 8]
+
+    play(game, 'e5', 'f7')  # knight takes f7
+    assert game.piece_dict[1]['p'] == 7
+    play(game, 'e8', 'f7')  # king takes the knight back
+    assert game.piece_dict[0]['N'] == 1
+    assert game.king_location['b'] == s.algebraic_to_square_id['f7']
+
+
+def test_null_move():
+    game = GameInstance(start_fen)
+    game.verify_zobrist = True
+    play(game, 'e2', 'e4')  # leaves an en passant square
+    key, en_passant_square = game.zobrist_key, game.en_passant_square
+    game.make_null_move()
+    assert game.is_whites_turn and game.en_passant_square is None
+    assert game.zobrist_key == game.compute_zobrist_key()
+    game.unmake_null_move()
+    assert (game.is_whites_turn, game.zobrist_key, game.en_passant_square) == (False, key, en_passant_square)
+
+
+def test_undo_stack(monkeypatch):
+    monkeypatch.setattr(c, 'undo_stack_plies', 2)  # grown on the way
+    for game in (GameInstance(start_fen), BitboardInstance(start_fen)):
+        for start, end in (('g1', 'f3'), ('g8', 'f6'), ('f3', 'g1'), ('f6', 'g8'), ('e2', 'e4')):
+            play(game, start, end)
+        assert (game.half_move, game.full_move) == (0, 3)  # reset by the pawn move
+        game.unmake_move()
+        assert (game.half_move, game.full_move) == (4, 3)
+        while game.move_log:
+            game.unmake_move()
+        assert (game.half_move, game.full_move, game.zobrist_key) == (0, 1, game.compute_zobrist_key())
+
+        moves = game.get_all_legal_moves(buffer=True)
+        assert moves is game.get_all_legal_moves(buffer=True) and len(moves) == 20  # reused list of the ply
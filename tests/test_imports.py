@@ -0,0 +1,9 @@
+import import_benchmark
+
+
+def test_engine_imports_are_side_effect_free():
+    for module in import_benchmark.engine_modules:
+        result = import_benchmark.time_import(module, repeat=1)
+        assert result['error'] is None, result
+        assert result['heavy_modules'] == [], result
+        assert not result['printed'], result
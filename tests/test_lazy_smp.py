@@ -0,0 +1,36 @@
+import AlphaBetaPruning as ab
+import lazy_smp
+from GameInstance import GameInstance
+
+fen = 'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3'
+
+
+def test_lazy_smp_search():
+    game = GameInstance(fen)
+    try:
+        move = lazy_smp.lazy_smp_search(3, game, workers=2)
+        assert ab.search_stats['depth'] == 3
+        table = lazy_smp.get_helpers(1)
+        assert ab.search_stats['helper_ages'] == [table.age]
+
+        table.clear()  # note - the helpers' ages follow the main table's
+        lazy_smp.lazy_smp_search(2, game, workers=2)
+        assert ab.search_stats['helper_ages'] == [table.age] == [1]
+    finally:
+        lazy_smp.shutdown_helpers()
+    assert move in game.get_all_legal_moves()
+    assert len(ab.search_stats['helper_depths']) == 1 and ab.search_stats['helper_nodes'] > 0
+
+
+def test_dead_helper():
+    game = GameInstance(fen)
+    try:
+        lazy_smp.get_helpers(1)
+        process, _ = lazy_smp._helpers[0]
+        process.kill()
+        process.join()
+        move = lazy_smp.lazy_smp_search(2, game, workers=2)  # note - doesn't wait for the dead helper
+        assert move in game.get_all_legal_moves()
+        assert ab.search_stats['helper_depths'] == [] and not lazy_smp._helpers  # restarted by the next search
+    finally:
+        lazy_smp.shutdown_helpers()
@@ -0,0 +1,25 @@
+import fen_settings as s
+import move_encoding as me
+from BitboardInstance import BitboardInstance
+from GameInstance import GameInstance
+
+promotion_fen = 'r3k3/1P6/8/8/8/8/8/4K2R w Kq - 0 1'
+
+
+def test_encode_and_decode():
+    move = me.encode_move(32, 22, me.promotion_flags[s.knight], -250)
+    assert (me.move_start(move), me.move_end(move), me.promotion_piece(move), me.move_score(move)) == \
+        (32, 22, s.knight, -250)
+    assert me.move_to_uci(move) == 'b7b8n'
+    assert me.move_key(move) == me.move_key(me.encode_move(32, 22, me.promotion_flags[s.knight], 300))
+    assert sorted([me.encode_move(95, 96, score=10), me.encode_move(95, 86, score=-10)])[0] == \
+        me.encode_move(95, 86, score=-10)
+
+
+def test_uci_round_trip():
+    for game in (GameInstance(promotion_fen), BitboardInstance(promotion_fen)):
+        moves = game.get_all_legal_moves()
+        assert all(me.uci_to_move(game, me.move_to_uci(move)) == move for move in moves)
+        assert me.promotion_piece(me.uci_to_move(game, 'b7a8')) == s.queen
+        assert me.move_flag(me.uci_to_move(game, 'e1g1')) == me.castle
+        assert me.uci_to_move(game, 'e1c1') is None
@@ -0,0 +1,43 @@
+import move_encoding as me
+import move_ordering as mo
+from GameInstance import GameInstance
+
+# e4xd5 wins the queen, Qxb7 loses the queen to the a8 rook
+fen = 'r3k3/1p6/8/3q4/4P3/8/8/1Q2K3 w - - 0 1'
+pawn_takes_queen = (65, 54)
+queen_takes_pawn = (92, 32)
+
+
+def ordered(game, orderer, hash_move=None):
+    return [squares(move) for move in orderer.ordered_moves(game, hash_move)]
+
+
+def squares(move):
+    return me.move_start(move), me.move_end(move)
+
+
+def test_staged_order():
+    game = GameInstance(fen)
+    moves = ordered(game, mo.MoveOrderer())
+    assert sorted(moves) == sorted(squares(move) for move in game.get_all_legal_moves())
+    assert moves[0] == pawn_takes_queen  # good capture first
+    assert moves[-1] == queen_takes_pawn  # bad capture last
+
+
+def test_hash_move_first_once():
+    game = GameInstance(fen)
+    hash_move = next(move for move in game.get_all_legal_moves() if squares(move) == (95, 96))  # Kf1
+    moves = ordered(game, mo.MoveOrderer(), hash_move)
+    assert moves[0] == squares(hash_move)
+    assert moves.count(squares(hash_move)) == 1
+
+
+def test_killer_and_history():
+    game = GameInstance(fen)
+    orderer = mo.MoveOrderer()
+    orderer.new_search(len(game.move_log))
+    quiet_move = next(move for move in game.get_all_legal_moves() if squares(move) == (92, 82))  # Qb2
+    orderer.update(game, quiet_move, 3)
+    assert orderer.killers[0][0] == quiet_move
+    assert orderer.history[game.board[92]][82] == 9
+    assert ordered(game, orderer)[1] == squares(quiet_move)  # straight after the good capture
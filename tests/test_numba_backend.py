@@ -0,0 +1,57 @@
+import pytest
+
+import move_encoding as me
+import perft
+from GameInstance import GameInstance
+
+nb = pytest.importorskip('numba_backend')
+if not nb.available:
+    pytest.skip('numba not installed', allow_module_level=True)
+
+
+def test_numba_perft():
+    report = perft.run_suite('numba', depth=3)
+    assert report['passed']
+
+
+def test_numba_moves_match_mailbox():
+    fen = perft.perft_positions['position_4'][0]
+    game, reference = nb.NumbaInstance(fen), GameInstance(fen)
+    # note - after d7d5 the c5 pawn is pinned, so c5d6 en passant isn't legal
+    for uci in ('c4c5', 'b2a1q', 'd1a1', 'd7d5', None):
+        assert sorted(map(me.move_to_uci, game.get_all_legal_moves())) == \
+            sorted(map(me.move_to_uci, reference.get_all_legal_moves()))
+        if uci is None:
+            break
+        game.make_move(me.uci_to_move(game, uci))
+        reference.make_move(me.uci_to_move(reference, uci))
+        assert game.compute_evaluation() == reference.compute_evaluation()
+        assert (game.castling_rights, game.en_passant_square) == (reference.castling_rights,
+                                                                  reference.en_passant_square)
+
+    while game.move_log:
+        game.unmake_move()
+    assert game.compute_evaluation() == GameInstance(fen).compute_evaluation()
+    assert game.perft(2) == perft.perft_positions['position_4'][1][1]
+
+
+def test_failed_compile_is_retried(monkeypatch):
+    def failing_perft(self, depth):
+        raise RuntimeError('compile failed')
+
+    monkeypatch.setattr(nb, '_compiled', False)
+    monkeypatch.setattr(nb.NumbaInstance, 'perft', failing_perft)
+    with pytest.raises(RuntimeError):
+        nb.compile_kernels()
+    assert not nb._compiled and not nb._compiling
+    monkeypatch.undo()
+    monkeypatch.setattr(nb, '_compiled', False)
+    nb.compile_kernels()
+    assert nb._compiled
+
+
+def test_move_buffer_bound():
+    start = GameInstance(perft.perft_positions['start'][0])
+    assert nb.move_bound(start.board, nb.white) == nb.max_moves
+    with pytest.raises(ValueError):
+        nb.NumbaInstance('QQQQQQQQ/QQQQQQQQ/8/8/8/8/8/K6k w - - 0 1')
@@ -0,0 +1,60 @@
+import pytest
+
+import AlphaBetaPruning as ab
+import move_encoding as me
+import opening_book as ob
+import perft
+from BitboardInstance import BitboardInstance
+from GameInstance import GameInstance
+
+pytest.importorskip('chess')
+
+pgn = """[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bc4 Nf6 4. O-O 1-0
+
+[Result "1/2-1/2"]
+
+1. e4 c5 2. Nf3 1/2-1/2
+
+[Result "0-1"]
+
+1. d4 d5 0-1
+"""
+
+
+def play(game, uci_moves):
+    for uci in uci_moves:
+        game.make_move(dict(perft.legal_moves(game))[uci])
+    return game
+
+
+def test_polyglot_key():
+    # Keys from the Polyglot format description
+    start = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+    assert ob.polyglot_key(GameInstance(start)) == 0x463b96181691fc9c
+    assert ob.polyglot_key(play(GameInstance(start), ['e2e4'])) == 0x823c9b50fd114196
+    assert ob.polyglot_key(play(BitboardInstance(start), ['e2e4', 'd7d5', 'e4e5', 'f7f5'])) == 0x22a48b5a8e47ff78
+
+
+def test_build_and_probe(tmp_path, monkeypatch):
+    (tmp_path / 'games.pgn').write_text(pgn)
+    book_path = str(tmp_path / 'book.bin')
+    assert ob.build_book([str(tmp_path / 'games.pgn')], book_path, max_ply=8) > 0
+
+    book = ob.OpeningBook(book_path)
+    start = BitboardInstance('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1')
+    moves = {me.move_to_uci(move): weight for move, weight in book.moves(start)}
+    assert moves == {'e2e4': 3}  # won + drawn, d4 lost
+    assert me.move_to_uci(book.choose_move(start)) == 'e2e4'
+
+    castling = play(BitboardInstance(start.starting_fen), ['e2e4', 'e7e5', 'g1f3', 'b8c6', 'f1c4', 'g8f6'])
+    assert me.move_flag(book.moves(castling)[0][0]) == me.castle
+    book.close()
+
+    monkeypatch.setattr(ab.c, 'opening_book', book_path)
+    monkeypatch.setattr(ob, '_book', None)
+    assert me.move_to_uci(ab.minimaxRoot(3, start, True)) == 'e2e4'
+    monkeypatch.setattr(ab.c, 'max_book_ply', 0)  # past the book, searched instead
+    assert ob.book_move(start) is None
+    ob.get_book().close()
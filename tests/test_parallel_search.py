@@ -0,0 +1,21 @@
+import AlphaBetaPruning as ab
+import move_encoding as me
+import parallel_search as ps
+import transposition as tt
+from GameInstance import GameInstance
+
+fen = 'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3'
+
+
+def test_parallel_root_search_matches_serial():
+    game = GameInstance(fen)
+    game.make_move(next(move for move in game.get_all_legal_moves() if me.move_to_uci(move) == 'f1c4'))
+    ab.minimaxRoot(3, game, game.is_whites_turn, transposition_table=tt.TranspositionTable(1), workers=1)
+    serial_score = ab.search_stats['best_score']
+    try:
+        move = ab.minimaxRoot(3, game, game.is_whites_turn, workers=2)
+    finally:
+        ps.shutdown_process_pool()
+    assert move in game.get_all_legal_moves()
+    assert ab.search_stats['depth'] == 3
+    assert ab.search_stats['best_score'] == serial_score
@@ -0,0 +1,35 @@
+import config as c
+import fen_settings as s
+import move_encoding as me
+import pawn_structure as pawns
+from GameInstance import GameInstance
+
+
+def pawn_terms(fen):
+    game = GameInstance(fen)
+    return pawns.pawn_entry(game.pawn_key, game.piece_squares(s.white | s.pawn),
+                            game.piece_squares(s.black | s.pawn))[1]
+
+
+def test_pawn_terms():
+    # Doubled and isolated a pawns against an isolated pawn on the same file - none of them passed
+    assert pawn_terms('4k3/p7/8/8/8/P7/P7/4K3 w - - 0 1') == -c.doubled_pawn_penalty - c.isolated_pawn_penalty
+    # Passed e pawn on the 6th rank
+    assert pawn_terms('4k3/8/4P3/8/8/8/8/4K3 w - - 0 1') == c.passed_pawn_bonus[6] - c.isolated_pawn_penalty
+    # Backward d pawn (the e pawn is ahead of it and c5 guards d4), passed e pawn, isolated black c pawn
+    assert pawn_terms('4k3/8/8/2p5/4P3/3P4/8/4K3 w - - 0 1') == \
+        -c.backward_pawn_penalty + c.passed_pawn_bonus[4] + c.isolated_pawn_penalty
+
+
+def test_pawn_hash_and_rook_files():
+    game = GameInstance('4k3/pp6/8/8/8/8/P7/R3K2R w - - 0 1')
+    table = pawns.get_pawn_table()
+    table.clear()
+    score = pawns.evaluate(game)
+    assert table.hits == 0
+
+    # b file is half open (black pawn only), h file open
+    game.make_move(me.uci_to_move(game, 'a1b1'))
+    assert pawns.evaluate(game) == score + c.rook_half_open_file_bonus  # rook left the a file behind its pawn
+    assert table.hits == 1  # pawns didn't move
+    assert pawns.evaluate(game) - score == c.rook_half_open_file_bonus
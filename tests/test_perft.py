@@ -0,0 +1,21 @@
+import perft
+
+
+def test_run_suite_bitboard():
+    report = perft.run_suite('bitboard', depth=2)
+    assert report['passed']
+    assert [result['name'] for result in report['results']] == list(perft.perft_positions)
+    assert report['total_nodes'] == sum(counts[1] for _, counts in perft.perft_positions.values())
+
+
+def test_divide_matches_python_chess():
+    fen = perft.perft_positions['position_4'][0]  # castling, promotions and en passant in the first 2 plies
+    counts = perft.divide(perft.new_game('bitboard', fen), 2)
+    assert counts == perft.divide(perft.new_game('python-chess', fen), 2)
+    assert sum(counts.values()) == perft.perft_positions['position_4'][1][1]
+
+
+def test_run_suite_mailbox():
+    report = perft.run_suite('mailbox', depth=3)
+    assert report['passed']
+    assert report['total_nodes'] == sum(counts[2] for _, counts in perft.perft_positions.values())
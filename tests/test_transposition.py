@@ -0,0 +1,71 @@
+import pytest
+
+import move_encoding as me
+import transposition as tt
+
+
+def test_store_and_probe():
+    table = tt.TranspositionTable(size_mb=1)
+    move = me.encode_move(85, 65, me.two_square_pawn, 40)
+    table.store(12345, 3, 50, tt.exact, move)
+
+    assert table.probe(12345) == (12345, 3, 50, tt.exact, move, 0)
+    assert table.probe(54321) is None
+    assert table.hits == 1 and table.probes == 2
+
+
+@pytest.mark.parametrize('table_class', [tt.TranspositionTable, tt.SharedTranspositionTable])
+def test_replacement_policy(table_class):
+    table = table_class(size_mb=1)
+    try:
+        table.new_search()  # note - a non zero age, so a misread age can't pass as the current one
+        key_1 = 7
+        key_2 = key_1 + table.mask + 1  # same bucket
+        key_3 = key_2 + table.mask + 1
+
+        table.store(key_1, 5, 10, tt.lower_bound, None)
+        table.store(key_2, 2, 20, tt.exact, None)  # shallower - goes to the always replace slot
+        assert table.probe(key_1)[1] == 5
+        assert table.probe(key_2)[1] == 2
+
+        table.store(key_3, 1, 30, tt.exact, None)  # overwrites the always replace slot only
+        assert table.probe(key_1) is not None
+        assert table.probe(key_2) is None
+        assert table.collisions == 1
+
+        table.new_search()
+        table.store(key_2, 1, 20, tt.exact, None)  # older entries lose their depth protection
+        assert table.probe(key_2)[1] == 1
+        assert table.probe(key_1)[1] == 5  # displaced entry kept in the always replace slot
+    finally:
+        if table_class is tt.SharedTranspositionTable:
+            table.close()
+            table.unlink()
+
+
+def test_stats():
+    table = tt.TranspositionTable(size_mb=1)
+    table.store(1, 1, 0, tt.exact, None)
+    table.probe(1)
+    table.probe(2)
+    stats = table.stats()
+
+    assert stats['hit_rate'] == 0.5
+    assert stats['fill'] == 1 / stats['entries']
+
+
+def test_shared_table():
+    table = tt.SharedTranspositionTable(size_mb=1)
+    try:
+        move = me.encode_move(95, 97, me.castle, -20)
+        table.store(12345, 3, -50, tt.lower_bound, move)
+        attached = tt.SharedTranspositionTable(size_mb=1, name=table.name)  # as another process would
+        assert attached.probe(12345) == (12345, 3, -50, tt.lower_bound, move, 0)
+        attached.close()
+
+        offset = (12345 & table.mask) << 2
+        table.words[offset + 1] ^= 1 << 50  # torn write - data no longer matches the key word
+        assert table.probe(12345) is None
+    finally:
+        table.close()
+        table.unlink()
@@ -0,0 +1,25 @@
+import AlphaBetaPruning as ab
+import perft
+import vector_evaluation as ve
+from BitboardInstance import BitboardInstance
+
+
+def test_evaluate_children_matches_evaluation():
+    for name in ('kiwipete', 'position_4', 'position_5'):  # castling, promotions and en passant
+        game = BitboardInstance(perft.perft_positions[name][0])
+        moves = game.get_all_legal_moves()
+        scores = ve.evaluate_children(game, moves)
+        for move, score in zip(moves, scores):
+            game.make_move(move)
+            assert score == ab.evaluation(game, True)
+            game.unmake_move()
+
+
+def test_evaluate_batch_layouts(monkeypatch):
+    monkeypatch.setattr(ab.c, 'pawn_structure', False)  # piece arrays only, no pawn hash
+    fens = [fen for fen, _ in perft.perft_positions.values()]
+    positions = ve.np.stack([ve.fen_array(fen) for fen in fens])
+    scores = ve.evaluate_batch(positions)
+    assert list(scores) == [ab.evaluation(BitboardInstance(fen), True) for fen in fens]
+    assert list(ve.evaluate_batch(ve.to_planes(positions))) == list(scores)
+    assert list(ve.evaluate_batch(positions, 'material')) == [BitboardInstance(fen).material_score for fen in fens]
@@ -0,0 +1,231 @@
+import config as c
+
+# Transposition table https://www.chessprogramming.org/Transposition_Table
+# Bound types of a stored score
+exact = 0
+lower_bound = 1  # search failed high (score >= beta) - true score is at least this
+upper_bound = 2  # search failed low (score <= alpha) - true score is at most this
+
+# note - rough size of one entry: 6-tuple (~88 bytes) + 64 bit key int (~36 bytes) + list slot pointer (8 bytes)
+entry_bytes = 132
+
+
+class TranspositionTable:
+    """
+    Fixed size table keyed by the GameInstance zobrist key. Each bucket has two slots: a depth preferred slot
+    (only replaced by a deeper search or an entry from an older search) and an always replace slot
+    Entries are tuples of (key, depth, score, bound, best_move, age)
+    """
+
+    def __init__(self, size_mb=c.transposition_table_mb):
+        bucket_count = 1
+        while bucket_count * 4 * entry_bytes <= size_mb * 1024 * 1024:  # 2 slots per bucket, largest power of 2
+            bucket_count *= 2
+
+        self.size_mb = size_mb
+        self.mask = bucket_count - 1
+        self.depth_preferred = [None] * bucket_count
+        self.always_replace = [None] * bucket_count
+        self.age = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0  # incremented by the search when a probed entry ends the node
+        self.collisions = 0  # probes that found the bucket occupied by other positions
+        self.stores = 0
+
+    def clear(self):
+        self.depth_preferred = [None] * (self.mask + 1)
+        self.always_replace = [None] * (self.mask + 1)
+        self.age = 0
+        self.reset_stats()
+
+    def new_search(self):
+        """
+        Called once per root search - entries from older searches lose their depth preferred protection
+        """
+        self.age += 1
+        self.reset_stats()
+
+    def probe(self, key):
+        """
+        Looks up a position
+        :param key: zobrist key
+        :return: entry tuple or None
+        """
+        self.probes += 1
+        index = key & self.mask
+
+        entry = self.depth_preferred[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+
+        other_entry = self.always_replace[index]
+        if other_entry is not None and other_entry[0] == key:
+            self.hits += 1
+            return other_entry
+
+        if entry is not None or other_entry is not None:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, score, bound, best_move):
+        """
+        Stores a search result, the entry displaced from the depth preferred slot moves to the always replace slot
+        :param key: zobrist key
+        :param depth: remaining depth the position was searched to
+        :param score: score of the position
+        :param bound: exact, lower_bound or upper_bound
+        :param best_move: best (or refutation) move found, used for move ordering
+        """
+        self.stores += 1
+        index = key & self.mask
+        new_entry = (key, depth, score, bound, best_move, self.age)
+
+        entry = self.depth_preferred[index]
+        if entry is None or entry[0] == key or depth >= entry[1] or entry[5] != self.age:
+            if entry is not None and entry[0] != key:
+                self.always_replace[index] = entry
+            self.depth_preferred[index] = new_entry
+        else:
+            self.always_replace[index] = new_entry
+
+    def stats(self):
+        """
+        Table statistics for sizing (rates are per probe, fill is the fraction of slots in use)
+        :return: dict
+        """
+        probes = max(self.probes, 1)
+        used = sum(entry is not None for entry in self.depth_preferred) + \
+            sum(entry is not None for entry in self.always_replace)
+        return {'size_mb': self.size_mb,
+                'entries': 2 * (self.mask + 1),
+                'fill': used / (2 * (self.mask + 1)),
+                'probes': self.probes,
+                'stores': self.stores,
+                'hit_rate': self.hits / probes,
+                'cutoff_rate': self.cutoffs / probes,
+                'collision_rate': self.collisions / probes}
+
+
+# Shared table (Lazy SMP) - entries are packed into 2 unsigned 64 bit words, key ^ data and data. Readers XOR the
+# words back and only accept the entry if the key matches, so an entry torn by a concurrent write from another
+# process reads as a miss instead of a corrupt move (no locks) https://www.chessprogramming.org/Shared_Hash_Table
+shared_entry_bytes = 16
+_word_mask = (1 << 64) - 1
+_move_bits = 30  # packed move including its ordering score (see move_encoding), 0 for no move
+_move_mask = (1 << _move_bits) - 1
+# note - data word fields (shift, mask), shared by pack_entry, unpack_entry and store
+_score_shift, _score_mask = _move_bits, 0xFFFF
+_depth_shift, _depth_mask = _move_bits + 16, 255
+_bound_shift, _bound_mask = _move_bits + 24, 3
+_age_shift, _age_mask = _move_bits + 26, 15
+_age_slots = _age_mask + 1
+
+
+def pack_entry(depth, score, bound, best_move, age):
+    """
+    Data word of a shared entry - move(30) score(16) depth(8) bound(2) age(4)
+    """
+    return (best_move or 0) | (score + 32768) << _score_shift | depth << _depth_shift | bound << _bound_shift | \
+        (age % _age_slots) << _age_shift
+
+
+def unpack_entry(key, data):
+    """
+    :return: entry tuple in the TranspositionTable layout (key, depth, score, bound, best_move, age)
+    """
+    return key, data >> _depth_shift & _depth_mask, (data >> _score_shift & _score_mask) - 32768, \
+        data >> _bound_shift & _bound_mask, data & _move_mask or None, data >> _age_shift & _age_mask
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    TranspositionTable in multiprocessing.shared_memory, so every process of a Lazy SMP search reads and writes the
+    same entries. Same interface, buckets and replacement policy - slot 0 is depth preferred, slot 1 always replace
+    The creating process owns the memory (see close/unlink), other processes attach by name
+    """
+
+    def __init__(self, size_mb=c.transposition_table_mb, name=None):
+        from multiprocessing import shared_memory  # note - only needed by the multi process search
+
+        bucket_count = 1
+        while bucket_count * 4 * shared_entry_bytes <= size_mb * 1024 * 1024:
+            bucket_count *= 2
+        self.size_mb = size_mb
+        self.mask = bucket_count - 1
+        self.is_owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.is_owner,
+                                                 size=bucket_count * 2 * shared_entry_bytes)
+        self.name = self.memory.name
+        self.words = self.memory.buf.cast('Q')  # 4 words per bucket
+        self.age = 0
+        self.reset_stats()
+
+    def clear(self):
+        self.memory.buf[:] = bytes(len(self.memory.buf))
+        self.age = 0
+        self.reset_stats()
+
+    def close(self):
+        """
+        Detaches this process (unlink as well in the owner once the other processes are done)
+        """
+        self.words.release()
+        self.memory.close()
+
+    def unlink(self):
+        self.memory.unlink()
+
+    def probe(self, key):
+        self.probes += 1
+        words = self.words
+        offset = (key & self.mask) << 2
+        found = False
+        for slot in (offset, offset + 2):
+            data = words[slot + 1]
+            if data:
+                found = True
+                if words[slot] ^ data == key:
+                    self.hits += 1
+                    return unpack_entry(key, data)
+        if found:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, score, bound, best_move):
+        self.stores += 1
+        words = self.words
+        offset = (key & self.mask) << 2
+        data = pack_entry(depth, score, bound, best_move, self.age)
+
+        entry_data = words[offset + 1]
+        entry_key = words[offset] ^ entry_data
+        if not entry_data or entry_key == key or depth >= entry_data >> _depth_shift & _depth_mask or \
+                entry_data >> _age_shift & _age_mask != self.age % _age_slots:
+            if entry_data and entry_key != key:
+                words[offset + 2], words[offset + 3] = words[offset], entry_data
+            slot = offset
+        else:
+            slot = offset + 2
+        words[slot] = key ^ data
+        words[slot + 1] = data
+
+    def stats(self):
+        """
+        As TranspositionTable.stats, with the fill estimated from the first 1000 buckets (a full scan is slow)
+        """
+        probes = max(self.probes, 1)
+        sample = min(self.mask + 1, 1000)
+        used = sum(self.words[index] != 0 for index in range(1, sample * 4, 2))
+        return {'size_mb': self.size_mb,
+                'entries': 2 * (self.mask + 1),
+                'fill': used / (2 * sample),
+                'probes': self.probes,
+                'stores': self.stores,
+                'hit_rate': self.hits / probes,
+                'cutoff_rate': self.cutoffs / probes,
+                'collision_rate': self.collisions / probes}
@@ -0,0 +1,159 @@
+import numpy as np
+
+import config as c
+import fen_logic as fl
+import fen_settings as s
+import move_encoding as me
+import pawn_structure as pawns
+
+# Vectorised evaluation - material + piece square bonus of many positions in one numpy gather and sum. Positions
+# are (N, 64) int8 arrays of piece codes (64 square index, a1 = 0, see s.square_id_to_index_64) or (N, 12, 64)
+# int8 piece planes (plane_codes order). Scores are white positive, like AlphaBetaPruning.evaluation (# note - without
+# the pawn structure terms, evaluate_children adds them from the game instance)
+plane_codes = [color | piece_type for color in (s.white, s.black) for piece_type in s.piece_types]
+
+_index_to_square = np.array(s.index_64_to_square_id)
+_square_indices = np.arange(64)
+
+
+def mirror_square(square):
+    """
+    Square id of the same square seen from the other side of the board (rank 1 <-> rank 8)
+    """
+    return (11 - square // 10) * 10 + square % 10
+
+
+def build_table(material, square_bonus):
+    """
+    (piece code, 64 square index) table of the signed value of each piece on each square
+    :param material: material value indexed by piece code
+    :param square_bonus: function of (piece code, square id) -> signed bonus
+    :return: int32 array, zero for empty/unused codes
+    """
+    table = np.zeros((s.piece_code_count, 64), dtype=np.int32)
+    for code in plane_codes:
+        for index, square in enumerate(s.index_64_to_square_id):
+            table[code, index] = material[code] + square_bonus(code, square)
+    return table
+
+
+def _mid_game_bonus(code, square):
+    # note - the mid game tables are from whites point of view (mailbox squares), mirrored for black
+    piece_table = s.piece_value_mid_game_by_type[code & s.piece_type_mask]
+    return piece_table[square] if code & s.white else -piece_table[mirror_square(square)]
+
+
+# evaluation - BOUNDS_DICT square bonus (the untapered search evaluation), material - piece values only,
+# mid_game - the fen_settings mid game tables the move generators use for the move delta_eval. square_bonus,
+# end_game and phase are the separate terms of the tapered evaluation (see evaluate_batch)
+_no_material = [0] * s.piece_code_count
+tables = {'evaluation': build_table(s.material_values, lambda code, square: s.square_bonus_values[code][square]),
+          'material': build_table(s.material_values, lambda code, square: 0),
+          'mid_game': build_table(s.material_values, _mid_game_bonus),
+          'square_bonus': build_table(_no_material, lambda code, square: s.square_bonus_values[code][square]),
+          'end_game': build_table(_no_material, lambda code, square: s.end_game_values[code][square]),
+          'phase': build_table(s.phase_values, lambda code, square: 0)}
+plane_tables = {name: table[plane_codes] for name, table in tables.items()}  # (12, 64) for the piece planes
+
+
+def board_array(board):
+    """
+    :param board: mailbox board (GameInstance.board bytearray)
+    :return: (64,) int8 array of piece codes
+    """
+    return np.frombuffer(bytes(board), dtype=np.uint8)[_index_to_square].astype(np.int8)
+
+
+def fen_array(fen):
+    """
+    :param fen: position
+    :return: (64,) int8 array of piece codes
+    """
+    return board_array(fl.decode_fen(fen)[0])
+
+
+def to_planes(positions):
+    """
+    :param positions: (N, 64) piece codes
+    :return: (N, 12, 64) int8 piece planes
+    """
+    return (positions[:, None, :] == np.array(plane_codes, dtype=np.int8)[None, :, None]).astype(np.int8)
+
+
+def evaluate_batch(positions, table='evaluation'):
+    """
+    Scores many positions at once
+    :param positions: (N, 64) piece codes or (N, 12, 64) piece planes
+    :param table: 'evaluation' (tapered when c.tapered_evaluation, like AlphaBetaPruning.evaluation) or a tables name
+    :return: (N,) int32 array of scores (white positive)
+    """
+    positions = np.asarray(positions)
+    if table == 'evaluation' and c.tapered_evaluation:
+        phase = np.minimum(evaluate_batch(positions, 'phase'), s.max_phase)
+        return evaluate_batch(positions, 'material') + (evaluate_batch(positions, 'square_bonus') * phase +
+                                                        evaluate_batch(positions, 'end_game') *
+                                                        (s.max_phase - phase)) // s.max_phase
+    if positions.ndim == 3:
+        return np.einsum('npq,pq->n', positions, plane_tables[table], dtype=np.int32)
+    return tables[table][positions, _square_indices].sum(axis=1, dtype=np.int32)
+
+
+def child_arrays(board, moves):
+    """
+    Positions after each move, without making them
+    :param board: game instance
+    :param moves: moves of the side to move
+    :return: (len(moves), 64) int8 array of piece codes
+    """
+    children = np.repeat(board_array(board.board)[None, :], len(moves), axis=0)
+    index = s.square_id_to_index_64
+    rows = np.arange(len(moves))
+    starts = np.array([index[move & me.square_mask] for move in moves], dtype=np.intp)
+    ends = np.array([index[move >> 7 & me.square_mask] for move in moves], dtype=np.intp)
+    children[rows, ends] = children[rows, starts]
+    children[rows, starts] = s.empty
+
+    for row, move in enumerate(moves):
+        flag = me.move_flag(move)
+        if flag >= me.promotion:
+            color = board.board[me.move_start(move)] & (s.white | s.black)
+            children[row, ends[row]] = color | me.promotion_piece(move)
+        elif flag == me.en_passant:
+            children[row, index[me.move_end(move) + (10 if board.is_whites_turn else -10)]] = s.empty
+        elif flag == me.castle:
+            _, rook_start, rook_end = s.castling_moves[me.move_end(move)]
+            children[row, index[rook_end]] = children[row, index[rook_start]]
+            children[row, index[rook_start]] = s.empty
+    return children
+
+
+def evaluate_children(board, moves, square_bonus=True):
+    """
+    Static scores of every child of a node in one batch (the frontier of the search)
+    :param board: game instance
+    :param moves: moves of the side to move
+    :param square_bonus: include the square bonus and pawn structure (else material only)
+    :return: (len(moves),) int32 array of scores (white positive)
+    """
+    scores = evaluate_batch(child_arrays(board, moves), 'evaluation' if square_bonus else 'material')
+    if square_bonus and c.pawn_structure:
+        scores += pawn_structure_children(board, moves)
+    return scores
+
+
+def pawn_structure_children(board, moves):
+    """
+    Pawn structure term of every child - the parent's, except for the moves that change the pawns or rooks (those
+    children are made and scored, mostly from the pawn hash table)
+    :param board: game instance
+    :param moves: moves of the side to move
+    :return: (len(moves),) int32 array of scores (white positive)
+    """
+    terms = np.full(len(moves), pawns.evaluate(board), dtype=np.int32)
+    for row, move in enumerate(moves):
+        if board.board[me.move_start(move)] & s.piece_type_mask in (s.pawn, s.rook) or me.move_flag(move) == me.castle \
+                or board.board[me.move_end(move)] & s.piece_type_mask in (s.pawn, s.rook):
+            board.make_move(move)
+            terms[row] = pawns.evaluate(board)
+            board.unmake_move()
+    return terms
@@ -0,0 +1,85 @@
+import random
+
+import fen_settings as s
+
+# Zobrist hashing https://www.chessprogramming.org/Zobrist_Hashing
+# note - keys are generated from a fixed seed so hashes are stable between runs/processes
+
+zobrist_seed = 1729
+_rng = random.Random(zobrist_seed)
+
+
+def _random_key() -> int:
+    return _rng.getrandbits(64)
+
+
+# One key per (piece code, square) - off board squares stay 0 so they never change the hash
+piece_keys = [None] * s.piece_code_count
+for _color in s.valid_colors:
+    for _piece in s.valid_pieces:
+        _square_keys = [0] * s.board_square_count
+        for _square in s.real_board_squares:
+            _square_keys[_square] = _random_key()
+        piece_keys[s.piece_to_code[_color + _piece]] = _square_keys
+
+black_to_move_key = _random_key()  # XORed in whenever it is blacks turn
+castling_right_keys = {right: _random_key() for right in 'KQkq'}
+en_passant_keys = {column: _random_key() for column in range(1, 9)}  # indexed by square % 10
+
+
+def castling_key(castling_rights: str) -> int:
+    """
+    XOR of the keys for each castling right present in the fen style rights string (e.g. 'KQkq', 'Kq' or '-')
+    :param castling_rights: castling rights string
+    :return: key
+    """
+    key = 0
+    for right in castling_rights:
+        if right in castling_right_keys:
+            key ^= castling_right_keys[right]
+    return key
+
+
+def en_passant_key(en_passant_square) -> int:
+    """
+    Key for the en passant square (only the column matters)
+    :param en_passant_square: square index or None
+    :return: key
+    """
+    return 0 if en_passant_square is None else en_passant_keys[en_passant_square % 10]
+
+
+def hash_pawns(board: bytearray) -> int:
+    """
+    Computes the pawn only Zobrist key of a position from scratch (the pawn hash table key, see pawn_structure)
+    :param board: array board (square index -> piece code)
+    :return: 64 bit key
+    """
+    key = 0
+    for square in s.real_board_squares:
+        piece = board[square]
+        if piece & s.piece_type_mask == s.pawn:
+            key ^= piece_keys[piece][square]
+    return key
+
+
+def hash_position(board: bytearray, castling_rights: str, en_passant_square, is_whites_turn: bool) -> int:
+    """
+    Computes the Zobrist key of a position from scratch
+    :param board: array board (square index -> piece code)
+    :param castling_rights: castling rights string
+    :param en_passant_square: square index or None
+    :param is_whites_turn: side to move
+    :return: 64 bit key
+    """
+    key = 0
+    for square in s.real_board_squares:
+        piece = board[square]
+        if piece != s.empty:
+            key ^= piece_keys[piece][square]
+
+    key ^= castling_key(castling_rights)
+    key ^= en_passant_key(en_passant_square)
+    if not is_whites_turn:
+        key ^= black_to_move_key
+    return key